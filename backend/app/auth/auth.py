@@ -1,9 +1,17 @@
 from fastapi import APIRouter, HTTPException, Depends, WebSocketException, status
+from fastapi.concurrency import run_in_threadpool
 from pydantic import BaseModel
 from datetime import datetime, timedelta
 from fastapi.security import HTTPBearer, HTTPAuthorizationCredentials
 from jose import JWTError, jwt
+from collections import OrderedDict
+import hashlib
 import logging
+import threading
+import time
+from typing import Optional
+
+from app.utils.metrics import registry
 
 # Setup logging
 logger = logging.getLogger("auth")
@@ -32,6 +40,15 @@ AUTH_DATA = {
     "jwt_secret": "pkybZBce_EP-RppbW4y0DYxljiDvyPLs8tU9Vm1ezY8"
 }
 
+# Verified-token cache: sha256(token) -> (payload, error, valid_until epoch seconds)
+TOKEN_CACHE_SIZE = 10000
+NEGATIVE_CACHE_SECONDS = 30
+_token_cache: "OrderedDict[bytes, tuple]" = OrderedDict()
+_token_cache_lock = threading.Lock()
+_token_cache_secret = None
+token_cache_stats = {"hits": 0, "misses": 0, "negative_hits": 0, "evictions": 0, "invalidations": 0}
+
+
 class LoginRequest(BaseModel):
     username: str
     password: str
@@ -49,13 +66,90 @@ def create_access_token(data: dict, expires_delta: timedelta = None):
     to_encode.update({"exp": expire})
     return jwt.encode(to_encode, secret_key, algorithm=ALGORITHM)
 
-async def verify_token(token: str):
+def _cached_token(token: str) -> Optional[dict]:
+    """The cached payload for `token`, or None on a miss. Raises JWTError for a cached rejection."""
+    global _token_cache_secret
     secret_key = AUTH_DATA.get("jwt_secret")
     if not secret_key:
-        raise WebSocketException(code=status.WS_1008_POLICY_VIOLATION)
+        raise JWTError("JWT secret is missing.")
+
+    key = hashlib.sha256(token.encode()).digest()
+    now = time.time()
+    with _token_cache_lock:
+        if secret_key != _token_cache_secret:
+            if _token_cache:
+                token_cache_stats["invalidations"] += 1
+            _token_cache.clear()
+            _token_cache_secret = secret_key
+        entry = _token_cache.get(key)
+        if entry is not None:
+            payload, error, valid_until = entry
+            if now < valid_until:
+                _token_cache.move_to_end(key)
+                if error is not None:
+                    token_cache_stats["negative_hits"] += 1
+                    raise JWTError(error)
+                token_cache_stats["hits"] += 1
+                return payload
+            del _token_cache[key]
+        token_cache_stats["misses"] += 1
+    return None
+
 
+def _decode_and_cache(token: str) -> dict:
+    secret_key = AUTH_DATA.get("jwt_secret")
+    if not secret_key:
+        raise JWTError("JWT secret is missing.")
+    key = hashlib.sha256(token.encode()).digest()
+    now = time.time()
     try:
         payload = jwt.decode(token, secret_key, algorithms=[ALGORITHM])
+        exp = payload.get("exp")
+        entry = (payload, None, exp if isinstance(exp, (int, float)) else now + NEGATIVE_CACHE_SECONDS)
+    except JWTError as e:
+        entry = (None, str(e), now + NEGATIVE_CACHE_SECONDS)
+
+    with _token_cache_lock:
+        if secret_key == _token_cache_secret:
+            _token_cache[key] = entry
+            if len(_token_cache) > TOKEN_CACHE_SIZE:
+                _token_cache.popitem(last=False)
+                token_cache_stats["evictions"] += 1
+
+    if entry[1] is not None:
+        raise JWTError(entry[1])
+    return entry[0]
+
+
+def decode_token(token: str) -> dict:
+    """
+    jwt.decode with a bounded cache keyed by the token's hash. A valid token is
+    cached until its own `exp`, so expiry is still enforced. A rejected token is
+    cached for NEGATIVE_CACHE_SECONDS. Changing the secret drops every entry.
+    """
+    payload = _cached_token(token)
+    return payload if payload is not None else _decode_and_cache(token)
+
+
+async def decode_token_async(token: str) -> dict:
+    """decode_token for async callers: cache hits stay on the loop, misses decode on the threadpool."""
+    payload = _cached_token(token)
+    return payload if payload is not None else await run_in_threadpool(_decode_and_cache, token)
+
+
+def get_token_cache_stats() -> dict:
+    return {**token_cache_stats, "size": len(_token_cache), "capacity": TOKEN_CACHE_SIZE}
+
+
+registry.register_collector("jwt_token_cache", get_token_cache_stats)
+
+
+async def verify_token(token: str):
+    if not AUTH_DATA.get("jwt_secret"):
+        raise WebSocketException(code=status.WS_1008_POLICY_VIOLATION)
+
+    try:
+        payload = await decode_token_async(token)
         username = payload.get("sub")
         if not username:
             raise WebSocketException(code=status.WS_1008_POLICY_VIOLATION)
@@ -77,17 +171,17 @@ def login(req: LoginRequest):
     logger.info(f"User {req.username} authenticated successfully.")
     return {"access_token": token, "token_type": "bearer"}
 
-def get_current_user(credentials: HTTPAuthorizationCredentials = Depends(security)):
-    secret_key = AUTH_DATA.get("jwt_secret")
+# async so cached verification doesn't pay a threadpool hop per request; misses still decode off the loop
+async def get_current_user(credentials: HTTPAuthorizationCredentials = Depends(security)):
     try:
-        payload = jwt.decode(credentials.credentials, secret_key, algorithms=[ALGORITHM])
+        payload = await decode_token_async(credentials.credentials)
         return {"username": payload.get("sub"), "role": payload.get("role")}
     except JWTError:
         logger.error("Token validation failed.")
         raise HTTPException(status_code=403, detail="Invalid token.")
 
 def require_role(role: str):
-    def role_checker(user=Depends(get_current_user)):
+    async def role_checker(user=Depends(get_current_user)):
         if user["role"] != role:
             raise HTTPException(status_code=403, detail="Access forbidden.")
         return user
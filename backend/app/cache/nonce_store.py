@@ -0,0 +1,220 @@
+# nonce_store.py
+
+import hashlib
+import time
+from collections import deque
+from datetime import datetime, timezone
+from typing import Callable, Deque, Optional, Set
+
+from app.utils.shared_state import select_state
+
+NONCE_FRESHNESS_SECONDS = 30  # message timestamps are accepted up to this far either side of now
+NONCE_TTL_SECONDS = 2 * NONCE_FRESHNESS_SECONDS  # so a nonce is remembered for as long as its message stays fresh
+NONCE_BUCKET_SECONDS = 5
+NONCE_CAPACITY = 200_000  # exact nonces kept in memory across all buckets
+BLOOM_BITS_PER_BUCKET = 1 << 20  # 128 KiB per bucket
+BLOOM_HASHES = 7
+
+
+def is_fresh(sent_time: datetime, now: Optional[datetime] = None) -> bool:
+    """
+    True if `sent_time` is within NONCE_FRESHNESS_SECONDS of now (UTC). Nonces
+    are only remembered for NONCE_TTL_SECONDS, so anything staler has to be
+    rejected before the nonce lookup or a late replay would pass as new.
+    """
+    if sent_time.tzinfo is not None:
+        sent_time = sent_time.astimezone(timezone.utc).replace(tzinfo=None)
+    now = now or datetime.utcnow()
+    return abs((now - sent_time).total_seconds()) < NONCE_FRESHNESS_SECONDS
+
+
+class BloomFilter:
+    """Fixed-size Bloom filter over str keys using double hashing of one blake2b digest."""
+
+    def __init__(self, num_bits: int = BLOOM_BITS_PER_BUCKET, num_hashes: int = BLOOM_HASHES):
+        self.num_bits = num_bits
+        self.num_hashes = num_hashes
+        self._bits = bytearray(num_bits // 8)
+
+    def _positions(self, key: str):
+        digest = hashlib.blake2b(key.encode(), digest_size=16).digest()
+        h1 = int.from_bytes(digest[:8], "little")
+        h2 = int.from_bytes(digest[8:], "little") | 1
+        return ((h1 + i * h2) % self.num_bits for i in range(self.num_hashes))
+
+    def add(self, key: str):
+        for pos in self._positions(key):
+            self._bits[pos >> 3] |= 1 << (pos & 7)
+
+    def __contains__(self, key: str) -> bool:
+        return all(self._bits[pos >> 3] & (1 << (pos & 7)) for pos in self._positions(key))
+
+
+class _Bucket:
+    __slots__ = ("bucket_id", "exact", "bloom")
+
+    def __init__(self, bucket_id: int, bloom: Optional[BloomFilter]):
+        self.bucket_id = bucket_id
+        self.exact: Optional[Set[str]] = set()
+        self.bloom = bloom
+
+
+class NonceStore:
+    """
+    Replay-protection nonces in time buckets. Whole buckets expire once they
+    are older than the TTL, so a nonce is never held longer than it could
+    still validate.
+
+    Exact sets are capped at `capacity` entries in total, the current bucket
+    included. Over the cap, the oldest bucket is demoted to its Bloom filter
+    only. Its nonces are then still rejected, with a small false-positive rate,
+    until the bucket expires. A flood inside one bucket demotes the current
+    bucket too, and the rest of its window is recorded in the filter alone.
+    That keeps memory constant however much replay traffic arrives. Without
+    Bloom filters, over-capacity buckets are evicted outright.
+    """
+
+    def __init__(self, ttl_seconds: float = NONCE_TTL_SECONDS, bucket_seconds: float = NONCE_BUCKET_SECONDS,
+                 capacity: int = NONCE_CAPACITY, use_bloom: bool = True,
+                 bloom_bits: int = BLOOM_BITS_PER_BUCKET, clock: Callable[[], float] = time.monotonic):
+        self.ttl_seconds = ttl_seconds
+        self.bucket_seconds = bucket_seconds
+        self.capacity = capacity
+        self.use_bloom = use_bloom
+        self.bloom_bits = bloom_bits
+        self._clock = clock
+        self._buckets: Deque[_Bucket] = deque()
+        self._exact_size = 0
+        self.stats = {"added": 0, "replays": 0, "bloom_replays": 0, "expired": 0, "demoted": 0, "evicted": 0}
+
+    def _expire(self, now: float) -> int:
+        current_id = int(now // self.bucket_seconds)
+        # Keep enough buckets to cover the full TTL, including the partly elapsed oldest one
+        oldest_live_id = current_id - int(-(-self.ttl_seconds // self.bucket_seconds))
+        while self._buckets and self._buckets[0].bucket_id < oldest_live_id:
+            bucket = self._buckets.popleft()
+            if bucket.exact is not None:
+                self._exact_size -= len(bucket.exact)
+                self.stats["expired"] += len(bucket.exact)
+        return current_id
+
+    def _enforce_capacity(self):
+        for bucket in self._buckets:
+            if self._exact_size <= self.capacity:
+                return
+            if bucket.exact is None:
+                continue
+            self._exact_size -= len(bucket.exact)
+            if self.use_bloom:
+                self.stats["demoted"] += len(bucket.exact)
+                bucket.exact = None
+            else:
+                self.stats["evicted"] += len(bucket.exact)
+                bucket.exact = set()
+
+    def __contains__(self, nonce) -> bool:
+        key = str(nonce)
+        self._expire(self._clock())
+        for bucket in reversed(self._buckets):
+            if bucket.bloom is not None and key not in bucket.bloom:
+                continue
+            if bucket.exact is None:
+                self.stats["bloom_replays"] += 1
+                return True
+            if key in bucket.exact:
+                return True
+        return False
+
+    def add(self, nonce):
+        key = str(nonce)
+        current_id = self._expire(self._clock())
+        if not self._buckets or self._buckets[-1].bucket_id != current_id:
+            bloom = BloomFilter(self.bloom_bits) if self.use_bloom else None
+            self._buckets.append(_Bucket(current_id, bloom))
+        bucket = self._buckets[-1]
+        if bucket.exact is None:
+            # The current bucket was demoted over capacity; its filter remembers the rest of the window
+            bucket.bloom.add(key)
+            self.stats["added"] += 1
+            return
+        if key in bucket.exact:
+            return
+        bucket.exact.add(key)
+        if bucket.bloom is not None:
+            bucket.bloom.add(key)
+        self._exact_size += 1
+        self.stats["added"] += 1
+        self._enforce_capacity()
+
+    def seen(self, nonce) -> bool:
+        """Like `nonce in store`, but counts a hit as a detected replay."""
+        if nonce in self:
+            self.stats["replays"] += 1
+            return True
+        return False
+
+    def check_and_add(self, nonce) -> bool:
+        """Record the nonce and return True if it is fresh, False if it is a replay."""
+        if self.seen(nonce):
+            return False
+        self.add(nonce)
+        return True
+
+    def __len__(self) -> int:
+        return self._exact_size
+
+    def get_stats(self) -> dict:
+        self._expire(self._clock())
+        return {
+            **self.stats,
+            "size": self._exact_size,
+            "buckets": len(self._buckets),
+            "demoted_buckets": sum(1 for b in self._buckets if b.exact is None),
+            "capacity": self.capacity,
+            "ttl_seconds": self.ttl_seconds,
+        }
+
+
+class SharedNonceStore:
+    """
+    NonceStore's interface over a SharedState: one key per nonce that expires
+    after the TTL. check_and_add is a single SET NX, so two workers racing on
+    the same nonce cannot both accept it.
+    """
+
+    def __init__(self, state, ttl_seconds: float = NONCE_TTL_SECONDS, prefix: str = "nonce"):
+        self.state = state
+        self.ttl_seconds = ttl_seconds
+        self.prefix = prefix
+        self.stats = {"added": 0, "replays": 0}
+
+    def _key(self, nonce) -> str:
+        return f"{self.prefix}:{nonce}"
+
+    def __contains__(self, nonce) -> bool:
+        return bool(self.state.execute("EXISTS", self._key(nonce)))
+
+    def add(self, nonce):
+        self.state.execute("SET", self._key(nonce), "1", "PX", int(self.ttl_seconds * 1000))
+        self.stats["added"] += 1
+
+    def seen(self, nonce) -> bool:
+        if nonce in self:
+            self.stats["replays"] += 1
+            return True
+        return False
+
+    def check_and_add(self, nonce) -> bool:
+        if self.state.execute("SET", self._key(nonce), "1", "PX", int(self.ttl_seconds * 1000), "NX") is None:
+            self.stats["replays"] += 1
+            return False
+        self.stats["added"] += 1
+        return True
+
+    def get_stats(self) -> dict:
+        # Counters are this worker's; the nonces themselves are shared
+        return {**self.stats, "backend": self.state.name, "ttl_seconds": self.ttl_seconds}
+
+
+# Shared by /simulate/replay and the threat detector
+nonce_store = select_state(NonceStore, SharedNonceStore)
@@ -0,0 +1,106 @@
+# sensor_aggregates.py
+
+import json
+import math
+from collections import deque
+from typing import Deque, Dict, List, Optional, Tuple
+
+# Fields reported by /api/averages, per sensor type
+AVERAGE_FIELDS = {
+    "soil": ["temperature", "moisture", "ph", "nutrient_level"],
+    "atmospheric": ["air_temperature", "humidity", "co2", "wind_speed", "rainfall"],
+    "water": ["flow_rate", "water_level", "salinity", "ph", "turbidity"],
+    "plant": ["leaf_moisture", "chlorophyll_level", "growth_rate", "disease_risk", "stem_diameter"],
+    "threat": ["unauthorized_access", "jamming_signal", "tampering_attempts", "spoofing_attempts", "anomaly_score"]
+}
+
+AGGREGATE_WINDOW_CYCLES = 12  # one minute of 5-second refresh cycles
+
+# (count, sum, sum of squares, min, max) for one field over one refresh cycle
+Summary = Tuple[int, float, float, float, float]
+
+
+def _describe(count: int, total: float, total_sq: float, lo: float, hi: float) -> dict:
+    if not count:
+        return {"mean": None, "min": None, "max": None, "stddev": None, "count": 0}
+    mean = total / count
+    variance = max(total_sq / count - mean * mean, 0.0)
+    return {
+        "mean": round(mean, 2),
+        "min": round(lo, 2),
+        "max": round(hi, 2),
+        "stddev": round(math.sqrt(variance), 2),
+        "count": count
+    }
+
+
+class SensorAggregates:
+    """
+    Per-type field aggregates maintained by the refresh loop. Each cycle is
+    reduced to running sums in one pass and kept in a bounded window, and the
+    /api/averages payload is prebuilt, so reads don't depend on sensor count.
+    """
+
+    def __init__(self, fields_by_type: Dict[str, List[str]] = None, window_cycles: int = AGGREGATE_WINDOW_CYCLES):
+        self.fields_by_type = fields_by_type or AVERAGE_FIELDS
+        self.window_cycles = window_cycles
+        self._windows: Dict[str, Dict[str, Deque[Summary]]] = {
+            sensor_type: {field: deque(maxlen=window_cycles) for field in fields}
+            for sensor_type, fields in self.fields_by_type.items()
+        }
+        self._averages = {
+            sensor_type: {field: None for field in fields}
+            for sensor_type, fields in self.fields_by_type.items()
+        }
+        self._stats: Dict[str, Dict[str, dict]] = {sensor_type: {} for sensor_type in self.fields_by_type}
+        self._averages_json: Optional[bytes] = None
+
+    def update(self, sensor_type: str, items: list):
+        fields = self.fields_by_type.get(sensor_type)
+        if fields is None:
+            return
+        averages = {}
+        stats = {}
+        for field in fields:
+            count, total, total_sq = 0, 0.0, 0.0
+            lo, hi = math.inf, -math.inf
+            for item in items:
+                value = getattr(item, field, None)
+                if not isinstance(value, (int, float)):
+                    continue
+                count += 1
+                total += value
+                total_sq += value * value
+                if value < lo:
+                    lo = value
+                if value > hi:
+                    hi = value
+            window = self._windows[sensor_type][field]
+            window.append((count, total, total_sq, lo, hi))
+
+            latest = _describe(count, total, total_sq, lo, hi)
+            windowed = _describe(
+                sum(s[0] for s in window), sum(s[1] for s in window), sum(s[2] for s in window),
+                min(s[3] for s in window), max(s[4] for s in window)
+            )
+            averages[field] = latest["mean"]
+            stats[field] = {**latest, "window": {**windowed, "cycles": len(window)}}
+
+        # Swap whole dicts so readers never see a half-updated type
+        self._averages = {**self._averages, sensor_type: averages}
+        self._stats = {**self._stats, sensor_type: stats}
+        self._averages_json = None
+
+    def averages(self) -> dict:
+        return self._averages
+
+    def averages_json(self) -> bytes:
+        if self._averages_json is None:
+            self._averages_json = json.dumps(self._averages).encode("utf-8")
+        return self._averages_json
+
+    def stats(self) -> dict:
+        return {"window_cycles": self.window_cycles, "types": self._stats}
+
+
+sensor_aggregates = SensorAggregates()
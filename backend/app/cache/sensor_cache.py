@@ -1,21 +1,135 @@
 # sensor_cache.py
 
-from typing import Set, Dict, List
-from collections import defaultdict
+import asyncio
+import json
+import logging
+import time
+from typing import Awaitable, Callable, Deque, Dict, FrozenSet, Iterable, List, Mapping, MutableMapping, Optional
+from collections import defaultdict, deque
 
-# ✅ In-memory cache for known sensor IDs
-sensor_id_cache: Set[str] = set()
+from pydantic import BaseModel
 
-# ✅ In-memory cache for latest sensor data by type
-latest_data_cache: Dict[str, List] = defaultdict(list)
+from app.model.basic_sensor_model import SoilData, AtmosphericData, WaterData, ThreatData, PlantData
+from app.utils.shared_state import SharedMapping, select_state
 
+logger = logging.getLogger(__name__)
 
-# You can optionally add:
-# - timestamp of last cache update
-# - helper methods to refresh or clear the cache
+SENSOR_REGISTRY_TTL_SECONDS = 60
+READING_HISTORY_SIZE = 500  # readings kept per sensor type for drift model training
 
-# Example helper function
+SENSOR_MODELS = {
+    "soil": SoilData,
+    "atmospheric": AtmosphericData,
+    "water": WaterData,
+    "plant": PlantData,
+    "threat": ThreatData,
+}
 
-def update_sensor_id_cache_from_data():
-    global sensor_id_cache
-    sensor_id_cache = {sensor.sensor_id for sensors in latest_data_cache.values() for sensor in sensors}
+
+class SensorRegistry:
+    """
+    Known sensor IDs held as an immutable frozenset that is swapped atomically,
+    so every lookup sees one consistent snapshot. Lookups never load anything;
+    the refresh loop publishes new snapshots and a background task reloads from
+    the tables (single-flight) only when the snapshot is older than the TTL.
+    """
+
+    def __init__(self, ttl_seconds: float = SENSOR_REGISTRY_TTL_SECONDS):
+        self.ttl_seconds = ttl_seconds
+        self._ids: FrozenSet[str] = frozenset()
+        self._loaded_at: Optional[float] = None
+        self._loader: Optional[Callable[[], Awaitable[Iterable[str]]]] = None
+        self._refresh_task: Optional[asyncio.Task] = None
+        self.stats = {"hits": 0, "misses": 0, "publishes": 0, "refreshes": 0, "refresh_errors": 0}
+
+    def set_loader(self, loader: Callable[[], Awaitable[Iterable[str]]]):
+        self._loader = loader
+
+    @property
+    def loaded(self) -> bool:
+        return self._loaded_at is not None
+
+    def is_stale(self) -> bool:
+        return self._loaded_at is None or time.monotonic() - self._loaded_at > self.ttl_seconds
+
+    def snapshot(self) -> FrozenSet[str]:
+        return self._ids
+
+    def contains(self, sensor_id: str) -> bool:
+        if sensor_id in self._ids:
+            self.stats["hits"] += 1
+            return True
+        self.stats["misses"] += 1
+        return False
+
+    def publish(self, sensor_ids: Iterable[str]):
+        self._ids = frozenset(sensor_ids)
+        self._loaded_at = time.monotonic()
+        self.stats["publishes"] += 1
+
+    async def refresh(self) -> FrozenSet[str]:
+        """Reload from the loader; concurrent callers share the one in-flight load."""
+        if self._refresh_task is None or self._refresh_task.done():
+            self._refresh_task = asyncio.get_running_loop().create_task(self._load())
+        return await asyncio.shield(self._refresh_task)
+
+    async def _load(self) -> FrozenSet[str]:
+        if self._loader is None:
+            return self._ids
+        try:
+            sensor_ids = await self._loader()
+        except Exception:
+            self.stats["refresh_errors"] += 1
+            logger.exception("Sensor registry refresh failed")
+            return self._ids
+        self.stats["refreshes"] += 1
+        # A publish from the refresh loop may have landed while the scan ran; don't roll it back
+        if self._loaded_at is None or self.is_stale():
+            self.publish(sensor_ids)
+        return self._ids
+
+    async def ensure_loaded(self) -> FrozenSet[str]:
+        if not self.loaded:
+            await self.refresh()
+        return self._ids
+
+    async def maintain(self, check_interval_seconds: float = 5):
+        while True:
+            if self.is_stale():
+                await self.refresh()
+            await asyncio.sleep(check_interval_seconds)
+
+    def get_stats(self) -> dict:
+        return {
+            **self.stats,
+            "size": len(self._ids),
+            "age_seconds": round(time.monotonic() - self._loaded_at, 1) if self._loaded_at is not None else None,
+            "ttl_seconds": self.ttl_seconds,
+        }
+
+
+# ✅ Registry of known sensor IDs
+sensor_registry = SensorRegistry()
+
+def _encode_readings(readings: List[BaseModel]) -> str:
+    return "[" + ",".join(reading.model_dump_json() for reading in readings) + "]"
+
+
+def _decode_readings(sensor_type: str, raw: str) -> List[BaseModel]:
+    model = SENSOR_MODELS[sensor_type]
+    return [model.model_validate(reading) for reading in json.loads(raw)]
+
+
+# ✅ Cache for latest sensor data by type (one shared hash across workers when shared state is on)
+latest_data_cache: MutableMapping[str, List] = select_state(
+    lambda: defaultdict(list),
+    lambda state: SharedMapping(state, "latest_sensor_data", _encode_readings, _decode_readings))
+
+# ✅ Rolling window of recent readings by type (oldest dropped first)
+reading_history: Dict[str, Deque] = defaultdict(lambda: deque(maxlen=READING_HISTORY_SIZE))
+
+
+def update_sensor_id_cache_from_data(data: Optional[Mapping[str, List]] = None):
+    """Publish the IDs in `data`, a snapshot of latest_data_cache already in hand, or in the cache itself."""
+    data = latest_data_cache if data is None else data
+    sensor_registry.publish(sensor.sensor_id for sensors in data.values() for sensor in sensors)
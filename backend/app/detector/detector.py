@@ -1,6 +1,6 @@
 from app.model.models import SensorData, AnomalyLog
 from app.utils.utils import get_timestamp
-from app.model.database import used_nonces
+from app.cache.nonce_store import nonce_store, is_fresh
 
 AUTHORIZED_SENSORS = {"soil_01", "plant_02", "threat_01"}
 
@@ -18,7 +18,17 @@ def detect_spoofing(data: SensorData) -> AnomalyLog:
 
 
 def detect_replay(data: SensorData) -> AnomalyLog:
-    if data.nonce in used_nonces:
+    # Nonces expire, so a reading outside the freshness window could otherwise be replayed as new
+    if not is_fresh(data.timestamp):
+        return AnomalyLog(
+            timestamp=get_timestamp(),
+            sensor_id=data.sensor_id,
+            attack_type="Replay",
+            message="Stale or future timestamp",
+            severity="Medium",
+            status="blocked"
+        )
+    if not nonce_store.check_and_add(data.nonce):
         return AnomalyLog(
             timestamp=get_timestamp(),
             sensor_id=data.sensor_id,
@@ -27,7 +37,6 @@ def detect_replay(data: SensorData) -> AnomalyLog:
             severity="Medium",
             status="blocked"
         )
-    used_nonces.add(data.nonce)
 
 
 # Example usage:
@@ -108,8 +108,11 @@ from typing import Dict
 from datetime import datetime
 import json
 
+from app.utils.shared_state import SharedMapping, select_state
+
 router = APIRouter()
-firmware_registry = {}
+# The routes below are plain defs: FastAPI runs them on its threadpool, so shared registry I/O stays off the event loop
+firmware_registry = select_state(dict, lambda state: SharedMapping(state, "firmware_registry"))
 firmware_audit_log = []
 
 SENSOR_TYPES = ["soil", "water", "atmospheric", "plant", "threat"]
@@ -119,11 +122,12 @@ SENSOR_IDS = ["1", "2", "3", "4", "5"]
 for stype in SENSOR_TYPES:
     for sid in SENSOR_IDS:
         key = f"{stype}_{sid}"
-        firmware_registry[key] = {
+        # setdefault, so a worker starting up does not reset versions other workers have recorded
+        firmware_registry.setdefault(key, {
             "current": "v1.0.0",
             "last": "none",
             "rollback_protection": True
-        }
+        })
 
 
 def verify_signature(signature: str) -> bool:
@@ -142,7 +146,7 @@ def parse_firmware_file(file: UploadFile) -> Dict:
 
 
 @router.get("/api/firmware/versions/{sensor_id}")
-async def get_firmware_versions(sensor_id: str):
+def get_firmware_versions(sensor_id: str):
     if sensor_id not in firmware_registry:
         firmware_registry[sensor_id] = {
             "current": "v1.0.0",
@@ -153,7 +157,7 @@ async def get_firmware_versions(sensor_id: str):
 
 
 @router.post("/api/firmware/upload")
-async def upload_firmware(
+def upload_firmware(
         file: UploadFile,
         sensor_id: str = Form(...),
         firmwareVersion: str = Form(...),
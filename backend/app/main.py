@@ -1,15 +1,26 @@
-import traceback
+import time
+_import_started = time.perf_counter()
+
+import logging
 from fastapi import FastAPI, Request
+from starlette.concurrency import run_in_threadpool
 from fastapi.middleware.cors import CORSMiddleware
-from starlette.responses import JSONResponse
+from starlette.responses import JSONResponse, Response
 
 from app.auth.auth import router as auth_router
 from app.sensors.generic_sensors import sensor_router as generic_sensors_router
 from app.simulate_attacks.sensor_simulation_attack import router as simulate_attacks_router
 from app.sensors.generic_threats_simulator import router as generic_threats_simulator_router
 from app.simulate_attacks.shap import shap_router as shap_router
+from app.utils.access_log import access_log
+from app.utils.metrics import http_request_duration, registry
+from app.utils.storage import get_storage
+from app.utils.shared_state import get_shared_state_stats
+from app.model.model_registry import model_registry
+from app.model.database import anomaly_log_writer
 
 app = FastAPI(title="LX-FTA_Gateway API")
+logger = logging.getLogger(__name__)
 
 # ✅ Enable CORS for frontend domain
 app.add_middleware(
@@ -29,6 +40,61 @@ app.include_router(generic_threats_simulator_router)
 app.include_router(shap_router)
 
 
+@app.on_event("startup")
+async def start_access_log():
+    access_log.start()
+
+
+@app.on_event("shutdown")
+async def stop_access_log():
+    access_log.stop()
+
+
+@app.get("/api/access-log/stats")
+def access_log_stats():
+    return access_log.get_stats()
+
+
+@app.get("/api/storage/stats")
+def storage_stats():
+    return get_storage().get_stats()
+
+
+@app.get("/api/shared-state/stats")
+def shared_state_stats():
+    return get_shared_state_stats()
+
+
+@app.on_event("startup")
+async def preload_models():
+    # Each worker holds its own copy of the forests; load them before traffic, off the event loop
+    loaded = await run_in_threadpool(model_registry.preload)
+    if loaded:
+        logger.info(f"Preloaded model version {model_registry.version}: {', '.join(loaded)}")
+
+
+@app.on_event("shutdown")
+def close_anomaly_log():
+    anomaly_log_writer.close()
+
+
+@app.on_event("startup")
+async def report_startup_time():
+    # SHAP explainers are built on first use, so this covers imports, router setup and model preloading
+    app.state.startup_ms = round((time.perf_counter() - _import_started) * 1000, 1)
+    logger.info(f"LX-FTA_Gateway API ready in {app.state.startup_ms} ms")
+
+
+registry.register_collector("access_log", access_log.get_stats)
+registry.register_collector("storage", lambda: get_storage().get_stats())
+registry.register_collector("shared_state", get_shared_state_stats)
+
+
+@app.get("/metrics")
+def metrics():
+    return Response(registry.render(), media_type="text/plain; version=0.0.4")
+
+
 @app.get("/health")
 def health():
     return {"status": "ok"}
@@ -47,15 +113,23 @@ def handle_options():
 # ✅ Unified middleware for logging and error catching
 @app.middleware("http")
 async def unified_middleware(request: Request, call_next):
-    print(f"📥 {request.method} {request.url} — headers: {dict(request.headers)}")
+    started = time.perf_counter()
     try:
         response = await call_next(request)
-        print(f"🔁 {request.method} {request.url} → {response.status_code}")
-        return response
     except Exception as e:
-        print(f"🚨 Unhandled Exception: {e}")
-        traceback.print_exc()
+        logger.exception(f"🚨 Unhandled Exception: {e}")
+        access_log.record(request, 500, started, error=repr(e))
+        observe_request(request, 500, started)
         return JSONResponse(
             status_code=500,
             content={"detail": "Internal Server Error"}
         )
+    access_log.record(request, response.status_code, started)
+    observe_request(request, response.status_code, started)
+    return response
+
+
+def observe_request(request: Request, status_code: int, started: float):
+    # Label by route template; unmatched paths share one series to keep cardinality bounded
+    route = getattr(request.scope.get("route"), "path", "unmatched")
+    http_request_duration.labels(request.method, route, status_code).observe(time.perf_counter() - started)
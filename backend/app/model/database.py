@@ -1,20 +1,142 @@
-from typing import List
+from collections import deque
+from typing import Deque, Iterator, List, Optional
 import json
+import os
+import threading
+import time
 from app.model.models import AnomalyLog
 
-anomaly_logs: List[AnomalyLog] = []
-used_nonces = set()
+ANOMALY_LOGS_KEPT = 1000  # in memory for /anomalies; oldest dropped first
+anomaly_logs: Deque[AnomalyLog] = deque(maxlen=ANOMALY_LOGS_KEPT)
 
-LOG_FILE = "logs.json"
+LOG_FILE = "logs.jsonl"
+LOG_FSYNC_POLICY = os.getenv("ANOMALY_LOG_FSYNC", "interval")  # always | interval | never
+LOG_FSYNC_INTERVAL_SECONDS = 1.0
+LOG_MAX_BYTES = 10 * 1024 * 1024
+LOG_BACKUP_COUNT = 5
+REVERSE_READ_CHUNK = 64 * 1024
+
+
+class JsonlLogWriter:
+    """
+    Append-only JSON Lines log. Each record is one line appended to an open
+    file, so a write costs the same however large the log is. A crash can cost
+    at most the unsynced tail, never the whole file. The file rotates to
+    .1 ... .N when it reaches `max_bytes`.
+    """
+
+    def __init__(self, path: str = LOG_FILE, fsync_policy: str = LOG_FSYNC_POLICY,
+                 fsync_interval: float = LOG_FSYNC_INTERVAL_SECONDS,
+                 max_bytes: int = LOG_MAX_BYTES, backup_count: int = LOG_BACKUP_COUNT):
+        if fsync_policy not in ("always", "interval", "never"):
+            raise ValueError(f"Unknown fsync policy '{fsync_policy}'")
+        self.path = path
+        self.fsync_policy = fsync_policy
+        self.fsync_interval = fsync_interval
+        self.max_bytes = max_bytes
+        self.backup_count = backup_count
+        self._lock = threading.Lock()
+        self._file = None
+        self._size = 0
+        self._last_fsync = time.monotonic()
+
+    def _open(self):
+        if self._file is None:
+            self._file = open(self.path, "ab")
+            self._size = self._file.tell()
+            if self._size and not _ends_with_newline(self.path):
+                # Terminate a torn line left by a crash so the next record starts clean
+                self._file.write(b"\n")
+                self._size += 1
+
+    def _rotate(self):
+        self._file.close()
+        self._file = None
+        for index in range(self.backup_count - 1, 0, -1):
+            src = f"{self.path}.{index}"
+            if os.path.exists(src):
+                os.replace(src, f"{self.path}.{index + 1}")
+        if self.backup_count > 0:
+            os.replace(self.path, f"{self.path}.1")
+        else:
+            os.remove(self.path)
+        self._open()
+
+    def append(self, record: dict):
+        line = (json.dumps(record, default=str) + "\n").encode("utf-8")
+        with self._lock:
+            self._open()
+            if self._size and self._size + len(line) > self.max_bytes:
+                self._rotate()
+            self._file.write(line)
+            self._size += len(line)
+            self._file.flush()
+            now = time.monotonic()
+            if self.fsync_policy == "always" or (
+                    self.fsync_policy == "interval" and now - self._last_fsync >= self.fsync_interval):
+                os.fsync(self._file.fileno())
+                self._last_fsync = now
+
+    def close(self):
+        """Flush, fsync and close; with the interval policy the tail is otherwise only synced by a later append."""
+        with self._lock:
+            if self._file is not None:
+                self._file.flush()
+                os.fsync(self._file.fileno())
+                self._file.close()
+                self._file = None
+
+    def iter_latest(self, limit: Optional[int] = None) -> Iterator[dict]:
+        """Yield records newest first, reading files backwards without loading them whole."""
+        with self._lock:
+            if self._file is not None:
+                self._file.flush()
+        paths = [self.path] + [f"{self.path}.{i}" for i in range(1, self.backup_count + 1)]
+        count = 0
+        for path in paths:
+            if not os.path.exists(path):
+                continue
+            for line in _read_lines_reversed(path):
+                try:
+                    record = json.loads(line)
+                except ValueError:
+                    continue  # torn line from an interrupted write
+                yield record
+                count += 1
+                if limit is not None and count >= limit:
+                    return
+
+
+def _ends_with_newline(path: str) -> bool:
+    with open(path, "rb") as f:
+        f.seek(-1, os.SEEK_END)
+        return f.read(1) == b"\n"
+
+
+def _read_lines_reversed(path: str) -> Iterator[bytes]:
+    with open(path, "rb") as f:
+        f.seek(0, os.SEEK_END)
+        position = f.tell()
+        remainder = b""
+        while position > 0:
+            step = min(REVERSE_READ_CHUNK, position)
+            position -= step
+            f.seek(position)
+            lines = (f.read(step) + remainder).split(b"\n")
+            remainder = lines.pop(0)  # may be the tail of a line that starts in an earlier chunk
+            for line in reversed(lines):
+                if line.strip():
+                    yield line
+        if remainder.strip():
+            yield remainder
+
+
+anomaly_log_writer = JsonlLogWriter()
 
 
 def save_to_disk(log: AnomalyLog):
-    try:
-        with open(LOG_FILE, "r") as f:
-            existing = json.load(f)
-    except:
-        existing = []
-
-    existing.insert(0, log.dict())
-    with open(LOG_FILE, "w") as f:
-        json.dump(existing, f, indent=2)
+    anomaly_log_writer.append(log.dict())
+
+
+def load_latest_from_disk(limit: int = 100) -> List[dict]:
+    return list(anomaly_log_writer.iter_latest(limit))
@@ -0,0 +1,166 @@
+# model_registry.py
+#
+# Versioned IsolationForest artifacts trained offline (python -m app.model.train_models).
+# Layout under MODEL_DIR:
+#   manifest.json               {"version", "created_at", "models": {name: {"file", "features", ...}}}
+#   <version>/<name>.joblib     {"model": estimator, "background": ndarray}
+# Artifacts are loaded with mmap_mode="r", but only the `background` array
+# stays memory-mapped: sklearn's Tree.__setstate__ copies each tree's node and
+# value arrays into its own memory, so every worker holds a private copy of
+# each forest. Workers preload the current version at startup so the first
+# request doesn't pay for that load.
+
+import json
+import logging
+import os
+import shutil
+import threading
+import time
+from datetime import datetime
+from typing import Dict, Optional
+
+logger = logging.getLogger(__name__)
+
+MODEL_DIR = os.getenv("MODEL_DIR", "models")
+MANIFEST_FILE = "manifest.json"
+MANIFEST_CHECK_SECONDS = 5
+MODEL_VERSIONS_KEPT = 3
+
+
+class ModelRegistry:
+    """
+    Serves artifacts named in the current manifest. The manifest is re-read
+    at most every `check_interval` seconds, and only when its mtime changed.
+    A new version drops the loaded artifacts so the next get() loads the new
+    files. Callers fall back to in-process training when get() returns None.
+    """
+
+    def __init__(self, model_dir: str = MODEL_DIR, check_interval: float = MANIFEST_CHECK_SECONDS):
+        self.model_dir = model_dir
+        self.check_interval = check_interval
+        self._manifest: Optional[dict] = None
+        self._manifest_mtime: Optional[float] = None
+        self._checked_at = 0.0
+        self._artifacts: Dict[str, dict] = {}
+        self._lock = threading.Lock()
+        self.stats = {"loads": 0, "reloads": 0, "load_errors": 0}
+
+    @property
+    def manifest_path(self) -> str:
+        return os.path.join(self.model_dir, MANIFEST_FILE)
+
+    @property
+    def version(self) -> Optional[str]:
+        self._check_manifest()
+        return self._manifest["version"] if self._manifest else None
+
+    def _check_manifest(self):
+        now = time.monotonic()
+        if now - self._checked_at < self.check_interval:
+            return
+        self._checked_at = now
+        try:
+            mtime = os.stat(self.manifest_path).st_mtime
+        except FileNotFoundError:
+            mtime = None
+        if mtime == self._manifest_mtime:
+            return
+        with self._lock:
+            manifest = None
+            if mtime is not None:
+                try:
+                    with open(self.manifest_path) as f:
+                        manifest = json.load(f)
+                except (OSError, ValueError) as e:
+                    logger.error(f"Unreadable model manifest {self.manifest_path}: {e}")
+                    self.stats["load_errors"] += 1
+                    return
+            previous = self._manifest["version"] if self._manifest else None
+            self._manifest, self._manifest_mtime = manifest, mtime
+            if manifest and manifest["version"] != previous:
+                if previous is not None:
+                    self.stats["reloads"] += 1
+                logger.info(f"Model manifest version {manifest['version']} (was {previous})")
+            self._artifacts = {}
+
+    def get(self, name: str) -> Optional[dict]:
+        """Return {"model", "background", "features", "version"} for `name`, or None if absent."""
+        self._check_manifest()
+        artifact = self._artifacts.get(name)
+        if artifact is not None:
+            return artifact
+        manifest = self._manifest
+        entry = manifest["models"].get(name) if manifest else None
+        if entry is None:
+            return None
+        with self._lock:
+            artifact = self._artifacts.get(name)
+            if artifact is None:
+                import joblib
+
+                path = os.path.join(self.model_dir, entry["file"])
+                try:
+                    payload = joblib.load(path, mmap_mode="r")
+                except Exception as e:
+                    logger.error(f"Failed to load model artifact {path}: {e}")
+                    self.stats["load_errors"] += 1
+                    return None
+                artifact = {**payload, "features": entry["features"], "version": manifest["version"]}
+                if self._manifest is manifest:
+                    self._artifacts[name] = artifact
+                self.stats["loads"] += 1
+        return artifact
+
+    def preload(self) -> list:
+        """Load every artifact in the current manifest now; returns the names loaded."""
+        self._check_manifest()
+        names = sorted(self._manifest["models"]) if self._manifest else []
+        return [name for name in names if self.get(name) is not None]
+
+    def get_status(self) -> dict:
+        self._check_manifest()
+        return {
+            **self.stats,
+            "model_dir": self.model_dir,
+            "version": self._manifest["version"] if self._manifest else None,
+            "available": sorted(self._manifest["models"]) if self._manifest else [],
+            "loaded": sorted(self._artifacts),
+        }
+
+
+def save_models(models: Dict[str, dict], model_dir: str = MODEL_DIR, metadata: dict = None) -> dict:
+    """
+    Write a new model version. `models` maps name -> {"model", "background", "features"}.
+    Artifacts go to a fresh version directory. The manifest is swapped in
+    atomically last, so running workers never see a half-written version.
+    """
+    import joblib
+
+    version = datetime.utcnow().strftime("%Y%m%d%H%M%S%f")
+    version_dir = os.path.join(model_dir, version)
+    os.makedirs(version_dir, exist_ok=True)
+
+    entries = {}
+    for name, spec in models.items():
+        file_name = os.path.join(version, f"{name}.joblib")
+        # Uncompressed so numpy arrays can be memory-mapped on load
+        joblib.dump({"model": spec["model"], "background": spec["background"]},
+                    os.path.join(model_dir, file_name))
+        entries[name] = {"file": file_name, "features": list(spec["features"]),
+                         "training_rows": int(len(spec["background"]))}
+
+    manifest = {"version": version, "created_at": datetime.utcnow().isoformat(),
+                "models": entries, **(metadata or {})}
+    tmp_path = os.path.join(model_dir, MANIFEST_FILE + ".tmp")
+    with open(tmp_path, "w") as f:
+        json.dump(manifest, f, indent=2)
+    os.replace(tmp_path, os.path.join(model_dir, MANIFEST_FILE))
+
+    versions = sorted(d for d in os.listdir(model_dir)
+                      if os.path.isdir(os.path.join(model_dir, d)) and d.isdigit())
+    for old in versions[:-MODEL_VERSIONS_KEPT]:
+        shutil.rmtree(os.path.join(model_dir, old), ignore_errors=True)
+    return manifest
+
+
+model_registry = ModelRegistry()
@@ -0,0 +1,80 @@
+"""
+Train the IsolationForest detectors offline and publish them as a new model
+version for the running API to pick up.
+
+    python -m app.model.train_models                      # seeded synthetic data
+    python -m app.model.train_models --source dynamodb    # recent readings from the sensor tables
+"""
+
+import argparse
+import logging
+
+import pandas as pd
+
+from app.model.model_registry import MODEL_DIR, save_models
+from app.simulate_attacks.ml_evasion_detector import EVASION_MODEL_NAME, build_evasion_model, normal_sensor_data
+from app.simulate_attacks.shap_engine import TRAINING_ROWS, RANDOM_SEED, _training_frame, build_model, input_features
+
+logger = logging.getLogger(__name__)
+
+MIN_TABLE_ROWS = 50
+
+
+def _item_time(item: dict) -> str:
+    # ISO timestamps sort chronologically as strings; undated items count as the oldest
+    return str(item.get("timestamp") or item.get("updated_at") or "")
+
+
+def load_table_frame(sensor_type: str, rows: int):
+    """
+    Feature frame of the `rows` most recent readings in the sensor type's
+    DynamoDB table, or None if it holds too few readings.
+    """
+    from app.sensors.generic_sensors import TABLE_MAP
+    from app.utils.dynamodb_helper import scan_table
+
+    features = input_features[sensor_type]
+    items = [item for item in scan_table(TABLE_MAP[sensor_type]) if all(f in item for f in features)]
+    if len(items) < MIN_TABLE_ROWS:
+        return None
+    # Scan order is by partition hash, not time
+    items = sorted(items, key=_item_time)[-rows:]
+    return pd.DataFrame([[float(item[f]) for f in features] for item in items], columns=features)
+
+
+def train_all(source: str, rows: int) -> dict:
+    models = {}
+    for sensor_type, features in input_features.items():
+        df = load_table_frame(sensor_type, rows) if source == "dynamodb" else None
+        if df is None:
+            if source == "dynamodb":
+                logger.warning(f"Not enough {sensor_type} readings in DynamoDB, using synthetic data")
+            df = _training_frame(sensor_type, rows)
+        # SHAP only needs a small background sample, not the whole training set
+        background = df.sample(min(len(df), TRAINING_ROWS), random_state=RANDOM_SEED).to_numpy()
+        models[sensor_type] = {"model": build_model(df), "background": background, "features": features}
+        logger.info(f"Trained {sensor_type} model on {len(df)} rows")
+
+    models[EVASION_MODEL_NAME] = {
+        "model": build_evasion_model(normal_sensor_data),
+        "background": normal_sensor_data,
+        "features": ["value"],
+    }
+    return models
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Train and publish IsolationForest model artifacts")
+    parser.add_argument("--source", choices=["synthetic", "dynamodb"], default="synthetic")
+    parser.add_argument("--rows", type=int, default=TRAINING_ROWS, help="training rows per sensor type")
+    parser.add_argument("--model-dir", default=MODEL_DIR)
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO)
+    manifest = save_models(train_all(args.source, args.rows), args.model_dir,
+                           metadata={"source": args.source, "rows": args.rows})
+    print(f"✅ Published model version {manifest['version']} to {args.model_dir}")
+
+
+if __name__ == "__main__":
+    main()
@@ -1,23 +1,32 @@
 #
 from datetime import datetime
 
-import boto3
-from fastapi import APIRouter, HTTPException
+from fastapi import APIRouter, HTTPException, Query, WebSocket, WebSocketDisconnect, status
 import random
 import asyncio
-from statistics import mean
 import logging
+from typing import Optional
 
-from starlette.responses import JSONResponse
+from starlette.responses import JSONResponse, Response
 
-from app.simulate_attacks.attack_log import get_attack_logs
-from app.simulate_attacks.sensor_simulation_attack import cache_sensor_ids, _alerts_cache
-from app.utils.dynamodb_helper import put_item
+from app.simulate_attacks.attack_log import (
+    get_attack_logs, attack_logs, DEFAULT_READ_LIMIT, ATTACK_LOG_CAPACITY
+)
+from app.simulate_attacks.sensor_simulation_attack import cache_sensor_ids, record_drift, _alerts_cache
+from app.simulate_attacks.drift_detector import observe_reading
+from app.utils.write_pipeline import SensorWritePipeline
+from app.utils.dynamodb_helper import delete_all_items
+from app.utils.metrics import refresh_cycle_duration, registry
+from app.utils.shared_state import Lease, call_state, get_shared_state
+from app.utils.utils import authenticate_websocket
+from app.sensors.sensor_stream import sensor_stream
 from app.model.basic_sensor_model import (
     SoilData, AtmosphericData, WaterData, ThreatData, PlantData
 )
-from app.cache.sensor_cache import sensor_id_cache, latest_data_cache
-from statistics import mean, StatisticsError
+from app.cache.sensor_aggregates import sensor_aggregates
+from app.cache.sensor_cache import (
+    sensor_registry, latest_data_cache, reading_history, update_sensor_id_cache_from_data
+)
 
 
 sensor_router = APIRouter()
@@ -25,9 +34,17 @@ anomaly_logs = []
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
+write_pipeline = SensorWritePipeline()
+registry.register_collector("write_pipeline", write_pipeline.get_stats)
+registry.register_collector("sensor_stream", sensor_stream.get_stats)
+registry.register_collector("sensor_registry", sensor_registry.get_stats)
+registry.register_collector("sensor_aggregates", sensor_aggregates.stats)
+_last_published = {}  # sensor_id -> last reading pushed to stream subscribers
+_aggregated_cycles = {}  # sensor_type -> readings last folded into this worker's state
+# With several workers sharing state, only the lease holder generates and writes readings
+refresh_lease = Lease(get_shared_state(), "sensor_refresh_leader", ttl_seconds=15)
+
 DYNAMODB_TABLE = "lx-fta-audit-logs"
-dynamodb = boto3.resource("dynamodb", region_name="us-east-1")
-table = dynamodb.Table(DYNAMODB_TABLE)
 
 TABLE_MAP = {
     "soil": "lx-fta-soil-data",
@@ -64,7 +81,6 @@ def generate_soil_sensor(index: int) -> SoilData:
         status=random.choice(sensor_status["soil"]),
         updated_at=datetime.utcnow().isoformat()
     )
-    put_item(TABLE_MAP["soil"], item.dict())
     return item
 
 
@@ -80,7 +96,6 @@ def generate_atmospheric_sensor(index: int) -> AtmosphericData:
         status=random.choice(sensor_status["atmospheric"]),
         updated_at=datetime.utcnow().isoformat()
     )
-    put_item(TABLE_MAP["atmospheric"], item.dict())
     return item
 
 
@@ -96,7 +111,6 @@ def generate_water_sensor(index: int) -> WaterData:
         status=random.choice(sensor_status["water"]),
         updated_at=datetime.utcnow().isoformat()
     )
-    put_item(TABLE_MAP["water"], item.dict())
     return item
 
 
@@ -112,7 +126,6 @@ def generate_plant_sensor(index: int) -> PlantData:
         status=random.choice(sensor_status["plant"]),
         updated_at=datetime.utcnow().isoformat()
     )
-    put_item(TABLE_MAP["plant"], item.dict())
     return item
 
 
@@ -128,27 +141,80 @@ def generate_threat_sensor(index: int) -> ThreatData:
         status=random.choice(sensor_status["threat"]),
         updated_at=datetime.utcnow().isoformat()
     )
-    put_item(TABLE_MAP["threat"], item.dict())
     return item
 
 
 # Cache Refresher
 
-def update_sensor_id_cache():
-    sensor_id_cache.clear()
-    for sensor_list in latest_data_cache.values():
-        for sensor in sensor_list:
-            sensor_id_cache.add(sensor.sensor_id)
+def update_sensor_id_cache(data):
+    # Swap in a new snapshot rather than clearing and refilling the shared set
+    update_sensor_id_cache_from_data(data)
+
+
+SENSOR_GENERATORS = {
+    "soil": generate_soil_sensor,
+    "atmospheric": generate_atmospheric_sensor,
+    "water": generate_water_sensor,
+    "plant": generate_plant_sensor,
+    "threat": generate_threat_sensor
+}
+
+
+def publish_cycle_delta(data):
+    """Push only the readings that changed since the last cycle to stream subscribers."""
+    changed = {}
+    for sensor_type, items in data.items():
+        for item in items:
+            reading = item.dict()
+            if _last_published.get(item.sensor_id) != reading:
+                _last_published[item.sensor_id] = reading
+                changed.setdefault(sensor_type, []).append(reading)
+    if changed:
+        sensor_stream.publish("sensors", {"changed": changed, "averages": sensor_aggregates.averages()})
+
+
+def fold_cycle(sensor_type: str, readings: list):
+    """Feed one cycle of readings to this worker's aggregates, history and drift detectors."""
+    _aggregated_cycles[sensor_type] = readings
+    sensor_aggregates.update(sensor_type, readings)
+    reading_history[sensor_type].extend(readings)
+    for item in readings:
+        record_drift(item.sensor_id, observe_reading(sensor_type, item))
+
+
+def sync_aggregates_from_cache(data):
+    """Fold cycles generated by the lease holder into this worker's state, once per cycle."""
+    for sensor_type, items in data.items():
+        if items and _aggregated_cycles.get(sensor_type) != items:
+            fold_cycle(sensor_type, items)
 
 
 async def refresh_sensor_data():
     while True:
-        latest_data_cache["soil"] = [generate_soil_sensor(i) for i in range(5)]
-        latest_data_cache["atmospheric"] = [generate_atmospheric_sensor(i) for i in range(5)]
-        latest_data_cache["water"] = [generate_water_sensor(i) for i in range(5)]
-        latest_data_cache["plant"] = [generate_plant_sensor(i) for i in range(5)]
-        latest_data_cache["threat"] = [generate_threat_sensor(i) for i in range(5)]
-        update_sensor_id_cache()
+        if not await call_state(refresh_lease.acquire):
+            # Another worker generates this cycle; pick up its readings for our registry, averages and subscribers
+            data = await call_state(lambda: dict(latest_data_cache.items()))
+            update_sensor_id_cache(data)
+            sync_aggregates_from_cache(data)
+            publish_cycle_delta(data)
+            await asyncio.sleep(5)
+            continue
+        with refresh_cycle_duration.labels("generate").time():
+            cycle = {}
+            for sensor_type, generate in SENSOR_GENERATORS.items():
+                readings = cycle[sensor_type] = [generate(i) for i in range(5)]
+                fold_cycle(sensor_type, readings)
+                for item in readings:
+                    write_pipeline.add(TABLE_MAP[sensor_type], item)
+            await call_state(latest_data_cache.update, cycle)
+            update_sensor_id_cache(cycle)
+            publish_cycle_delta(cycle)
+        try:
+            # Batched per table and run on worker threads, so HTTP/WebSocket traffic keeps flowing
+            with refresh_cycle_duration.labels("flush").time():
+                await write_pipeline.flush()
+        except Exception:
+            logger.exception("Sensor write pipeline flush failed")
         await asyncio.sleep(5)
 
 
@@ -162,13 +228,18 @@ async def get_sensor_types():
     await cache_sensor_ids()
     return {
         "sensor_types": ["soil", "water", "plant", "atmospheric", "threat"],
-        "sensor_ids": list(sensor_id_cache)
+        "sensor_ids": list(sensor_registry.snapshot())
     }
 
 
 @sensor_router.get("/api/sensor-ids")
 def list_sensor_ids():
-    return {"sensor_ids": list(sensor_id_cache)}
+    return {"sensor_ids": list(sensor_registry.snapshot())}
+
+
+@sensor_router.get("/api/sensor-registry/stats")
+def get_sensor_registry_stats():
+    return sensor_registry.get_stats()
 
 
 @sensor_router.get("/api/attack-types")
@@ -209,46 +280,61 @@ def get_attack_types():
 
 @sensor_router.get("/api/averages")
 def get_sensor_averages():
-    def compute_averages(data: list[dict], fields: list[str]):
-        averages = {}
-        for field in fields:
-            try:
-                values = [d.get(field) for d in data if isinstance(d.get(field), (int, float))]
-                if not values:
-                    averages[field] = None
-                else:
-                    averages[field] = round(mean(values), 2)
-            except StatisticsError:
-                averages[field] = None
-            except Exception as e:
-                print(f"⚠️ Error computing field '{field}':", e)
-                averages[field] = None
-        return averages
+    # Prebuilt by the refresh loop; the read cost doesn't grow with sensor count
+    return Response(content=sensor_aggregates.averages_json(), media_type="application/json")
+
+
+@sensor_router.get("/api/averages/stats")
+def get_sensor_average_stats():
+    return sensor_aggregates.stats()
+
+
+@sensor_router.get("/api/write-pipeline/stats")
+def get_write_pipeline_stats():
+    return write_pipeline.get_stats()
 
+
+@sensor_router.websocket("/ws/stream")
+async def sensor_stream_websocket(websocket: WebSocket):
+    user = await authenticate_websocket(websocket)
+    if not user:
+        return
+
+    subscriber = sensor_stream.subscribe()
     try:
-        return {
-            "soil": compute_averages([d.dict() for d in latest_data_cache.get("soil", [])],
-                                     ["temperature", "moisture", "ph", "nutrient_level"]),
-            "atmospheric": compute_averages([d.dict() for d in latest_data_cache.get("atmospheric", [])],
-                                            ["air_temperature", "humidity", "co2", "wind_speed", "rainfall"]),
-            "water": compute_averages([d.dict() for d in latest_data_cache.get("water", [])],
-                                      ["flow_rate", "water_level", "salinity", "ph", "turbidity"]),
-            "plant": compute_averages([d.dict() for d in latest_data_cache.get("plant", [])],
-                                      ["leaf_moisture", "chlorophyll_level", "growth_rate", "disease_risk",
-                                       "stem_diameter"]),
-            "threat": compute_averages([d.dict() for d in latest_data_cache.get("threat", [])],
-                                       ["unauthorized_access", "jamming_signal", "tampering_attempts",
-                                        "spoofing_attempts", "anomaly_score"])
-        }
-    except Exception as e:
-        print("❌ Failed to compute sensor averages:", e)
-        raise HTTPException(status_code=500, detail="Failed to compute sensor averages")
+        # Full state first, then refresh-cycle deltas, new logs and alerts as they happen
+        sensors, alerts, last_log_seq = await call_state(
+            lambda: (latest_data_cache.items(), _alerts_cache.recent(10), attack_logs.last_seq))
+        await websocket.send_json({
+            "type": "snapshot",
+            "data": {
+                "sensors": {t: [item.dict() for item in items] for t, items in sensors},
+                "averages": sensor_aggregates.averages(),
+                "alerts": alerts,
+                "last_log_seq": last_log_seq
+            }
+        })
+        while True:
+            message = await subscriber.next_message()
+            if message is None:
+                await websocket.close(code=status.WS_1013_TRY_AGAIN_LATER)
+                break
+            await websocket.send_text(message)
+    except WebSocketDisconnect:
+        pass
+    finally:
+        sensor_stream.unsubscribe(subscriber)
+
+
+@sensor_router.get("/api/stream/stats")
+def get_stream_stats():
+    return sensor_stream.get_stats()
 
 
 @sensor_router.get("/api/logs")
-def fetch_logs():
+def fetch_logs(since: Optional[int] = None, limit: int = Query(DEFAULT_READ_LIMIT, ge=1, le=ATTACK_LOG_CAPACITY)):
     try:
-        return {"logs": get_attack_logs()}
+        return {"logs": get_attack_logs(since, limit), "last_seq": attack_logs.last_seq}
     except Exception as e:
         logger.exception("Failed to fetch logs")
         raise HTTPException(status_code=500, detail="Error fetching logs")
@@ -265,7 +351,7 @@ def get_latest_alerts():
                     "message": "Simulated live alert",
                     "level": "info"
                 })
-        return JSONResponse(content={"alerts": _alerts_cache[-10:]})
+        return JSONResponse(content={"alerts": _alerts_cache.recent(10)})
     except Exception as e:
         logger.exception("Failed to get alerts")
         raise HTTPException(status_code=500, detail="Error fetching alerts")
@@ -283,7 +369,7 @@ def get_sensor_data(sensor_type: str):
 # Validation Function
 
 def validate_sensor_id(sensor_id: str):
-    if sensor_id not in sensor_id_cache:
+    if not sensor_registry.contains(sensor_id):
         raise HTTPException(status_code=400, detail="Invalid sensor ID")
     return True
 
@@ -291,18 +377,8 @@ def validate_sensor_id(sensor_id: str):
 @sensor_router.delete("/api/logs", tags=["Logs"])
 def delete_all_logs():
     try:
-        # Scan all items (NOTE: expensive for large tables)
-        response = table.scan()
-        items = response.get("Items", [])
-
-        with table.batch_writer() as batch:
-            for item in items:
-                batch.delete_item(
-                    Key={
-                        "id": item["id"],
-                        "timestamp": item["timestamp"]
-                    }
-                )
-        return {"message": f"{len(items)} logs deleted successfully."}
+        # Scans every page, reading only the key attributes (NOTE: still expensive for large tables)
+        deleted = delete_all_items(DYNAMODB_TABLE, ["id", "timestamp"])
+        return {"message": f"{deleted} logs deleted successfully."}
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
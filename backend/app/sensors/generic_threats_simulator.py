@@ -1,7 +1,10 @@
-from fastapi import APIRouter, WebSocket
+from anyio import from_thread
+from fastapi import APIRouter, Query, WebSocket
 from app.model.models import SensorData
 from app.detector.detector import detect_spoofing, detect_replay
-from app.model.database import anomaly_logs
+from app.model.database import anomaly_logs, save_to_disk, load_latest_from_disk
+from app.simulate_attacks.drift_detector import drift_detectors
+from app.simulate_attacks.sensor_simulation_attack import record_drift
 from typing import List
 
 router = APIRouter()
@@ -9,13 +12,19 @@ router = APIRouter()
 
 @router.post("/sensor/threat")
 def simulate_sensor(data: SensorData):
+    drifted = drift_detectors["metric"].update(data.sensor_id, [data.metric])
+    if drifted:
+        # Handler runs on a worker thread; alerts are published from the event loop
+        from_thread.run_sync(record_drift, data.sensor_id, drifted)
     log1 = detect_spoofing(data)
     if log1:
         anomaly_logs.append(log1)
+        save_to_disk(log1)
         return log1
     log2 = detect_replay(data)
     if log2:
         anomaly_logs.append(log2)
+        save_to_disk(log2)
         return log2
     return {"message": "No anomaly detected"}
 
@@ -25,6 +34,12 @@ def get_anomalies():
     return [log.dict() for log in anomaly_logs]
 
 
+@router.get("/anomalies/latest", response_model=List[dict])
+def get_latest_anomalies(limit: int = Query(100, ge=1, le=10000)):
+    # Newest first from the JSONL log, so it covers history from before this process started
+    return load_latest_from_disk(limit)
+
+
 # @router.websocket("/ws/alerts")
 # async def alert_websocket(websocket: WebSocket):
 #     await websocket.accept()
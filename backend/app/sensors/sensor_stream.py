@@ -0,0 +1,73 @@
+# sensor_stream.py
+
+import asyncio
+import json
+import logging
+from typing import Optional, Set
+
+logger = logging.getLogger(__name__)
+
+STREAM_CLIENT_QUEUE_SIZE = 32
+
+
+class StreamSubscriber:
+    """One connected client. A None message tells the sender loop it was dropped."""
+
+    def __init__(self, queue_size: int):
+        self.queue: asyncio.Queue = asyncio.Queue(maxsize=queue_size)
+        self.dropped = False
+
+    async def next_message(self) -> Optional[str]:
+        return await self.queue.get()
+
+
+class StreamBroadcaster:
+    """
+    Fans each event out to every subscriber. Events are serialized once and
+    offered to per-client bounded queues; a client whose queue is full is
+    dropped instead of making the publisher wait on it.
+    """
+
+    def __init__(self, queue_size: int = STREAM_CLIENT_QUEUE_SIZE):
+        self.queue_size = queue_size
+        self._subscribers: Set[StreamSubscriber] = set()
+        self._seq = 0
+        self.stats = {"published": 0, "delivered": 0, "dropped_clients": 0}
+
+    def subscribe(self) -> StreamSubscriber:
+        subscriber = StreamSubscriber(self.queue_size)
+        self._subscribers.add(subscriber)
+        return subscriber
+
+    def unsubscribe(self, subscriber: StreamSubscriber):
+        self._subscribers.discard(subscriber)
+
+    def publish(self, event_type: str, data) -> int:
+        if not self._subscribers:
+            return 0
+        self._seq += 1
+        message = json.dumps({"type": event_type, "seq": self._seq, "data": data}, default=str)
+        self.stats["published"] += 1
+        for subscriber in list(self._subscribers):
+            try:
+                subscriber.queue.put_nowait(message)
+                self.stats["delivered"] += 1
+            except asyncio.QueueFull:
+                self._drop(subscriber)
+        return self._seq
+
+    def _drop(self, subscriber: StreamSubscriber):
+        self.unsubscribe(subscriber)
+        subscriber.dropped = True
+        self.stats["dropped_clients"] += 1
+        # Make room for the sentinel so the client's sender loop wakes up and closes
+        while not subscriber.queue.empty():
+            subscriber.queue.get_nowait()
+        subscriber.queue.put_nowait(None)
+        logger.info("Dropped slow stream subscriber")
+
+    def get_stats(self) -> dict:
+        return {**self.stats, "subscribers": len(self._subscribers), "queue_size": self.queue_size}
+
+
+sensor_stream = StreamBroadcaster()
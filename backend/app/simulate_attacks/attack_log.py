@@ -1,13 +1,103 @@
 # attack_log.py
 
-from typing import List
+import json
+from collections import deque
+from itertools import islice
+from typing import List, Optional
 from datetime import datetime
 
-attack_logs: List[dict] = []
+from app.utils.shared_state import select_state
 
+ATTACK_LOG_CAPACITY = 5000  # oldest entries are dropped once the ring buffer is full
+DEFAULT_READ_LIMIT = 1500  # limit return for performance
 
-def log_attack(sensor_id: str, attack_type: str, message: str, severity: str = "High"):
-    attack_logs.insert(0, {
+
+class AttackLogBuffer:
+    """
+    Bounded ring buffer of attack events. Every entry gets a monotonically
+    increasing `seq` so pollers can ask for only what they have not seen yet.
+    """
+
+    def __init__(self, capacity: int = ATTACK_LOG_CAPACITY):
+        self._entries = deque(maxlen=capacity)
+        self._last_seq = 0
+
+    @property
+    def last_seq(self) -> int:
+        return self._last_seq
+
+    def append(self, entry: dict) -> dict:
+        self._last_seq += 1
+        entry["seq"] = self._last_seq
+        self._entries.append(entry)
+        return entry
+
+    def read(self, since: Optional[int] = None, limit: int = DEFAULT_READ_LIMIT) -> List[dict]:
+        """Return up to `limit` entries newer than `since`, newest first."""
+        if limit <= 0:
+            return []
+        newest_first = reversed(self._entries)
+        if since is None or since > self._last_seq:
+            # No cursor, or one from before a restart: start over from the newest entries
+            return list(islice(newest_first, limit))
+        # Entries are stored in seq order, so the new ones sit at the right end
+        new_count = min(max(self._last_seq - since, 0), len(self._entries))
+        return list(islice(newest_first, min(new_count, limit)))
+
+    def clear(self):
+        self._entries.clear()
+
+
+class SharedAttackLogBuffer:
+    """
+    AttackLogBuffer's interface over a SharedState. `seq` comes from one shared
+    counter, and entries go to a capped list. Two workers can push in the
+    opposite order to the seqs they took, so reads fetch a little slack and
+    sort by seq.
+    """
+
+    READ_SLACK = 32
+
+    def __init__(self, state, capacity: int = ATTACK_LOG_CAPACITY, prefix: str = "attack_logs"):
+        self.state = state
+        self.capacity = capacity
+        self._seq_key = f"{prefix}:seq"
+        self._entries_key = f"{prefix}:entries"
+
+    @property
+    def last_seq(self) -> int:
+        return int(self.state.execute("GET", self._seq_key) or 0)
+
+    def append(self, entry: dict) -> dict:
+        entry["seq"] = self.state.execute("INCR", self._seq_key)
+        self.state.pipeline([("RPUSH", self._entries_key, json.dumps(entry)),
+                             ("LTRIM", self._entries_key, -self.capacity, -1)])
+        return entry
+
+    def read(self, since: Optional[int] = None, limit: int = DEFAULT_READ_LIMIT) -> List[dict]:
+        if limit <= 0:
+            return []
+        last_seq = self.last_seq
+        if since is None or since > last_seq:
+            since, wanted = 0, limit
+        else:
+            wanted = min(max(last_seq - since, 0), limit)
+            if not wanted:
+                return []
+        raw = self.state.execute("LRANGE", self._entries_key, -(wanted + self.READ_SLACK), -1)
+        entries = [e for e in map(json.loads, raw) if e["seq"] > since]
+        entries.sort(key=lambda e: e["seq"], reverse=True)
+        return entries[:limit]
+
+    def clear(self):
+        self.state.execute("DEL", self._entries_key)
+
+
+attack_logs = select_state(AttackLogBuffer, SharedAttackLogBuffer)
+
+
+def log_attack(sensor_id: str, attack_type: str, message: str, severity: str = "High") -> dict:
+    return attack_logs.append({
         "timestamp": datetime.utcnow().isoformat(),
         "sensor_id": sensor_id,
         "attack_type": attack_type,
@@ -16,5 +106,5 @@ def log_attack(sensor_id: str, attack_type: str, message: str, severity: str = "
     })
 
 
-def get_attack_logs() -> List[dict]:
-    return attack_logs[:1500]  # limit return for performance
+def get_attack_logs(since: Optional[int] = None, limit: int = DEFAULT_READ_LIMIT) -> List[dict]:
+    return attack_logs.read(since, limit)
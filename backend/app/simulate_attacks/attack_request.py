@@ -3,3 +3,8 @@ from pydantic import BaseModel
 
 class AttackRequest(BaseModel):
     sensor_id: str
+
+
+class DdosRequest(BaseModel):
+    sensor_id: str
+    threshold: int = 10
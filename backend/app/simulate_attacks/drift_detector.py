@@ -0,0 +1,175 @@
+# drift_detector.py
+#
+# Online per-sensor drift detection. Each sensor owns one row ("slot") in a set
+# of NumPy arrays holding an EWMA mean/variance and two-sided Page-Hinkley
+# accumulators per feature. An update is O(1) per reading and memory per sensor
+# is constant, so clients never resend history windows. The slot table is capped
+# and reuses the least recently updated sensor's row, so client-supplied IDs
+# cannot grow it without bound.
+
+import threading
+from collections import OrderedDict
+from typing import Dict, Iterable, List, Optional, Sequence
+
+import numpy as np
+
+from app.simulate_attacks.shap_engine import input_features
+
+DRIFT_EWMA_ALPHA = 0.01  # baseline adapts slowly so sustained shifts accumulate
+DRIFT_PH_DELTA = 0.5  # tolerated deviation, in standard deviations
+DRIFT_PH_THRESHOLD = 20.0  # cumulative deviation (in std units) that raises an alarm
+DRIFT_WARMUP_READINGS = 30
+DRIFT_INITIAL_SLOTS = 64
+DRIFT_MAX_SENSORS = 10_000  # per detector; ~250 bytes per sensor at five features
+_EPS = 1e-9
+_STATE_ARRAYS = ("_count", "_alarms", "_mean", "_var", "_ph_up", "_ph_up_min", "_ph_down", "_ph_down_max")
+
+
+class StreamingDriftDetector:
+    """
+    Drift detector for one feature schema. Until `warmup` readings have been
+    seen, the baseline is the plain running mean/variance. After that it is an
+    EWMA. Each reading is standardized against the baseline from before the
+    update. The resulting z-scores drive Page-Hinkley tests for upward and
+    downward shifts. A feature's accumulators reset once it alarms.
+    """
+
+    def __init__(self, features: Sequence[str], alpha: float = DRIFT_EWMA_ALPHA,
+                 delta: float = DRIFT_PH_DELTA, threshold: float = DRIFT_PH_THRESHOLD,
+                 warmup: int = DRIFT_WARMUP_READINGS, initial_slots: int = DRIFT_INITIAL_SLOTS,
+                 max_sensors: int = DRIFT_MAX_SENSORS):
+        self.features = list(features)
+        self.alpha = alpha
+        self.delta = delta
+        self.threshold = threshold
+        self.warmup = warmup
+        self.max_sensors = max_sensors
+        self._slots: "OrderedDict[str, int]" = OrderedDict()  # least recently updated first
+        self._lock = threading.Lock()
+        self._allocate(min(initial_slots, max_sensors))
+        self.stats = {"updates": 0, "alarms": 0, "evicted": 0}
+
+    def _allocate(self, capacity: int):
+        width = len(self.features)
+        old = getattr(self, "_count", None)
+        arrays = {
+            "_count": np.zeros(capacity, dtype=np.int64),
+            "_alarms": np.zeros(capacity, dtype=np.int64),
+            "_mean": np.zeros((capacity, width)),
+            "_var": np.zeros((capacity, width)),
+            "_ph_up": np.zeros((capacity, width)),
+            "_ph_up_min": np.zeros((capacity, width)),
+            "_ph_down": np.zeros((capacity, width)),
+            "_ph_down_max": np.zeros((capacity, width)),
+        }
+        for name, array in arrays.items():
+            if old is not None:
+                previous = getattr(self, name)
+                array[:len(previous)] = previous
+            setattr(self, name, array)
+
+    def _slot(self, sensor_id: str) -> int:
+        slot = self._slots.get(sensor_id)
+        if slot is not None:
+            self._slots.move_to_end(sensor_id)
+            return slot
+        if len(self._slots) >= self.max_sensors:
+            # Full: the least recently updated sensor gives up its row and starts over if it returns
+            _, slot = self._slots.popitem(last=False)
+            for name in _STATE_ARRAYS:
+                getattr(self, name)[slot] = 0
+            self.stats["evicted"] += 1
+        else:
+            slot = len(self._slots)
+            if slot >= len(self._count):
+                self._allocate(min(len(self._count) * 2, self.max_sensors))
+        self._slots[sensor_id] = slot
+        return slot
+
+    def update(self, sensor_id: str, values: Iterable[float]) -> List[str]:
+        """Fold one reading into the sensor's state; return the features that drifted."""
+        x = np.asarray(values, dtype=float)
+        with self._lock:
+            slot = self._slot(sensor_id)
+            n = self._count[slot]
+            mean = self._mean[slot].copy()
+            var = self._var[slot].copy()
+            drifted = []
+
+            if n >= self.warmup:
+                z = (x - mean) / np.sqrt(var + _EPS)
+                up = self._ph_up[slot] + z - self.delta
+                down = self._ph_down[slot] + z + self.delta
+                up_min = np.minimum(self._ph_up_min[slot], up)
+                down_max = np.maximum(self._ph_down_max[slot], down)
+                alarm = (up - up_min > self.threshold) | (down_max - down > self.threshold)
+                if alarm.any():
+                    up[alarm] = up_min[alarm] = down[alarm] = down_max[alarm] = 0.0
+                    drifted = [self.features[i] for i in np.flatnonzero(alarm)]
+                    self._alarms[slot] += 1
+                    self.stats["alarms"] += 1
+                self._ph_up[slot], self._ph_up_min[slot] = up, up_min
+                self._ph_down[slot], self._ph_down_max[slot] = down, down_max
+
+            n += 1
+            a = max(self.alpha, 1.0 / n)
+            diff = x - mean
+            increment = a * diff
+            self._mean[slot] = mean + increment
+            self._var[slot] = (1 - a) * (var + diff * increment)
+            self._count[slot] = n
+            self.stats["updates"] += 1
+        return drifted
+
+    def state(self, sensor_id: str) -> Optional[dict]:
+        slot = self._slots.get(sensor_id)
+        if slot is None:
+            return None
+        return {
+            "readings": int(self._count[slot]),
+            "alarms": int(self._alarms[slot]),
+            "warmed_up": bool(self._count[slot] >= self.warmup),
+            "features": {
+                f: {"mean": round(float(self._mean[slot, i]), 4), "std": round(float(np.sqrt(self._var[slot, i])), 4)}
+                for i, f in enumerate(self.features)
+            }
+        }
+
+    def get_stats(self) -> dict:
+        return {
+            **self.stats,
+            "sensors": len(self._slots),
+            "slots": len(self._count),
+            "max_sensors": self.max_sensors,
+            "state_bytes": sum(getattr(self, n).nbytes for n in _STATE_ARRAYS),
+        }
+
+
+# One detector per feature schema: each sensor type, plus the single-value
+# streams from /sensor/threat ("metric") and /simulate/ml_evasion ("value")
+drift_detectors: Dict[str, StreamingDriftDetector] = {
+    **{sensor_type: StreamingDriftDetector(features) for sensor_type, features in input_features.items()},
+    "metric": StreamingDriftDetector(["metric"]),
+    "value": StreamingDriftDetector(["value"]),
+}
+
+
+def observe_reading(sensor_type: str, reading) -> List[str]:
+    """Feed a typed sensor reading (Pydantic model or dict) to its type's detector."""
+    detector = drift_detectors[sensor_type]
+    if isinstance(reading, dict):
+        return detector.update(reading["sensor_id"], [reading[f] for f in detector.features])
+    return detector.update(reading.sensor_id, [getattr(reading, f) for f in detector.features])
+
+
+def drift_message(sensor_id: str, drifted: List[str]) -> str:
+    return f"🟠 Drift detected on {sensor_id}: {', '.join(drifted)}"
+
+
+def get_drift_stats() -> dict:
+    return {stream: detector.get_stats() for stream, detector in drift_detectors.items()}
+
+
+def get_sensor_drift_state(sensor_id: str) -> dict:
+    return {stream: state for stream, detector in drift_detectors.items()
+            if (state := detector.state(sensor_id)) is not None}
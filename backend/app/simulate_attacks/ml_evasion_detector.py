@@ -1,8 +1,18 @@
+import logging
+import threading
+import time
 import numpy as np
 from sklearn.ensemble import IsolationForest
 from pydantic import BaseModel
-from typing import List
+from typing import Dict, List, Optional
 from datetime import datetime
+
+from app.cache.sensor_cache import reading_history
+from app.model.model_registry import model_registry
+from app.simulate_attacks.shap_engine import input_features
+
+logger = logging.getLogger(__name__)
+
 # ----------------------
 # Simulated Training Data (Normal Sensor Behavior)
 # ----------------------
@@ -11,13 +21,119 @@ normal_sensor_data = np.array([
     [22.2], [22.4], [21.7], [22.0], [22.3]
 ])
 
-# Train Isolation Forest on normal data
-model = IsolationForest(contamination=0.1, random_state=42)
-model.fit(normal_sensor_data)
+EVASION_MODEL_NAME = "ml_evasion"
+_fallback_model: Optional[IsolationForest] = None
+
+
+def build_evasion_model(training_data: np.ndarray = normal_sensor_data) -> IsolationForest:
+    # Train Isolation Forest on normal data
+    clf = IsolationForest(contamination=0.1, random_state=42)
+    clf.fit(training_data)
+    return clf
+
+
+def get_evasion_model() -> IsolationForest:
+    """The published ml_evasion artifact if there is one, else a model trained in-process on first use."""
+    global _fallback_model
+    artifact = model_registry.get(EVASION_MODEL_NAME)
+    if artifact is not None:
+        return artifact["model"]
+    if _fallback_model is None:
+        _fallback_model = build_evasion_model()
+    return _fallback_model
+
+
+DRIFT_MIN_TRAINING_ROWS = 50
+DRIFT_RETRAIN_SECONDS = 300
+
+
+class TypeDriftModels:
+    """
+    One IsolationForest per sensor type, trained on that type's recent readings
+    from `reading_history`. A model is (re)trained on demand once enough history
+    exists, and again after `retrain_seconds` so it tracks the live data.
+    """
+
+    def __init__(self, min_rows: int = DRIFT_MIN_TRAINING_ROWS, retrain_seconds: float = DRIFT_RETRAIN_SECONDS):
+        self.min_rows = min_rows
+        self.retrain_seconds = retrain_seconds
+        self._models: Dict[str, tuple] = {}  # sensor_type -> (model, trained_at, training_rows)
+        self._lock = threading.Lock()
+
+    def _history_matrix(self, sensor_type: str) -> np.ndarray:
+        features = input_features[sensor_type]
+        readings = list(reading_history[sensor_type])
+        return np.array([[getattr(r, f) for f in features] for r in readings], dtype=float).reshape(-1, len(features))
+
+    def get(self, sensor_type: str) -> Optional[IsolationForest]:
+        entry = self._models.get(sensor_type)
+        if entry is not None and time.monotonic() - entry[1] < self.retrain_seconds:
+            return entry[0]
+        with self._lock:
+            entry = self._models.get(sensor_type)
+            if entry is not None and time.monotonic() - entry[1] < self.retrain_seconds:
+                return entry[0]
+            history = self._history_matrix(sensor_type)
+            if len(history) < self.min_rows:
+                # Keep serving a stale model, or the published artifact, rather than none at all
+                if entry is not None:
+                    return entry[0]
+                artifact = model_registry.get(sensor_type)
+                if artifact is not None and artifact["features"] == input_features[sensor_type]:
+                    return artifact["model"]
+                return None
+            clf = IsolationForest(contamination=0.1, random_state=42)
+            clf.fit(history)
+            self._models[sensor_type] = (clf, time.monotonic(), len(history))
+            logger.info(f"Trained {sensor_type} drift model on {len(history)} readings")
+            return clf
+
+    def score(self, sensor_type: str, matrix: np.ndarray) -> Optional[np.ndarray]:
+        """decision_function scores for a feature matrix; negative means anomalous."""
+        clf = self.get(sensor_type)
+        if clf is None:
+            return None
+        if hasattr(clf, "feature_names_in_"):
+            import pandas as pd
+
+            matrix = pd.DataFrame(matrix, columns=clf.feature_names_in_)
+        return clf.decision_function(matrix)
+
+    def get_stats(self) -> dict:
+        now = time.monotonic()
+        return {
+            sensor_type: {"training_rows": rows, "age_seconds": round(now - trained_at, 1)}
+            for sensor_type, (_, trained_at, rows) in self._models.items()
+        }
+
+
+type_drift_models = TypeDriftModels()
+
+
+def score_value_series(series: List[List[float]]) -> List[float]:
+    """
+    Score many sensors' value lists against the generic model in one
+    decision_function call. Returns each sensor's lowest (most anomalous) score.
+    """
+    lengths = np.array([len(values) for values in series])
+    scores = get_evasion_model().decision_function(np.concatenate(series).reshape(-1, 1))
+    offsets = np.concatenate(([0], np.cumsum(lengths)[:-1]))
+    return np.minimum.reduceat(scores, offsets).tolist()
 
 # ----------------------
 # Input schema
 # ----------------------
 class SensorReading(BaseModel):
     sensor_id: str
-    values: List[float]  # recent time-series sensor values
\ No newline at end of file
+    values: List[float]  # recent time-series sensor values
+
+
+class DriftReading(BaseModel):
+    sensor_id: str
+    sensor_type: Optional[str] = None  # score `features` against this type's history-trained model
+    values: Optional[List[float]] = None  # or score a raw value series against the generic model
+    features: Optional[Dict[str, float]] = None
+
+
+class DriftBatchRequest(BaseModel):
+    readings: List[DriftReading]
@@ -0,0 +1,168 @@
+# rate_limiter.py
+
+import heapq
+import time
+import uuid
+from collections import defaultdict, deque
+from typing import Callable, Deque, Dict, List, Optional, Tuple
+
+
+class SlidingWindowRateLimiter:
+    """
+    Per-sensor request counter over a sliding time window.
+
+    Each sensor keeps a deque of monotonic timestamps; expired ones are popped
+    from the left, so a request costs amortized O(1) regardless of window size.
+    Block expiry is tracked in a min-heap and only the due entries are touched.
+    """
+
+    def __init__(self, window_seconds: float = 10, block_seconds: float = 60,
+                 clock: Callable[[], float] = time.monotonic):
+        self.window_seconds = window_seconds
+        self.block_seconds = block_seconds
+        self._clock = clock
+        self._hits: Dict[str, Deque[float]] = defaultdict(deque)
+        self._blocked_until: Dict[str, float] = {}
+        self._expiry_heap: List[Tuple[float, str]] = []
+
+    def _trim(self, sensor_id: str, now: float) -> Deque[float]:
+        hits = self._hits[sensor_id]
+        cutoff = now - self.window_seconds
+        while hits and hits[0] < cutoff:
+            hits.popleft()
+        return hits
+
+    def _expire_blocks(self, now: float):
+        heap = self._expiry_heap
+        while heap and heap[0][0] <= now:
+            expiry, sensor_id = heapq.heappop(heap)
+            # A sensor may have been re-blocked since this entry was pushed
+            if self._blocked_until.get(sensor_id) == expiry:
+                del self._blocked_until[sensor_id]
+
+    def block_remaining(self, sensor_id: str) -> Optional[float]:
+        """Seconds left on the sensor's block, or None if it is not blocked."""
+        now = self._clock()
+        self._expire_blocks(now)
+        expiry = self._blocked_until.get(sensor_id)
+        return expiry - now if expiry is not None else None
+
+    def hit(self, sensor_id: str) -> int:
+        """Record a request and return the number of requests in the current window."""
+        now = self._clock()
+        hits = self._trim(sensor_id, now)
+        hits.append(now)
+        return len(hits)
+
+    def block(self, sensor_id: str) -> float:
+        """Block the sensor for `block_seconds` and return the remaining block time."""
+        expiry = self._clock() + self.block_seconds
+        self._blocked_until[sensor_id] = expiry
+        heapq.heappush(self._expiry_heap, (expiry, sensor_id))
+        return self.block_seconds
+
+    def current_rate(self, sensor_id: str) -> float:
+        """Requests per second over the sliding window."""
+        if sensor_id not in self._hits:
+            return 0.0
+        return len(self._trim(sensor_id, self._clock())) / self.window_seconds
+
+    def rates(self) -> Dict[str, dict]:
+        now = self._clock()
+        self._expire_blocks(now)
+        snapshot = {}
+        for sensor_id in list(self._hits):
+            count = len(self._trim(sensor_id, now))
+            if not count and sensor_id not in self._blocked_until:
+                del self._hits[sensor_id]
+                continue
+            expiry = self._blocked_until.get(sensor_id)
+            snapshot[sensor_id] = {
+                "requests_in_window": count,
+                "rate_per_second": round(count / self.window_seconds, 3),
+                "blocked_for_seconds": round(expiry - now, 1) if expiry is not None else 0
+            }
+        return snapshot
+
+
+class SharedRateLimiter:
+    """
+    SlidingWindowRateLimiter's interface over a SharedState, so every worker
+    counts into the same window. Each sensor's hits form a sorted set scored by
+    wall-clock time, trimmed and counted in the same atomic pipeline that adds
+    the hit. A block is a key that expires when the block ends.
+    """
+
+    def __init__(self, state, window_seconds: float = 10, block_seconds: float = 60,
+                 prefix: str = "ddos", clock: Callable[[], float] = time.time):
+        self.state = state
+        self.window_seconds = window_seconds
+        self.block_seconds = block_seconds
+        self.prefix = prefix
+        self._clock = clock
+        self._sensors_key = f"{prefix}:sensors"
+
+    def _hits_key(self, sensor_id: str) -> str:
+        return f"{self.prefix}:hits:{sensor_id}"
+
+    def _block_key(self, sensor_id: str) -> str:
+        return f"{self.prefix}:block:{sensor_id}"
+
+    def _trim(self, sensor_id: str, now: float) -> tuple:
+        # Same cutoff as the local limiter: hits older than the window go, hits exactly on it stay
+        return ("ZREMRANGEBYSCORE", self._hits_key(sensor_id), "-inf", f"({now - self.window_seconds!r}")
+
+    def block_remaining(self, sensor_id: str) -> Optional[float]:
+        expiry = self.state.execute("GET", self._block_key(sensor_id))
+        if expiry is None:
+            return None
+        remaining = float(expiry) - self._clock()
+        return remaining if remaining > 0 else None
+
+    def hit(self, sensor_id: str) -> int:
+        now = self._clock()
+        key = self._hits_key(sensor_id)
+        results = self.state.pipeline([
+            self._trim(sensor_id, now),
+            ("ZADD", key, repr(now), f"{now!r}:{uuid.uuid4().hex[:12]}"),
+            ("ZCARD", key),
+            ("PEXPIRE", key, int(self.window_seconds * 1000) + 1000),
+            ("SADD", self._sensors_key, sensor_id),
+        ])
+        return results[2]
+
+    def block(self, sensor_id: str) -> float:
+        expiry = self._clock() + self.block_seconds
+        self.state.execute("SET", self._block_key(sensor_id), repr(expiry), "PX", int(self.block_seconds * 1000))
+        return self.block_seconds
+
+    def current_rate(self, sensor_id: str) -> float:
+        now = self._clock()
+        count = self.state.pipeline([self._trim(sensor_id, now), ("ZCARD", self._hits_key(sensor_id))])[1]
+        return count / self.window_seconds
+
+    def rates(self) -> Dict[str, dict]:
+        now = self._clock()
+        sensor_ids = self.state.execute("SMEMBERS", self._sensors_key)
+        if not sensor_ids:
+            return {}
+        commands = []
+        for sensor_id in sensor_ids:
+            commands += [self._trim(sensor_id, now), ("ZCARD", self._hits_key(sensor_id)),
+                         ("GET", self._block_key(sensor_id))]
+        results = self.state.pipeline(commands)
+        snapshot, idle = {}, []
+        for i, sensor_id in enumerate(sensor_ids):
+            count, expiry = results[3 * i + 1], results[3 * i + 2]
+            remaining = float(expiry) - now if expiry is not None else 0
+            if not count and remaining <= 0:
+                idle.append(sensor_id)
+                continue
+            snapshot[sensor_id] = {
+                "requests_in_window": count,
+                "rate_per_second": round(count / self.window_seconds, 3),
+                "blocked_for_seconds": round(max(remaining, 0), 1)
+            }
+        if idle:
+            self.state.execute("SREM", self._sensors_key, *idle)
+        return snapshot
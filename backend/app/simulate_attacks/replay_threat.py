@@ -1,13 +1,14 @@
-from typing import Set
-
 from pydantic import BaseModel
 from datetime import datetime, timedelta
 
+from app.cache.nonce_store import nonce_store, is_fresh, NONCE_FRESHNESS_SECONDS
+
 # -----------------------------
 # Replay Protection Structures
 # -----------------------------
-USED_NONCES: Set[str] = set()
-NONCE_EXPIRY_SECONDS = 30
+# Bounded, time-bucketed store shared with the threat detector
+USED_NONCES = nonce_store
+NONCE_EXPIRY_SECONDS = NONCE_FRESHNESS_SECONDS
 
 
 class ReplayRequest(BaseModel):
@@ -19,8 +20,6 @@ class ReplayRequest(BaseModel):
 
 def is_fresh_timestamp(ts: str) -> bool:
     try:
-        sent_time = datetime.fromisoformat(ts)
-        now = datetime.utcnow()
-        return abs((now - sent_time).total_seconds()) < NONCE_EXPIRY_SECONDS
+        return is_fresh(datetime.fromisoformat(ts))
     except ValueError:
         return False
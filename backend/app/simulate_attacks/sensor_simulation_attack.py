@@ -1,46 +1,57 @@
 import uuid
 
 from fastapi import APIRouter, Request, HTTPException, Body
-from fastapi.responses import JSONResponse
-from typing import List, Dict
+from fastapi.responses import JSONResponse, StreamingResponse
+from pydantic import ValidationError
+from typing import Any, List, Dict, FrozenSet, Optional
 from datetime import datetime, timedelta
 from collections import defaultdict
 import asyncio
 import hashlib
+import json
 import numpy as np
 import logging
 from concurrent.futures import ThreadPoolExecutor
 
 from app.simulate_attacks.attack_log import log_attack, get_attack_logs
-from app.simulate_attacks.attack_request import AttackRequest
+from app.simulate_attacks.attack_request import AttackRequest, DdosRequest
 from app.simulate_attacks.FirmwareUpload import FirmwareUpload
-from app.simulate_attacks.ml_evasion_detector import SensorReading, model
+from app.simulate_attacks.ml_evasion_detector import (
+    SensorReading, DriftBatchRequest, get_evasion_model, type_drift_models, score_value_series
+)
+from app.simulate_attacks.shap_engine import input_features
+from app.simulate_attacks.drift_detector import (
+    drift_detectors, drift_message, get_drift_stats, get_sensor_drift_state
+)
 from app.simulate_attacks.spoofing_threat import SpoofingRequest, validate_ecc
 from app.simulate_attacks.replay_threat import ReplayRequest, is_fresh_timestamp, USED_NONCES
-from app.cache.sensor_cache import sensor_id_cache
-from app.utils.dynamodb_helper import put_item, scan_table
+from app.simulate_attacks.rate_limiter import SlidingWindowRateLimiter, SharedRateLimiter
+from app.cache.sensor_cache import sensor_registry
+from app.sensors.sensor_stream import sensor_stream
+from app.utils.dynamodb_helper import fetch_sensor_ids_from_table
+from app.utils.audit_writer import AuditLogWriter
+from app.utils.metrics import model_inference_duration, registry
+from app.utils.shared_state import CappedList, SharedCappedList, call_state, select_state, submit_state
 
-from datetime import datetime, timedelta
-from fastapi import APIRouter, Request, HTTPException
-from collections import defaultdict
-import logging
-
-router = APIRouter()
+logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
-_ddos_window = defaultdict(list)
-_ddos_blocklist = defaultdict(lambda: None)  # Maps sensor_id to block expiration timestamp
-
 BLOCK_DURATION_SECONDS = 60  # Block for 60 seconds if DDoS detected
+DDOS_WINDOW_SECONDS = 10
 
 router = APIRouter()
 executor = ThreadPoolExecutor()
-_ddos_window: Dict[str, List[datetime]] = defaultdict(list)
-_alerts_cache = []
+ddos_limiter = select_state(
+    lambda: SlidingWindowRateLimiter(window_seconds=DDOS_WINDOW_SECONDS, block_seconds=BLOCK_DURATION_SECONDS),
+    lambda state: SharedRateLimiter(state, window_seconds=DDOS_WINDOW_SECONDS, block_seconds=BLOCK_DURATION_SECONDS))
+ALERTS_CACHE_LIMIT = 100
+_alerts_cache = select_state(lambda: CappedList(ALERTS_CACHE_LIMIT),
+                             lambda state: SharedCappedList(state, "alerts", ALERTS_CACHE_LIMIT))
 DDB_LOG_TABLE = "lx-fta-audit-logs"
-
-logging.basicConfig(level=logging.INFO)
-logger = logging.getLogger(__name__)
+DRIFT_BATCH_LIMIT = 1000
+audit_writer = AuditLogWriter(DDB_LOG_TABLE)
+registry.register_collector("audit_writer", audit_writer.get_stats)
+registry.register_collector("nonce_store", USED_NONCES.get_stats)
 
 
 # Fetch all sensor IDs from DynamoDB tables
@@ -52,42 +63,95 @@ async def fetch_all_sensor_ids_from_tables():
         "lx-fta-atmospheric-data",
         "lx-fta-threat-data"
     ]
-    sensor_ids = set()
+    # Each table is scanned in parallel segments, projecting only sensor_id
+    stats = {}
     loop = asyncio.get_event_loop()
-    tasks = [loop.run_in_executor(executor, scan_table, table) for table in table_names]
+    tasks = [loop.run_in_executor(executor, fetch_sensor_ids_from_table, table, stats) for table in table_names]
     results = await asyncio.gather(*tasks)
-    for items in results:
-        for item in items:
-            if "sensor_id" in item:
-                sensor_ids.add(item["sensor_id"])
+    sensor_ids = set().union(*results)
+    logger.info(f"Sensor ID scan: {len(sensor_ids)} IDs from {stats.get('items', 0)} items in "
+                f"{stats.get('pages', 0)} pages, {stats.get('capacity_units', 0.0)} RCU consumed")
     return sensor_ids
 
 
-# Fetch valid sensor IDs only once into cache
+sensor_registry.set_loader(fetch_all_sensor_ids_from_tables)
+
+
+# Wait for the first registry load if it hasn't landed yet; never starts a scan per request
 async def cache_sensor_ids():
-    if not sensor_id_cache:
-        valid_ids = await fetch_all_sensor_ids_from_tables()
-        sensor_id_cache.update(valid_ids)
+    await sensor_registry.ensure_loaded()
 
 
 async def validate_sensor_id(sensor_id: str):
     await cache_sensor_ids()
-    if sensor_id not in sensor_id_cache:
+    if not sensor_registry.contains(sensor_id):
         raise HTTPException(status_code=400, detail="Invalid sensor ID")
     return True
 
 
-def persist_attack_log(sensor_id: str, attack_type: str, message: str, severity: str):
+def record_alert(sensor_id: str, message: str, level: str = "high"):
+    alert = {
+        "timestamp": datetime.utcnow().isoformat(),
+        "sensor_id": sensor_id,
+        "message": message,
+        "level": level
+    }
+    # Callers include sync code on the event loop; the shared write is queued rather than waited on
+    submit_state(_alerts_cache.append, alert)
+    sensor_stream.publish("alert", alert)
+
+
+def record_drift(sensor_id: str, drifted: List[str]):
+    if drifted:
+        record_alert(sensor_id, drift_message(sensor_id, drifted), level="medium")
+
+
+async def record_attack(sensor_id: str, attack_type: str, message: str, severity: str,
+                        timestamp: datetime = None) -> dict:
+    """Log and stream one evaluated attack; returns its audit entry."""
     log_entry = {
         "id": str(uuid.uuid4()),
-        "timestamp": datetime.utcnow().isoformat(),
+        "timestamp": (timestamp or datetime.utcnow()).isoformat(),
         "sensor_id": sensor_id,
         "attack_type": attack_type,
         "message": message,
         "severity": severity
     }
-    put_item(DDB_LOG_TABLE, log_entry)
-    log_attack(sensor_id, attack_type, message, severity)
+    sensor_stream.publish("log", await call_state(log_attack, sensor_id, attack_type, message, severity))
+    return log_entry
+
+
+async def persist_attack_log(sensor_id: str, attack_type: str, message: str, severity: str,
+                             timestamp: datetime = None):
+    # Queued for the background batch writer instead of a blocking put_item
+    await audit_writer.submit(await record_attack(sensor_id, attack_type, message, severity, timestamp))
+
+
+async def persist_attack_result(result: dict, timestamp: datetime):
+    await persist_attack_log(result["sensor_id"], result["attack_type"], result["message"], result["severity"],
+                             timestamp=timestamp)
+
+
+def attack_result(timestamp: datetime, sensor_id: str, attack_type: str, message: str, severity: str,
+                  blocked: bool) -> dict:
+    return {"timestamp": timestamp.isoformat(), "sensor_id": sensor_id, "attack_type": attack_type,
+            "message": message, "severity": severity, "blocked": blocked}
+
+
+@router.on_event("startup")
+async def start_audit_writer():
+    audit_writer.start()
+    asyncio.create_task(sensor_registry.maintain())
+
+
+@router.on_event("shutdown")
+async def flush_audit_writer():
+    await audit_writer.stop()
+
+
+@router.get("/simulate/audit/stats")
+def get_audit_writer_stats():
+    return audit_writer.get_stats()
 
 
 #
@@ -137,184 +201,462 @@ def persist_attack_log(sensor_id: str, attack_type: str, message: str, severity:
 #
 # BLOCK_DURATION_SECONDS = 60  # Block for 60 seconds if DDoS detected
 
-@router.post("/simulate/ddos")
-async def simulate_ddos_attack(request: Request):
-    try:
-        data = await request.json()
-        sensor_id = data.get("sensor_id")
-        threshold = data.get("threshold", 10)
+# ----------------------
+# Attack evaluators
+# ----------------------
+# Each takes an already validated request and returns the attack result without
+# persisting it, so the single-event routes and /simulate/batch share one logic.
+# evaluate_ddos and evaluate_replay read and write shared state, so async
+# callers run them through call_state.
+
+def evaluate_ddos(data: DdosRequest, now: datetime) -> dict:
+    # Check if sensor is currently blocked
+    block_remaining = ddos_limiter.block_remaining(data.sensor_id)
+    if block_remaining:
+        block_until = now + timedelta(seconds=block_remaining)
+        message = f"Blocked DDoS request — sensor_id {data.sensor_id} is under cooldown until {block_until.isoformat()}"
+        return attack_result(now, data.sensor_id, "ddos", message, "🛑 Blocked", True)
+
+    # Count requests within the sliding window
+    request_count = ddos_limiter.hit(data.sensor_id)
+
+    if request_count >= data.threshold:
+        message = f"DDoS attack detected — {request_count} requests (threshold: {data.threshold})"
+        severity = "🔴 High"
+        ddos_limiter.block(data.sensor_id)
+        blocked = True
+    else:
+        message = f"No DDoS detected — {request_count}/{data.threshold}"
+        severity = "✅ None"
+        blocked = False
+    return attack_result(now, data.sensor_id, "ddos", message, severity, blocked)
 
-        await validate_sensor_id(sensor_id)
-        now = datetime.utcnow()
 
-        # Clean up expired block entries
-        expired_ids = [sid for sid, expiry in _ddos_blocklist.items() if expiry and expiry <= now]
-        for sid in expired_ids:
-            del _ddos_blocklist[sid]
-
-        # Check if sensor is currently blocked
-        block_until = _ddos_blocklist.get(sensor_id)
-        if block_until and now < block_until:
-            message = f"Blocked DDoS request — sensor_id {sensor_id} is under cooldown until {block_until.isoformat()}"
-            severity = "🛑 Blocked"
-            put_item(DDB_LOG_TABLE, {
-                "timestamp": now.isoformat(),
-                "sensor_id": sensor_id,
-                "attack_type": "ddos",
-                "message": message,
-                "severity": severity
-            })
-            log_attack(sensor_id, "ddos", message, severity)
-            return {
-                "timestamp": now.isoformat(),
-                "sensor_id": sensor_id,
-                "attack_type": "ddos",
-                "message": message,
-                "severity": severity,
-                "blocked": True
-            }
-
-        # Update request timestamps within 10s window
-        _ddos_window[sensor_id].append(now)
-        _ddos_window[sensor_id] = [
-            t for t in _ddos_window[sensor_id] if (now - t).total_seconds() <= 10
-        ]
-        request_count = len(_ddos_window[sensor_id])
-
-        if request_count >= threshold:
-            message = f"DDoS attack detected — {request_count} requests (threshold: {threshold})"
-            severity = "🔴 High"
-            _ddos_blocklist[sensor_id] = now + timedelta(seconds=BLOCK_DURATION_SECONDS)
-            blocked = True
-        else:
-            message = f"No DDoS detected — {request_count}/{threshold}"
-            severity = "✅ None"
-            blocked = False
+def evaluate_spoofing(data: SpoofingRequest, now: datetime) -> dict:
+    is_invalid = not validate_ecc(data.sensor_id, data.payload, data.ecc_signature)
+    message = "🔴 Spoofing attack simulated — ECC Signature Mismatch" if is_invalid else "✅ Signature appears valid"
+    severity = "High" if is_invalid else "None"
+    return attack_result(now, data.sensor_id, "spoofing", message, severity, is_invalid)
 
-        # Log to DynamoDB and internal log
-        put_item(DDB_LOG_TABLE, {
-            "timestamp": now.isoformat(),
-            "sensor_id": sensor_id,
-            "attack_type": "ddos",
-            "message": message,
-            "severity": severity
-        })
-        log_attack(sensor_id, "ddos", message, severity)
-
-        return {
-            "timestamp": now.isoformat(),
-            "sensor_id": sensor_id,
-            "attack_type": "ddos",
-            "message": message,
-            "severity": severity,
-            "blocked": blocked
-        }
 
+def evaluate_replay(req: ReplayRequest, now: datetime) -> dict:
+    if USED_NONCES.seen(req.nonce):
+        accepted = False
+    elif not is_fresh_timestamp(req.timestamp):
+        raise HTTPException(status_code=400, detail="Stale timestamp")
+    else:
+        # Claim atomically: with shared state another worker may have taken this nonce since `seen`
+        accepted = USED_NONCES.check_and_add(req.nonce)
+    if accepted:
+        message = "✅ Payload Accepted — Fresh Nonce"
+        severity = "None"
+    else:
+        message = "🔴 Replay Detected — Duplicate Nonce"
+        severity = "High"
+    blocked = not accepted
+    return attack_result(now, req.sensor_id, "replay", message, severity, blocked)
+
+
+def evaluate_firmware(data: FirmwareUpload, now: datetime) -> dict:
+    is_valid_signature = data.firmware_signature == "valid_signature_123"
+    message = "🔴 Firmware Rejected — Invalid Signature" if not is_valid_signature else "✅ Firmware Verified"
+    severity = "High" if not is_valid_signature else "None"
+    return attack_result(now, data.sensor_id, "firmware_injection", message, severity, not is_valid_signature)
+
+
+def evaluate_ml_evasion(data: SensorReading, preds: np.ndarray, now: datetime) -> dict:
+    """`preds` are the evasion model's predictions for `data.values`, computed by the caller."""
+    for value in data.values:
+        record_drift(data.sensor_id, drift_detectors["value"].update(data.sensor_id, [value]))
+    is_drift = bool((preds == -1).any())
+    message = "🔴 ML Evasion Attempt — Drift Detected" if is_drift else "✅ Sensor Stable — No Drift"
+    severity = "High" if is_drift else "None"
+    return attack_result(now, data.sensor_id, "ml_evasion", message, severity, is_drift)
+
+
+# Always-blocked simulations: attack_type -> message
+FIXED_ATTACK_MESSAGES = {
+    "sensor_hijack": "🔴 Sensor Hijack Attempt — Stream Manipulated",
+    "api_abuse": "🔴 API Abuse Detected — Unauthorized Access Pattern",
+    "tamper_breach": "🔴 Tamper Breach — Physical Layer Compromised",
+    "side_channel": "🔴 Side-Channel Leak — Timing/Data Access Exploited",
+}
+
+
+def evaluate_fixed_attack(attack_type: str, data: AttackRequest, now: datetime) -> dict:
+    return attack_result(now, data.sensor_id, attack_type, FIXED_ATTACK_MESSAGES[attack_type], "High", True)
+
+
+def predict_evasion(series: List[List[float]]) -> List[np.ndarray]:
+    """Evasion model predictions for many value lists in one predict call, split back per list."""
+    with model_inference_duration.labels("ml_evasion", "generic").time():
+        preds = get_evasion_model().predict(np.concatenate(series).reshape(-1, 1))
+    return np.split(preds, np.cumsum([len(values) for values in series])[:-1])
+
+
+@router.post("/simulate/ddos")
+async def simulate_ddos_attack(data: DdosRequest):
+    # Body validation (422) happens before the handler; an unknown sensor is a 400
+    await validate_sensor_id(data.sensor_id)
+    try:
+        now = datetime.utcnow()
+        result = await call_state(evaluate_ddos, data, now)
+        # Log to DynamoDB and internal log
+        await persist_attack_result(result, now)
+        return result
+    except HTTPException:
+        raise
     except Exception as e:
         logger.exception("DDoS simulation failed")
         raise HTTPException(status_code=500, detail=f"Failed to simulate DDoS attack: {e}")
 
 
 
+@router.get("/simulate/ddos/rates")
+def get_ddos_rates():
+    return {"window_seconds": DDOS_WINDOW_SECONDS, "sensors": ddos_limiter.rates()}
+
+
 @router.post("/simulate/spoofing")
 async def simulate_spoofing_attack(data: SpoofingRequest):
     await validate_sensor_id(data.sensor_id)
-    # expected_sig = hashlib.sha256((data.sensor_id + data.payload).encode()).hexdigest()
-
-    is_invalid = not validate_ecc(data.sensor_id, data.payload, data.ecc_signature)
-    # is_invalid = data.ecc_signature != expected_sig
-    message = "🔴 Spoofing attack simulated — ECC Signature Mismatch" if is_invalid else "✅ Signature appears valid"
-    severity = "High" if is_invalid else "None"
-    blocked = is_invalid
-    persist_attack_log(data.sensor_id, "spoofing", message, severity)
-    return {"timestamp": datetime.utcnow().isoformat(), "sensor_id": data.sensor_id, "attack_type": "spoofing",
-            "message": message, "severity": severity, "blocked": blocked}
+    now = datetime.utcnow()
+    result = evaluate_spoofing(data, now)
+    await persist_attack_result(result, now)
+    return result
 
 
 @router.post("/simulate/replay")
 async def simulate_replay_attack(req: ReplayRequest):
     await validate_sensor_id(req.sensor_id)
-    if req.nonce in USED_NONCES:
-        message = "🔴 Replay Detected — Duplicate Nonce"
-        severity = "High"
-        blocked = True
-    elif not is_fresh_timestamp(req.timestamp):
-        raise HTTPException(status_code=400, detail="Stale timestamp")
-    else:
-        USED_NONCES.add(req.nonce)
-        message = "✅ Payload Accepted — Fresh Nonce"
-        severity = "None"
-        blocked = False
-    persist_attack_log(req.sensor_id, "replay", message, severity)
-    return {"timestamp": datetime.utcnow().isoformat(), "sensor_id": req.sensor_id, "attack_type": "replay",
-            "message": message, "severity": severity, "blocked": blocked}
+    now = datetime.utcnow()
+    result = await call_state(evaluate_replay, req, now)
+    await persist_attack_result(result, now)
+    return result
+
+
+@router.get("/simulate/replay/nonce-stats")
+def get_nonce_stats():
+    return USED_NONCES.get_stats()
 
 
 @router.post("/simulate/firmware")
 async def simulate_firmware_attack(data: FirmwareUpload):
     await validate_sensor_id(data.sensor_id)
-    is_valid_signature = data.firmware_signature == "valid_signature_123"
-    message = "🔴 Firmware Rejected — Invalid Signature" if not is_valid_signature else "✅ Firmware Verified"
-    severity = "High" if not is_valid_signature else "None"
-    blocked = not is_valid_signature
-    persist_attack_log(data.sensor_id, "firmware_injection", message, severity)
-    return {"timestamp": datetime.utcnow().isoformat(), "sensor_id": data.sensor_id,
-            "attack_type": "firmware_injection", "message": message, "severity": severity, "blocked": blocked}
+    now = datetime.utcnow()
+    result = evaluate_firmware(data, now)
+    await persist_attack_result(result, now)
+    return result
 
 
 @router.post("/simulate/ml_evasion")
 async def simulate_ml_evasion_attack(data: SensorReading):
     await validate_sensor_id(data.sensor_id)
     readings = np.array(data.values).reshape(-1, 1)
-    preds = model.predict(readings)
-    is_drift = -1 in preds
-    message = "🔴 ML Evasion Attempt — Drift Detected" if is_drift else "✅ Sensor Stable — No Drift"
-    severity = "High" if is_drift else "None"
-    blocked = is_drift
-    persist_attack_log(data.sensor_id, "ml_evasion", message, severity)
-    return {"timestamp": datetime.utcnow().isoformat(), "sensor_id": data.sensor_id, "attack_type": "ml_evasion",
-            "message": message, "severity": severity, "blocked": blocked}
+    with model_inference_duration.labels("ml_evasion", "generic").time():
+        preds = get_evasion_model().predict(readings)
+    now = datetime.utcnow()
+    result = evaluate_ml_evasion(data, preds, now)
+    await persist_attack_result(result, now)
+    return result
+
+
+@router.post("/simulate/ml_evasion/batch")
+async def simulate_ml_evasion_batch(data: DriftBatchRequest):
+    """
+    Score many sensors for drift in one request. Readings with `values` are
+    stacked and scored by the generic model in a single call. Readings with
+    `sensor_type` and `features` are grouped per type and scored by that type's
+    history-trained model, one decision_function call per type.
+    """
+    readings = data.readings
+    if not readings:
+        raise HTTPException(status_code=400, detail="At least one reading is required")
+    if len(readings) > DRIFT_BATCH_LIMIT:
+        raise HTTPException(status_code=400, detail=f"At most {DRIFT_BATCH_LIMIT} readings per batch")
+
+    await cache_sensor_ids()
+    known_ids = sensor_registry.snapshot()
+    unknown = sorted({r.sensor_id for r in readings} - known_ids)
+    if unknown:
+        raise HTTPException(status_code=400, detail=f"Invalid sensor ID(s): {', '.join(unknown[:10])}")
+
+    generic_positions, generic_series = [], []
+    typed_groups = defaultdict(lambda: ([], []))  # sensor_type -> (input positions, feature rows)
+    for index, reading in enumerate(readings):
+        if reading.sensor_type is not None:
+            features = input_features.get(reading.sensor_type)
+            if features is None:
+                raise HTTPException(status_code=400, detail=f"Reading {index}: unsupported sensor type {reading.sensor_type}")
+            missing = [f for f in features if f not in (reading.features or {})]
+            if missing:
+                raise HTTPException(status_code=400, detail=f"Reading {index}: missing features {', '.join(missing)}")
+            positions, rows = typed_groups[reading.sensor_type]
+            positions.append(index)
+            rows.append([reading.features[f] for f in features])
+        elif reading.values:
+            generic_positions.append(index)
+            generic_series.append(reading.values)
+        else:
+            raise HTTPException(status_code=400, detail=f"Reading {index}: provide values or sensor_type with features")
+
+    # Online detectors see every reading once the batch has validated
+    for reading in readings:
+        if reading.sensor_type is not None:
+            record_drift(reading.sensor_id, drift_detectors[reading.sensor_type].update(
+                reading.sensor_id, [reading.features[f] for f in input_features[reading.sensor_type]]))
+        else:
+            for value in reading.values:
+                record_drift(reading.sensor_id, drift_detectors["value"].update(reading.sensor_id, [value]))
+
+    loop = asyncio.get_running_loop()
+    jobs = [loop.run_in_executor(executor, type_drift_models.score, t, np.array(rows, dtype=float))
+            for t, (_, rows) in typed_groups.items()]
+    if generic_series:
+        jobs.append(loop.run_in_executor(executor, score_value_series, generic_series))
+    with model_inference_duration.labels("ml_evasion_batch", "mixed").time():
+        scored = await asyncio.gather(*jobs)
+
+    scores = [None] * len(readings)
+    model_names = [None] * len(readings)
+    batches = [(positions, sensor_type) for sensor_type, (positions, _) in typed_groups.items()]
+    if generic_series:
+        batches.append((generic_positions, "generic"))
+    for (positions, model_name), group_scores in zip(batches, scored):
+        if group_scores is None:
+            continue  # not enough history yet to train this type's model
+        for index, score in zip(positions, group_scores):
+            scores[index] = round(float(score), 4)
+            model_names[index] = model_name
+
+    timestamp = datetime.utcnow()
+    results = []
+    log_jobs = []
+    for reading, score, model_name in zip(readings, scores, model_names):
+        if score is None:
+            results.append({"sensor_id": reading.sensor_id, "sensor_type": reading.sensor_type, "model": None,
+                            "score": None, "drift": None, "message": "Drift model not trained yet"})
+            continue
+        is_drift = score < 0
+        message = "🔴 ML Evasion Attempt — Drift Detected" if is_drift else "✅ Sensor Stable — No Drift"
+        severity = "High" if is_drift else "None"
+        results.append({"sensor_id": reading.sensor_id, "sensor_type": reading.sensor_type, "model": model_name,
+                        "score": score, "drift": is_drift, "message": message})
+        log_jobs.append(persist_attack_log(reading.sensor_id, "ml_evasion", message, severity, timestamp=timestamp))
+    await asyncio.gather(*log_jobs)
+
+    return {"timestamp": timestamp.isoformat(), "attack_type": "ml_evasion", "count": len(results),
+            "drifted": sum(1 for r in results if r["drift"]), "results": results}
+
+
+@router.get("/simulate/ml_evasion/models")
+def get_drift_models():
+    return type_drift_models.get_stats()
+
+
+@router.get("/simulate/drift/stats")
+def get_streaming_drift_stats():
+    return get_drift_stats()
+
+
+@router.get("/simulate/drift/{sensor_id}")
+def get_streaming_drift_state(sensor_id: str):
+    state = get_sensor_drift_state(sensor_id)
+    if not state:
+        raise HTTPException(status_code=404, detail="No drift state for this sensor")
+    return state
 
 
 @router.post("/simulate/sensor_hijack")
 async def simulate_sensor_hijack(data: AttackRequest):
     await validate_sensor_id(data.sensor_id)
-    message = "🔴 Sensor Hijack Attempt — Stream Manipulated"
-    severity = "High"
-    blocked = True
-    persist_attack_log(data.sensor_id, "sensor_hijack", message, severity)
-    return {"timestamp": datetime.utcnow().isoformat(), "sensor_id": data.sensor_id, "attack_type": "sensor_hijack",
-            "message": message, "severity": severity, "blocked": blocked}
+    now = datetime.utcnow()
+    result = evaluate_fixed_attack("sensor_hijack", data, now)
+    await persist_attack_result(result, now)
+    return result
 
 
 @router.post("/simulate/api_abuse")
 async def simulate_api_abuse(data: AttackRequest):
     await validate_sensor_id(data.sensor_id)
-    message = "🔴 API Abuse Detected — Unauthorized Access Pattern"
-    severity = "High"
-    blocked = True
-    persist_attack_log(data.sensor_id, "api_abuse", message, severity)
-    return {"timestamp": datetime.utcnow().isoformat(), "sensor_id": data.sensor_id, "attack_type": "api_abuse",
-            "message": message, "severity": severity, "blocked": blocked}
+    now = datetime.utcnow()
+    result = evaluate_fixed_attack("api_abuse", data, now)
+    await persist_attack_result(result, now)
+    return result
 
 
 @router.post("/simulate/tamper_breach")
 async def simulate_tamper_breach(data: AttackRequest):
     await validate_sensor_id(data.sensor_id)
-    message = "🔴 Tamper Breach — Physical Layer Compromised"
-    severity = "High"
-    blocked = True
-    persist_attack_log(data.sensor_id, "tamper_breach", message, severity)
-    return {"timestamp": datetime.utcnow().isoformat(), "sensor_id": data.sensor_id, "attack_type": "tamper_breach",
-            "message": message, "severity": severity, "blocked": blocked}
+    now = datetime.utcnow()
+    result = evaluate_fixed_attack("tamper_breach", data, now)
+    await persist_attack_result(result, now)
+    return result
 
 
 @router.post("/simulate/side_channel")
 async def simulate_side_channel(data: AttackRequest):
     await validate_sensor_id(data.sensor_id)
-    message = "🔴 Side-Channel Leak — Timing/Data Access Exploited"
-    severity = "High"
-    blocked = True
-    persist_attack_log(data.sensor_id, "side_channel", message, severity)
-    return {"timestamp": datetime.utcnow().isoformat(), "sensor_id": data.sensor_id, "attack_type": "side_channel",
-            "message": message, "severity": severity, "blocked": blocked}
+    now = datetime.utcnow()
+    result = evaluate_fixed_attack("side_channel", data, now)
+    await persist_attack_result(result, now)
+    return result
+
+
+# ----------------------
+# Bulk simulation
+# ----------------------
+ATTACK_BATCH_LIMIT = 10000
+ATTACK_BATCH_CHUNK_SIZE = 250
+ATTACK_BATCH_STREAM_THRESHOLD = 500  # larger batches stream NDJSON instead of one JSON body
+
+# Batch attack_type -> request model; keys match the /simulate/{attack} route names
+BATCH_REQUEST_MODELS = {
+    "ddos": DdosRequest,
+    "spoofing": SpoofingRequest,
+    "replay": ReplayRequest,
+    "firmware": FirmwareUpload,
+    "ml_evasion": SensorReading,
+    **{attack_type: AttackRequest for attack_type in FIXED_ATTACK_MESSAGES},
+}
+
+
+def _batch_error(index: int, attack_type, status_code: int, detail) -> dict:
+    return {"index": index, "attack_type": attack_type, "status_code": status_code, "error": detail}
+
+
+def _parse_batch_item(index: int, item, known_ids: FrozenSet[str]):
+    """(attack_type, request model) for a valid item, else a per-item error result."""
+    if not isinstance(item, dict):
+        return _batch_error(index, None, 422, "Each attack must be a JSON object")
+    attack_type = item.get("attack_type")
+    model_cls = BATCH_REQUEST_MODELS.get(attack_type)
+    if model_cls is None:
+        return _batch_error(index, attack_type, 422, f"Unknown attack_type, expected one of {list(BATCH_REQUEST_MODELS)}")
+    try:
+        data = model_cls.model_validate(item)
+    except ValidationError as e:
+        return _batch_error(index, attack_type, 422, "; ".join(
+            f"{'.'.join(str(loc) for loc in err['loc'])}: {err['msg']}" for err in e.errors()))
+    if data.sensor_id not in known_ids:
+        return _batch_error(index, attack_type, 400, "Invalid sensor ID")
+    if attack_type == "ml_evasion" and not data.values:
+        return _batch_error(index, attack_type, 422, "values: must not be empty")
+    return attack_type, data
+
+
+async def _evaluate_attack_chunk(start: int, items: List[Any], known_ids: FrozenSet[str]) -> List[dict]:
+    """Evaluate one chunk in order and queue its audit entries for the batch writer."""
+    parsed = [_parse_batch_item(start + offset, item, known_ids) for offset, item in enumerate(items)]
+
+    ml_positions = [i for i, p in enumerate(parsed) if isinstance(p, tuple) and p[0] == "ml_evasion"]
+    ml_preds = {}
+    if ml_positions:
+        # One predict call for every ml_evasion item in the chunk, off the event loop
+        series = [parsed[i][1].values for i in ml_positions]
+        try:
+            preds = await asyncio.get_running_loop().run_in_executor(executor, predict_evasion, series)
+            ml_preds = dict(zip(ml_positions, preds))
+        except Exception as e:
+            logger.exception("Batch ml_evasion prediction failed")
+            for i in ml_positions:
+                parsed[i] = _batch_error(start + i, "ml_evasion", 500, f"Prediction failed: {e}")
+
+    now = datetime.utcnow()
+    results = []
+    for offset, entry in enumerate(parsed):
+        if isinstance(entry, dict):
+            results.append(entry)
+            continue
+        attack_type, data = entry
+        try:
+            if attack_type == "ddos":
+                result = await call_state(evaluate_ddos, data, now)
+            elif attack_type == "spoofing":
+                result = evaluate_spoofing(data, now)
+            elif attack_type == "replay":
+                result = await call_state(evaluate_replay, data, now)
+            elif attack_type == "firmware":
+                result = evaluate_firmware(data, now)
+            elif attack_type == "ml_evasion":
+                result = evaluate_ml_evasion(data, ml_preds[offset], now)
+            else:
+                result = evaluate_fixed_attack(attack_type, data, now)
+            await audit_writer.submit(await record_attack(result["sensor_id"], result["attack_type"], result["message"],
+                                                          result["severity"], timestamp=now))
+        except HTTPException as e:
+            results.append(_batch_error(start + offset, attack_type, e.status_code, e.detail))
+            continue
+        except Exception as e:
+            # One failing attack must not abort the batch, or a streamed response that already sent 200
+            logger.exception(f"Batch attack {start + offset} ({attack_type}) failed")
+            results.append(_batch_error(start + offset, attack_type, 500, f"Simulation failed: {e}"))
+            continue
+        results.append({"index": start + offset, **result})
+    return results
+
+
+async def _iter_attack_results(items: List[Any], known_ids: FrozenSet[str]):
+    for start in range(0, len(items), ATTACK_BATCH_CHUNK_SIZE):
+        yield await _evaluate_attack_chunk(start, items[start:start + ATTACK_BATCH_CHUNK_SIZE], known_ids)
+
+
+def _batch_summary(results: List[dict]) -> dict:
+    return {"count": len(results), "blocked": sum(1 for r in results if r.get("blocked")),
+            "errors": sum(1 for r in results if "error" in r)}
+
+
+async def _read_batch_items(request: Request) -> List[Any]:
+    body = await request.body()
+    try:
+        if "ndjson" in request.headers.get("content-type", ""):
+            # A recorded campaign file, one attack per line
+            return [json.loads(line) for line in body.splitlines() if line.strip()]
+        payload = json.loads(body)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=f"Malformed batch body: {e}")
+    if isinstance(payload, dict):
+        payload = payload.get("attacks")
+    if not isinstance(payload, list):
+        raise HTTPException(status_code=400, detail="Expected a JSON array of attacks or {\"attacks\": [...]}")
+    return payload
+
+
+@router.post("/simulate/batch")
+async def simulate_attack_batch(request: Request, stream: Optional[bool] = None):
+    """
+    Simulate many heterogeneous attacks in one request. The body is a JSON
+    array (or {"attacks": [...]}) of single-route payloads, each with an
+    `attack_type`, or an application/x-ndjson campaign with one per line.
+    Sensor IDs are checked against one registry snapshot, each attack runs
+    the same evaluator as its own route, and audit entries are queued for the
+    batch writer. Invalid items get a per-item error instead of failing the
+    batch. Batches over ATTACK_BATCH_STREAM_THRESHOLD (or `?stream=true`)
+    stream one NDJSON result line per attack, then a summary line.
+    """
+    items = await _read_batch_items(request)
+    if not items:
+        raise HTTPException(status_code=400, detail="At least one attack is required")
+    if len(items) > ATTACK_BATCH_LIMIT:
+        raise HTTPException(status_code=400, detail=f"At most {ATTACK_BATCH_LIMIT} attacks per batch")
+
+    await cache_sensor_ids()
+    known_ids = sensor_registry.snapshot()
+
+    if stream is None:
+        stream = len(items) > ATTACK_BATCH_STREAM_THRESHOLD
+    if stream:
+        async def ndjson_lines():
+            summary = {"count": 0, "blocked": 0, "errors": 0}
+            async for chunk in _iter_attack_results(items, known_ids):
+                for key, value in _batch_summary(chunk).items():
+                    summary[key] += value
+                yield "".join(json.dumps(result) + "\n" for result in chunk)
+            yield json.dumps({"summary": summary}) + "\n"
+
+        return StreamingResponse(ndjson_lines(), media_type="application/x-ndjson")
+
+    results = []
+    async for chunk in _iter_attack_results(items, known_ids):
+        results.extend(chunk)
+    return {"timestamp": datetime.utcnow().isoformat(), **_batch_summary(results), "results": results}
@@ -1,18 +1,33 @@
 from fastapi import APIRouter, HTTPException, Request
-from fastapi.responses import JSONResponse
+from fastapi.responses import JSONResponse, Response
+from starlette.concurrency import run_in_threadpool
 from app.model.basic_sensor_model import SoilData, AtmosphericData, WaterData, ThreatData, PlantData
+from app.simulate_attacks.shap_engine import (
+    input_features, explain_rows, render_waterfall_png, warm_up, get_status
+)
+from app.utils.metrics import model_inference_duration, registry
 
-import shap
-import numpy as np
-import pandas as pd
-from sklearn.ensemble import IsolationForest
 from datetime import datetime
+from collections import defaultdict, OrderedDict
+from concurrent.futures import ProcessPoolExecutor
+import asyncio
+import multiprocessing
+import os
 import base64
-import matplotlib.pyplot as plt
-from io import BytesIO
+import hashlib
 
 shap_router = APIRouter(prefix="/api/shap", tags=["SHAP"])
 
+SHAP_POOL_WORKERS = int(os.getenv("SHAP_POOL_WORKERS", "2"))
+SHAP_BATCH_LIMIT = 500
+SHAP_RENDER_CACHE_SIZE = int(os.getenv("SHAP_RENDER_CACHE_SIZE", "256"))
+_process_pool = None
+
+# LRU of rendered PNGs keyed by sensor type and rounded feature vector
+_render_cache: "OrderedDict[str, bytes]" = OrderedDict()
+_renders_in_flight = {}
+render_cache_stats = {"hits": 0, "misses": 0}
+
 # Sensor type → Pydantic Model
 model_map = {
     "soil": SoilData,
@@ -22,92 +37,177 @@ model_map = {
     "plant": PlantData
 }
 
-# SHAP input feature map (manually exclude non-numeric or metadata fields)
-input_features = {
-    "soil": ["temperature", "moisture", "ph", "nutrient_level", "battery_level"],
-    "atmospheric": ["air_temperature", "humidity", "co2", "wind_speed", "rainfall", "battery_level"],
-    "water": ["flow_rate", "water_level", "salinity", "ph", "turbidity", "battery_level"],
-    "threat": ["unauthorized_access", "jamming_signal", "tampering_attempts", "spoofing_attempts", "anomaly_score", "battery_level"],
-    "plant": ["leaf_moisture", "chlorophyll_level", "growth_rate", "disease_risk", "stem_diameter", "battery_level"]
-}
 
-# Dummy training data (generate more realistic values if needed)
-train_data_map = {
-    k: pd.DataFrame({f: np.random.normal(5, 2, 100) for f in fields})
-    for k, fields in input_features.items()
-}
+def get_process_pool() -> ProcessPoolExecutor:
+    # SHAP is CPU-bound; a process pool keeps it off the event loop and outside the GIL
+    global _process_pool
+    if _process_pool is None:
+        _process_pool = ProcessPoolExecutor(max_workers=SHAP_POOL_WORKERS,
+                                            mp_context=multiprocessing.get_context("spawn"))
+    return _process_pool
 
-# Model + Explainer per sensor type
-shap_models = {}
-shap_explainers = {}
-for sensor_type, df in train_data_map.items():
-    clf = IsolationForest(contamination=0.1)
-    clf.fit(df)
-    shap_models[sensor_type] = clf
-    shap_explainers[sensor_type] = shap.Explainer(clf.predict, df)
 
+async def run_explanations(sensor_type: str, rows: list) -> list:
+    loop = asyncio.get_running_loop()
+    with model_inference_duration.labels("shap_explain", sensor_type).time():
+        return await loop.run_in_executor(get_process_pool(), explain_rows, sensor_type, rows)
 
-@shap_router.post("/explain")
-async def explain_shap(request: Request):
-    sensor_type = request.query_params.get("sensor_type")
-    if not sensor_type:
-        raise HTTPException(status_code=400, detail="sensor_type is required")
 
+def validate_reading(sensor_type: str, data: dict) -> list:
     model_cls = model_map.get(sensor_type)
     if not model_cls:
         raise HTTPException(status_code=400, detail=f"Unsupported sensor type: {sensor_type}")
-
-    data = await request.json()
     try:
         validated = model_cls(**data)
     except Exception as e:
         raise HTTPException(status_code=400, detail=str(e))
+    return [getattr(validated, k) for k in input_features[sensor_type]]
+
+
+@shap_router.on_event("shutdown")
+def shutdown_process_pool():
+    global _process_pool
+    if _process_pool is not None:
+        _process_pool.shutdown(wait=False, cancel_futures=True)
+        _process_pool = None
+
+
+@shap_router.post("/warmup")
+async def warmup_shap(request: Request):
+    sensor_type = request.query_params.get("sensor_type")
+    if sensor_type and sensor_type not in input_features:
+        raise HTTPException(status_code=400, detail=f"Unsupported sensor type: {sensor_type}")
+    sensor_types = [sensor_type] if sensor_type else None
+    # Training and explainer construction are CPU-bound; keep them off the event loop
+    await run_in_threadpool(warm_up, sensor_types)
+    loop = asyncio.get_running_loop()
+    await asyncio.gather(*[loop.run_in_executor(get_process_pool(), warm_up, sensor_types)
+                           for _ in range(SHAP_POOL_WORKERS)])
+    return get_status()
+
 
-    features = input_features[sensor_type]
-    input_df = pd.DataFrame([{k: getattr(validated, k) for k in features}])
-    explainer = shap_explainers[sensor_type]
-    prediction = shap_models[sensor_type].predict(input_df)[0]
-    shap_values = explainer(input_df)
-
-    explanation = {
-        "sensor_type": sensor_type,
-        "prediction": "Blocked" if prediction == -1 else "Allowed",
-        "features": [
-            {"feature": f, "contribution": round(v, 4)}
-            for f, v in zip(features, shap_values.values[0])
-        ],
-        "base_value": round(shap_values.base_values[0], 4),
-        "timestamp": datetime.utcnow().isoformat()
-    }
+@shap_router.get("/status")
+def shap_status():
+    return get_status()
+
+
+@shap_router.post("/explain")
+async def explain_shap(request: Request):
+    sensor_type = request.query_params.get("sensor_type")
+    if not sensor_type:
+        raise HTTPException(status_code=400, detail="sensor_type is required")
+
+    row = validate_reading(sensor_type, await request.json())
+    explanation = (await run_explanations(sensor_type, [row]))[0]
+    explanation["timestamp"] = datetime.utcnow().isoformat()
     return JSONResponse(content=explanation)
 
 
+@shap_router.post("/explain/batch")
+async def explain_shap_batch(request: Request):
+    """
+    Explain many readings at once. The body is a list of readings (or {"readings": [...]});
+    each reading may carry its own "sensor_type", otherwise the sensor_type query
+    parameter applies. Readings are grouped per type, explained in one vectorized
+    call per type, and returned in input order.
+    """
+    default_type = request.query_params.get("sensor_type")
+    body = await request.json()
+    readings = body.get("readings") if isinstance(body, dict) else body
+    if not isinstance(readings, list) or not readings:
+        raise HTTPException(status_code=400, detail="A non-empty list of readings is required")
+    if len(readings) > SHAP_BATCH_LIMIT:
+        raise HTTPException(status_code=400, detail=f"At most {SHAP_BATCH_LIMIT} readings per batch")
+
+    groups = defaultdict(lambda: ([], []))  # sensor_type -> (input positions, feature rows)
+    for index, reading in enumerate(readings):
+        if not isinstance(reading, dict):
+            raise HTTPException(status_code=400, detail=f"Reading {index} must be an object")
+        sensor_type = reading.get("sensor_type", default_type)
+        if not sensor_type:
+            raise HTTPException(status_code=400, detail=f"Reading {index} has no sensor_type")
+        try:
+            row = validate_reading(sensor_type, reading)
+        except HTTPException as e:
+            raise HTTPException(status_code=400, detail=f"Reading {index}: {e.detail}")
+        positions, rows = groups[sensor_type]
+        positions.append(index)
+        rows.append(row)
+
+    grouped = await asyncio.gather(*[run_explanations(t, rows) for t, (_, rows) in groups.items()])
+
+    timestamp = datetime.utcnow().isoformat()
+    results = [None] * len(readings)
+    for (positions, _), explanations in zip(groups.values(), grouped):
+        for index, explanation in zip(positions, explanations):
+            results[index] = {**explanation, "sensor_id": readings[index].get("sensor_id"), "timestamp": timestamp}
+    return JSONResponse(content={"count": len(results), "results": results})
+
+
+async def render_force_plot(sensor_type: str, row: list) -> tuple:
+    """Return (cache key, PNG bytes), rendering in the process pool on a cache miss."""
+    key = hashlib.sha1(repr((sensor_type, tuple(round(v, 2) for v in row))).encode()).hexdigest()
+    png = _render_cache.get(key)
+    if png is not None:
+        _render_cache.move_to_end(key)
+        render_cache_stats["hits"] += 1
+        return key, png
+
+    # Concurrent requests for the same plot share one render
+    pending = _renders_in_flight.get(key)
+    if pending is None:
+        render_cache_stats["misses"] += 1
+        loop = asyncio.get_running_loop()
+        pending = loop.run_in_executor(get_process_pool(), render_waterfall_png, sensor_type, row)
+        _renders_in_flight[key] = pending
+        try:
+            with model_inference_duration.labels("shap_render", sensor_type).time():
+                png = await pending
+        finally:
+            _renders_in_flight.pop(key, None)
+        _render_cache[key] = png
+        if len(_render_cache) > SHAP_RENDER_CACHE_SIZE:
+            _render_cache.popitem(last=False)
+        return key, png
+    return key, await asyncio.shield(pending)
+
+
 @shap_router.post("/force-plot")
 async def shap_force_plot(request: Request):
+    """
+    Render a waterfall plot for one reading. `format` selects the response:
+    "base64" (default, JSON image_base64), "png" (raw image bytes) or
+    "url" (JSON with a URL to fetch the cached PNG from).
+    """
     sensor_type = request.query_params.get("sensor_type")
     if not sensor_type or sensor_type not in input_features:
         raise HTTPException(status_code=400, detail="Valid sensor_type required")
+    response_format = request.query_params.get("format", "base64")
+    if response_format not in ("base64", "png", "url"):
+        raise HTTPException(status_code=400, detail="format must be one of base64, png, url")
 
-    model_cls = model_map[sensor_type]
-    data = await request.json()
+    row = validate_reading(sensor_type, await request.json())
+    key, png = await render_force_plot(sensor_type, row)
 
-    try:
-        validated = model_cls(**data)
-    except Exception as e:
-        raise HTTPException(status_code=400, detail=str(e))
+    if response_format == "png":
+        return Response(content=png, media_type="image/png")
+    if response_format == "url":
+        return JSONResponse(content={"url": f"{shap_router.prefix}/force-plot/{key}.png", "key": key})
+    return JSONResponse(content={"image_base64": base64.b64encode(png).decode("utf-8")})
+
+
+@shap_router.get("/force-plot/{key}.png")
+def get_cached_force_plot(key: str):
+    png = _render_cache.get(key)
+    if png is None:
+        raise HTTPException(status_code=404, detail="Plot not found or evicted; render it again")
+    return Response(content=png, media_type="image/png",
+                    headers={"Cache-Control": "public, max-age=3600"})
 
-    features = input_features[sensor_type]
-    input_df = pd.DataFrame([{k: getattr(validated, k) for k in features}])
 
-    shap_values = shap_explainers[sensor_type](input_df)
+@shap_router.get("/force-plot-cache/stats")
+def get_render_cache_stats():
+    return {**render_cache_stats, "size": len(_render_cache), "capacity": SHAP_RENDER_CACHE_SIZE}
 
-    # Create matplotlib force plot and convert to base64
-    plt.clf()
-    shap.plots.waterfall(shap_values[0], show=False)
-    buf = BytesIO()
-    plt.savefig(buf, format="png", bbox_inches="tight")
-    buf.seek(0)
-    encoded = base64.b64encode(buf.read()).decode("utf-8")
-    buf.close()
 
-    return JSONResponse(content={"image_base64": encoded})
+registry.register_collector("shap_render_cache", get_render_cache_stats)
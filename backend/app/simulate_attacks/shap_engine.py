@@ -0,0 +1,164 @@
+# shap_engine.py
+#
+# IsolationForest models and SHAP explainers per sensor type, built lazily on
+# first use. Models come from the model registry when an artifact exists and
+# are trained in-process (seeded) otherwise. shap, pandas and scikit-learn are
+# imported inside the builders so that importing this module (and serving
+# /health) costs nothing.
+
+import logging
+import threading
+import time
+from io import BytesIO
+from typing import Dict, List, Optional, Tuple
+
+from app.model.model_registry import model_registry
+
+logger = logging.getLogger(__name__)
+
+# SHAP input feature map (manually exclude non-numeric or metadata fields)
+input_features = {
+    "soil": ["temperature", "moisture", "ph", "nutrient_level", "battery_level"],
+    "atmospheric": ["air_temperature", "humidity", "co2", "wind_speed", "rainfall", "battery_level"],
+    "water": ["flow_rate", "water_level", "salinity", "ph", "turbidity", "battery_level"],
+    "threat": ["unauthorized_access", "jamming_signal", "tampering_attempts", "spoofing_attempts", "anomaly_score", "battery_level"],
+    "plant": ["leaf_moisture", "chlorophyll_level", "growth_rate", "disease_risk", "stem_diameter", "battery_level"]
+}
+
+TRAINING_ROWS = 100
+# Fixed seed so every process (including pool workers) builds the same model per type
+RANDOM_SEED = 42
+
+_explainers: Dict[str, Tuple[object, object, Optional[str]]] = {}  # type -> (model, explainer, registry version)
+_build_lock = threading.Lock()
+build_timings_ms: Dict[str, float] = {}
+
+
+def _training_frame(sensor_type: str, rows: int = TRAINING_ROWS):
+    import numpy as np
+    import pandas as pd
+
+    # Dummy training data (generate more realistic values if needed)
+    rng = np.random.default_rng(RANDOM_SEED)
+    return pd.DataFrame({f: rng.normal(5, 2, rows) for f in input_features[sensor_type]})
+
+
+def build_model(training_df):
+    from sklearn.ensemble import IsolationForest
+
+    clf = IsolationForest(contamination=0.1, random_state=RANDOM_SEED)
+    clf.fit(training_df)
+    return clf
+
+
+def _load_model(sensor_type: str):
+    """Return (model, background frame, registry version or None if trained in-process)."""
+    import pandas as pd
+
+    features = input_features[sensor_type]
+    artifact = model_registry.get(sensor_type)
+    if artifact is not None and artifact["features"] == features:
+        return artifact["model"], pd.DataFrame(artifact["background"], columns=features), artifact["version"]
+    df = _training_frame(sensor_type)
+    return build_model(df), df, None
+
+
+def get_explainer(sensor_type: str) -> Tuple[object, object]:
+    """Return (model, explainer) for a sensor type, building it on first use or after a model version change."""
+    version = model_registry.version
+    entry = _explainers.get(sensor_type)
+    if entry is not None and entry[2] == version:
+        return entry[0], entry[1]
+    with _build_lock:
+        entry = _explainers.get(sensor_type)
+        if entry is None or entry[2] != version:
+            started = time.perf_counter()
+            import shap
+
+            clf, background, loaded_version = _load_model(sensor_type)
+            # Keyed by the registry version even on fallback, so a newly published version is picked up
+            entry = (clf, shap.Explainer(clf.predict, background), version)
+            _explainers[sensor_type] = entry
+            build_timings_ms[sensor_type] = round((time.perf_counter() - started) * 1000, 1)
+            source = f"model version {loaded_version}" if loaded_version else "in-process training"
+            logger.info(f"Built SHAP explainer for {sensor_type} from {source} in {build_timings_ms[sensor_type]} ms")
+    return entry[0], entry[1]
+
+
+def explain_rows(sensor_type: str, rows: List[List[float]]) -> List[dict]:
+    """
+    Predict and explain many readings of one sensor type in a single vectorized
+    call. Rows hold feature values in `input_features[sensor_type]` order.
+    Returns plain dicts so results can cross a process boundary.
+    """
+    import pandas as pd
+
+    clf, explainer = get_explainer(sensor_type)
+    features = input_features[sensor_type]
+    input_df = pd.DataFrame(rows, columns=features)
+    predictions = clf.predict(input_df)
+    shap_values = explainer(input_df)
+
+    return [
+        {
+            "sensor_type": sensor_type,
+            "prediction": "Blocked" if predictions[i] == -1 else "Allowed",
+            "features": [
+                {"feature": f, "contribution": round(float(v), 4)}
+                for f, v in zip(features, shap_values.values[i])
+            ],
+            "base_value": round(float(shap_values.base_values[i]), 4)
+        }
+        for i in range(len(rows))
+    ]
+
+
+def render_waterfall_png(sensor_type: str, row: List[float]) -> bytes:
+    """
+    Render a SHAP waterfall chart for one reading as PNG bytes. Uses the
+    object-oriented Figure/Agg API, so no global pyplot state is touched.
+    """
+    import numpy as np
+    import pandas as pd
+    from matplotlib.figure import Figure
+
+    _, explainer = get_explainer(sensor_type)
+    features = input_features[sensor_type]
+    shap_values = explainer(pd.DataFrame([row], columns=features))
+    contributions = shap_values.values[0]
+    base_value = float(shap_values.base_values[0])
+
+    # Smallest contributions at the bottom, largest at the top, like shap.plots.waterfall
+    order = np.argsort(np.abs(contributions))
+    fig = Figure(figsize=(8, 0.5 * len(features) + 1.5))
+    ax = fig.add_subplot()
+    running = base_value
+    for y, i in enumerate(order):
+        value = float(contributions[i])
+        ax.barh(y, value, left=running, color="#ff0051" if value > 0 else "#008bfb")
+        ax.text(running + value, y, f" {value:+.3f}", va="center", fontsize=8)
+        running += value
+    ax.set_yticks(range(len(order)))
+    ax.set_yticklabels([f"{features[i]} = {row[i]:g}" for i in order])
+    ax.axvline(base_value, color="#999999", linestyle="--", linewidth=0.8)
+    ax.axvline(running, color="#333333", linestyle="--", linewidth=0.8)
+    ax.set_xlabel(f"E[f(X)] = {base_value:.3f}    f(x) = {running:.3f}")
+
+    buf = BytesIO()
+    fig.savefig(buf, format="png", bbox_inches="tight")
+    return buf.getvalue()
+
+
+def warm_up(sensor_types: List[str] = None) -> Dict[str, float]:
+    for sensor_type in sensor_types or list(input_features):
+        get_explainer(sensor_type)
+    return dict(build_timings_ms)
+
+
+def get_status() -> dict:
+    return {
+        "loaded": sorted(_explainers),
+        "pending": sorted(set(input_features) - set(_explainers)),
+        "build_ms": dict(build_timings_ms),
+        "model_registry": model_registry.get_status()
+    }
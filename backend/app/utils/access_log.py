@@ -0,0 +1,133 @@
+# access_log.py
+
+import json
+import logging
+import os
+import queue
+import random
+import sys
+import threading
+import time
+from datetime import datetime
+from typing import Dict, List
+
+logger = logging.getLogger(__name__)
+
+# Fraction of successful (< 400) requests that get logged; errors are always logged
+ACCESS_LOG_SAMPLE_RATE = float(os.getenv("ACCESS_LOG_SAMPLE_RATE", "0.1"))
+ACCESS_LOG_HEADERS = [h.strip().lower() for h in os.getenv(
+    "ACCESS_LOG_HEADERS", "user-agent,referer,x-forwarded-for,content-length"
+).split(",") if h.strip()]
+ACCESS_LOG_QUEUE_SIZE = 10000
+ACCESS_LOG_BATCH_SIZE = 200
+
+
+class AccessLogWriter:
+    """
+    Structured (JSON Lines) access log. The request path only builds a small
+    dict and enqueues it without blocking. A background thread serializes the
+    entries and writes them to stdout in batches. A full queue drops entries
+    rather than slowing requests down.
+    """
+
+    def __init__(self, sample_rate: float = ACCESS_LOG_SAMPLE_RATE, headers: List[str] = None,
+                 queue_size: int = ACCESS_LOG_QUEUE_SIZE, stream=None):
+        self.sample_rate = sample_rate
+        self.headers = headers if headers is not None else ACCESS_LOG_HEADERS
+        self.stream = stream or sys.stdout
+        self._queue: queue.Queue = queue.Queue(maxsize=queue_size)
+        self._thread = None
+        # route -> [count, total_ms, max_ms]
+        self._route_latency: Dict[str, list] = {}
+        self.stats = {"logged": 0, "sampled_out": 0, "dropped": 0}
+
+    def start(self):
+        if self._thread is None or not self._thread.is_alive():
+            self._thread = threading.Thread(target=self._run, name="access-log-writer", daemon=True)
+            self._thread.start()
+
+    def stop(self, timeout: float = 5):
+        if self._thread is not None and self._thread.is_alive():
+            self._queue.put(None)
+            self._thread.join(timeout)
+        self._thread = None
+
+    def record(self, request, status_code: int, started: float, error: str = None):
+        elapsed_ms = (time.perf_counter() - started) * 1000
+        # Unmatched paths share one key, so 404 scans can't grow the latency table
+        route_path = getattr(request.scope.get("route"), "path", "unmatched")
+        key = f"{request.method} {route_path}"
+
+        latency = self._route_latency.get(key)
+        if latency is None:
+            self._route_latency[key] = [1, elapsed_ms, elapsed_ms]
+        else:
+            latency[0] += 1
+            latency[1] += elapsed_ms
+            if elapsed_ms > latency[2]:
+                latency[2] = elapsed_ms
+
+        if status_code < 400 and error is None and random.random() >= self.sample_rate:
+            self.stats["sampled_out"] += 1
+            return
+
+        request_headers = request.headers
+        entry = {
+            "ts": time.time(),
+            "method": request.method,
+            "route": route_path,
+            "path": request.url.path,
+            "status": status_code,
+            "duration_ms": round(elapsed_ms, 2),
+            "client": request.client.host if request.client else None,
+            "headers": {h: request_headers[h] for h in self.headers if h in request_headers},
+        }
+        if error is not None:
+            entry["error"] = error
+        try:
+            self._queue.put_nowait(entry)
+            self.stats["logged"] += 1
+        except queue.Full:
+            self.stats["dropped"] += 1
+
+    def _run(self):
+        while True:
+            entry = self._queue.get()
+            batch = [entry]
+            while len(batch) < ACCESS_LOG_BATCH_SIZE:
+                try:
+                    batch.append(self._queue.get_nowait())
+                except queue.Empty:
+                    break
+            stop = None in batch
+            lines = []
+            for item in batch:
+                if item is None:
+                    continue
+                item["ts"] = datetime.utcfromtimestamp(item["ts"]).isoformat() + "Z"
+                lines.append(json.dumps(item, default=str))
+            try:
+                if lines:
+                    self.stream.write("\n".join(lines) + "\n")
+                    self.stream.flush()
+            except Exception:
+                logger.exception("Failed to write access log batch")
+            if stop:
+                return
+
+    def route_latency(self) -> Dict[str, dict]:
+        return {
+            route: {"count": count, "avg_ms": round(total / count, 2), "max_ms": round(peak, 2)}
+            for route, (count, total, peak) in list(self._route_latency.items())
+        }
+
+    def get_stats(self) -> dict:
+        return {
+            **self.stats,
+            "queue_depth": self._queue.qsize(),
+            "sample_rate": self.sample_rate,
+            "routes": self.route_latency(),
+        }
+
+
+access_log = AccessLogWriter()
@@ -0,0 +1,124 @@
+# audit_writer.py
+
+import asyncio
+import json
+import logging
+import os
+import threading
+from typing import List, Optional
+
+from app.utils.dynamodb_helper import batch_write_items, BATCH_WRITE_LIMIT
+
+logger = logging.getLogger(__name__)
+
+BACKPRESSURE_POLICIES = ("block", "drop_oldest", "spill")
+
+AUDIT_QUEUE_MAXSIZE = int(os.getenv("AUDIT_QUEUE_MAXSIZE", "10000"))
+AUDIT_BACKPRESSURE = os.getenv("AUDIT_BACKPRESSURE", "drop_oldest")
+AUDIT_SPILL_PATH = os.getenv("AUDIT_SPILL_PATH", "audit_spill.jsonl")
+AUDIT_LINGER_SECONDS = float(os.getenv("AUDIT_LINGER_SECONDS", "0.05"))
+AUDIT_SHUTDOWN_TIMEOUT_SECONDS = 10
+
+
+class AuditLogWriter:
+    """
+    Background writer for audit entries. Handlers enqueue and return; a worker
+    task coalesces queued entries into BatchWriteItem calls of up to 25 items
+    and runs them on a thread so the event loop never waits on DynamoDB.
+
+    When the queue is full the backpressure policy decides what happens:
+    "block" waits for room, "drop_oldest" evicts the oldest queued entry and
+    "spill" appends the new entry to a local JSON Lines file.
+    """
+
+    def __init__(self, table_name: str, maxsize: int = AUDIT_QUEUE_MAXSIZE,
+                 policy: str = AUDIT_BACKPRESSURE, spill_path: str = AUDIT_SPILL_PATH,
+                 linger_seconds: float = AUDIT_LINGER_SECONDS):
+        if policy not in BACKPRESSURE_POLICIES:
+            raise ValueError(f"Unknown backpressure policy '{policy}', expected one of {BACKPRESSURE_POLICIES}")
+        self.table_name = table_name
+        self.policy = policy
+        self.spill_path = spill_path
+        self.linger_seconds = linger_seconds
+        self._queue: asyncio.Queue = asyncio.Queue(maxsize=maxsize)
+        self._worker: Optional[asyncio.Task] = None
+        self._spill_lock = threading.Lock()
+        self.stats = {
+            "enqueued": 0,
+            "written": 0,
+            "dropped": 0,
+            "spilled": 0,
+            "failed": 0,
+            "batches": 0,
+            "max_queue_depth": 0,
+        }
+
+    def start(self):
+        if self._worker is None or self._worker.done():
+            self._worker = asyncio.get_running_loop().create_task(self._run())
+
+    async def stop(self):
+        """Flush everything still queued, then stop the worker."""
+        if self._worker is None:
+            return
+        try:
+            await asyncio.wait_for(self._queue.join(), AUDIT_SHUTDOWN_TIMEOUT_SECONDS)
+        except asyncio.TimeoutError:
+            logger.warning(f"Audit writer stopped with {self._queue.qsize()} entries still queued")
+        self._worker.cancel()
+        self._worker = None
+
+    async def submit(self, entry: dict):
+        self.start()
+        if self.policy == "block":
+            await self._queue.put(entry)
+        else:
+            try:
+                self._queue.put_nowait(entry)
+            except asyncio.QueueFull:
+                if self.policy == "spill":
+                    await self._spill([entry])
+                    return
+                self._queue.get_nowait()
+                self._queue.task_done()
+                self.stats["dropped"] += 1
+                self._queue.put_nowait(entry)
+        self.stats["enqueued"] += 1
+        self.stats["max_queue_depth"] = max(self.stats["max_queue_depth"], self._queue.qsize())
+
+    async def _spill(self, entries: List[dict]):
+        # File I/O runs on a thread like the batch write; the lock keeps concurrent spills from interleaving
+        await asyncio.get_running_loop().run_in_executor(None, self._append_spill, entries)
+        self.stats["spilled"] += len(entries)
+
+    def _append_spill(self, entries: List[dict]):
+        lines = "".join(json.dumps(entry, default=str) + "\n" for entry in entries)
+        with self._spill_lock, open(self.spill_path, "a") as f:
+            f.write(lines)
+
+    async def _run(self):
+        loop = asyncio.get_running_loop()
+        while True:
+            batch = [await self._queue.get()]
+            if self._queue.qsize() < BATCH_WRITE_LIMIT - 1 and self.linger_seconds > 0:
+                # Give a burst a moment to fill the batch before paying for a round trip
+                await asyncio.sleep(self.linger_seconds)
+            while len(batch) < BATCH_WRITE_LIMIT and not self._queue.empty():
+                batch.append(self._queue.get_nowait())
+            try:
+                result = await loop.run_in_executor(None, batch_write_items, self.table_name, batch)
+                self.stats["written"] += result["written"]
+                self.stats["failed"] += result["failed"]
+            except Exception as e:
+                logger.error(f"Audit batch write to {self.table_name} failed: {e}")
+                if self.policy == "spill":
+                    await self._spill(batch)
+                else:
+                    self.stats["failed"] += len(batch)
+            finally:
+                self.stats["batches"] += 1
+                for _ in batch:
+                    self._queue.task_done()
+
+    def get_stats(self) -> dict:
+        return {**self.stats, "queue_depth": self._queue.qsize(), "policy": self.policy}
@@ -1,21 +1,111 @@
-import boto3
+# aws_services.py
+#
+# The one place AWS sessions, clients and resources are built. Nothing is
+# created at import: the first call builds the session and each client once,
+# with a tuned botocore Config, under a lock. boto3 clients are thread-safe,
+# so the same handles are shared by request handlers and executor threads.
+# Table handles are cached per name and only used for stateless actions
+# (put_item, scan, batch_writer), which all go through the shared client.
+
 import os
+import threading
 import uuid
 from datetime import datetime
+from typing import Dict
+
+import boto3
+from boto3.dynamodb.conditions import Key
+from botocore.config import Config
 from botocore.exceptions import ClientError
 
+AWS_REGION = os.getenv("AWS_REGION", "us-east-1")
+AWS_PROFILE = os.getenv("AWS_PROFILE")  # None uses the default credential chain
+# Default botocore pool is 10; the sensor, audit and scan executors run well over that concurrently
+AWS_MAX_POOL_CONNECTIONS = int(os.getenv("AWS_MAX_POOL_CONNECTIONS", "50"))
+AWS_MAX_ATTEMPTS = int(os.getenv("AWS_MAX_ATTEMPTS", "10"))
+
+BOTO_CONFIG = Config(
+    region_name=AWS_REGION,
+    max_pool_connections=AWS_MAX_POOL_CONNECTIONS,
+    tcp_keepalive=True,
+    connect_timeout=3,
+    read_timeout=10,
+    retries={"max_attempts": AWS_MAX_ATTEMPTS, "mode": "adaptive"},
+)
+
+
+class AwsClients:
+    def __init__(self, config: Config = BOTO_CONFIG, profile_name: str = AWS_PROFILE):
+        self.config = config
+        self.profile_name = profile_name
+        self._session = None
+        self._clients: Dict[str, object] = {}
+        self._resources: Dict[str, object] = {}
+        self._tables: Dict[str, object] = {}
+        self._lock = threading.Lock()
+
+    def session(self) -> boto3.Session:
+        # boto3.Session construction itself is not thread-safe, so it happens once under the lock
+        if self._session is None:
+            with self._lock:
+                if self._session is None:
+                    self._session = boto3.Session(profile_name=self.profile_name, region_name=self.config.region_name)
+        return self._session
+
+    def resource(self, service: str):
+        resource = self._resources.get(service)
+        if resource is None:
+            session = self.session()
+            with self._lock:
+                resource = self._resources.get(service)
+                if resource is None:
+                    resource = self._resources[service] = session.resource(service, config=self.config)
+        return resource
+
+    def client(self, service: str):
+        client = self._clients.get(service)
+        if client is None:
+            session = self.session()
+            with self._lock:
+                client = self._clients.get(service)
+                if client is None:
+                    if service in self._resources:
+                        # Reuse the resource's client (and its connection pool) where one exists
+                        client = self._resources[service].meta.client
+                    else:
+                        client = session.client(service, config=self.config)
+                    self._clients[service] = client
+        return client
+
+    def table(self, table_name: str):
+        table = self._tables.get(table_name)
+        if table is None:
+            table = self._tables.setdefault(table_name, self.resource("dynamodb").Table(table_name))
+        return table
+
+
+aws = AwsClients()
+
+
+def get_dynamodb():
+    return aws.resource("dynamodb")
+
+
+def get_dynamodb_client():
+    # The resource's own client, so resource and low-level calls share one connection pool
+    return get_dynamodb().meta.client
+
+
+def get_table(table_name: str):
+    return aws.table(table_name)
+
+
 # DynamoDB setup
-dynamodb = boto3.resource("dynamodb", region_name=os.getenv("AWS_REGION", "us-east-1"))
 table_name = os.getenv("DYNAMODB_TABLE", "lx_fta_audit_logs")
-table = dynamodb.Table(table_name)
 
 # S3 setup
-s3 = boto3.client("s3", region_name=os.getenv("AWS_REGION", "us-east-1"))
 s3_bucket = os.getenv("S3_BUCKET_NAME", "lx-fta-firmware-bucket")
 
-# Secrets Manager setup
-secrets_client = boto3.client("secretsmanager", region_name=os.getenv("AWS_REGION", "us-east-1"))
-
 
 def dynamodb_put_item(payload: dict):
     """Insert a record into DynamoDB."""
@@ -24,14 +114,14 @@ def dynamodb_put_item(payload: dict):
         "timestamp": datetime.utcnow().isoformat(),
         **payload,
     }
-    table.put_item_db(Item=item)
+    get_table(table_name).put_item(Item=item)
     return item
 
 
 def dynamodb_query_logs(sensor_id: str):
     """Query logs by sensor_id."""
-    response = table.query(
-        KeyConditionExpression=boto3.dynamodb.conditions.Key("sensor_id").eq(sensor_id)
+    response = get_table(table_name).query(
+        KeyConditionExpression=Key("sensor_id").eq(sensor_id)
     )
     return response.get("Items", [])
 
@@ -39,7 +129,7 @@ def dynamodb_query_logs(sensor_id: str):
 def upload_to_s3(file_content: bytes, filename: str):
     """Upload a firmware file to S3."""
     key = f"firmware/{datetime.utcnow().strftime('%Y%m%d')}/{filename}"
-    s3.put_object(Bucket=s3_bucket, Key=key, Body=file_content)
+    aws.client("s3").put_object(Bucket=s3_bucket, Key=key, Body=file_content)
     s3_url = f"https://{s3_bucket}.s3.amazonaws.com/{key}"
     return s3_url
 
@@ -47,7 +137,7 @@ def upload_to_s3(file_content: bytes, filename: str):
 def get_secret(secret_name: str):
     """Retrieve a secret from AWS Secrets Manager."""
     try:
-        response = secrets_client.get_secret_value(SecretId=secret_name)
+        response = aws.client("secretsmanager").get_secret_value(SecretId=secret_name)
         return response.get("SecretString")
     except ClientError as e:
         raise Exception(f"Failed to retrieve secret: {str(e)}")
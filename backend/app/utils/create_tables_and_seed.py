@@ -1,12 +1,8 @@
-import boto3
 from botocore.exceptions import ClientError
 
+from app.utils.aws_services import get_dynamodb_client
 from app.utils.seed_sensors import seed_all
 
-# Use local AWS credentials
-session = boto3.Session(profile_name="default", region_name="us-east-1")
-dynamodb = session.client("dynamodb")
-
 # Table names mapped to primary key
 TABLE_DEFINITIONS = {
     "lx-fta-soil-data": "sensor_id",
@@ -19,7 +15,7 @@ TABLE_DEFINITIONS = {
 
 def table_exists(table_name):
     try:
-        dynamodb.describe_table(TableName=table_name)
+        get_dynamodb_client().describe_table(TableName=table_name)
         return True
     except ClientError as e:
         if e.response["Error"]["Code"] == "ResourceNotFoundException":
@@ -30,6 +26,7 @@ def table_exists(table_name):
 
 def create_table(table_name, partition_key):
     print(f"🔧 Creating table {table_name}...")
+    dynamodb = get_dynamodb_client()
     dynamodb.create_table(
         TableName=table_name,
         KeySchema=[
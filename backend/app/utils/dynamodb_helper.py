@@ -1,13 +1,26 @@
 
 
 from decimal import Decimal
-import boto3
+import queue
+import threading
+import time
+import logging
 
 from datetime import datetime
 from botocore.exceptions import ClientError
 import uuid
 
-dynamodb = boto3.resource("dynamodb", region_name="us-east-1")
+from typing import Iterator, List, Optional, Sequence
+
+from app.utils.metrics import dynamodb_call_duration, dynamodb_consumed_capacity
+from app.utils.serializer import to_item
+from app.utils.storage import get_storage
+
+logger = logging.getLogger(__name__)
+
+BATCH_WRITE_LIMIT = 25  # DynamoDB BatchWriteItem accepts at most 25 put requests
+BATCH_WRITE_MAX_RETRIES = 5
+SCAN_SEGMENTS = 4  # parallel Segment/TotalSegments workers per table scan
 
 
 def convert_floats_to_decimal(obj):
@@ -28,43 +41,182 @@ def convert_floats_to_decimal(obj):
 
 
 
-def put_item(table_name: str, item: dict):
-    if 'id' not in item:
-        item['id'] = str(uuid.uuid4())  # ✅ Add a unique ID if missing
+def put_item(table_name: str, item):
+    safe_item = to_item(item)
+    if 'id' not in safe_item:
+        safe_item['id'] = str(uuid.uuid4())  # ✅ Add a unique ID if missing
 
-    table = dynamodb.Table(table_name)
-    safe_item = convert_floats_to_decimal(item)
-    table.put_item(Item=safe_item)
+    with dynamodb_call_duration.labels("put_item", table_name).time():
+        get_storage().put_item(table_name, safe_item)
 
 
-def scan_table(table_name: str):
+def batch_write_items(table_name: str, items: list, max_retries: int = BATCH_WRITE_MAX_RETRIES) -> dict:
+    """
+    Write items (Pydantic models or dicts) with BatchWriteItem in chunks of 25,
+    retrying unprocessed items with exponential backoff. On DynamoDB, items are
+    serialized straight to AttributeValues and sent through the low-level
+    client, which skips the resource layer's per-item type serialization.
+    Returns counts of written, retried and failed items.
+    """
+    stats = {"written": 0, "retried": 0, "failed": 0}
+    storage = get_storage()
+    requests = [storage.prepare_batch_item(item) for item in items]
+
+    for start in range(0, len(requests), BATCH_WRITE_LIMIT):
+        pending = requests[start:start + BATCH_WRITE_LIMIT]
+        attempt = 0
+        while pending:
+            with dynamodb_call_duration.labels("batch_write_item", table_name).time():
+                unprocessed = storage.batch_write(table_name, pending)
+            stats["written"] += len(pending) - len(unprocessed)
+            if not unprocessed:
+                break
+            if attempt >= max_retries:
+                logger.warning(f"Giving up on {len(unprocessed)} unprocessed items for {table_name}")
+                stats["failed"] += len(unprocessed)
+                break
+            stats["retried"] += len(unprocessed)
+            time.sleep(min(0.05 * (2 ** attempt), 1.0))
+            attempt += 1
+            pending = unprocessed
+    return stats
+
+
+_scan_stats_lock = threading.Lock()
+
+
+def iter_scan_pages(table_name: str, projection: Optional[Sequence[str]] = None, segment: Optional[int] = None,
+                    total_segments: Optional[int] = None, page_size: Optional[int] = None,
+                    stats: Optional[dict] = None) -> Iterator[List[dict]]:
+    """
+    Yield a table's items one page at a time, optionally restricted to one
+    parallel-scan segment and to the `projection` attributes. Consumed read
+    capacity is recorded in the metrics registry and, if given, added to `stats`.
+    """
+    storage = get_storage()
+    kwargs = {"ReturnConsumedCapacity": "TOTAL"}
+    if projection:
+        # Placeholders keep reserved words (e.g. "status") usable in projections
+        kwargs["ProjectionExpression"] = ", ".join(f"#p{i}" for i in range(len(projection)))
+        kwargs["ExpressionAttributeNames"] = {f"#p{i}": name for i, name in enumerate(projection)}
+    if total_segments is not None and total_segments > 1:
+        kwargs["Segment"] = segment
+        kwargs["TotalSegments"] = total_segments
+    if page_size:
+        kwargs["Limit"] = page_size
+
+    scan_timer = dynamodb_call_duration.labels("scan", table_name)
+    while True:
+        with scan_timer.time():
+            response = storage.scan(table_name, **kwargs)
+        items = response.get("Items", [])
+        units = response.get("ConsumedCapacity", {}).get("CapacityUnits", 0.0)
+        dynamodb_consumed_capacity.labels("scan", table_name).inc(units)
+        if stats is not None:
+            with _scan_stats_lock:
+                stats["pages"] = stats.get("pages", 0) + 1
+                stats["items"] = stats.get("items", 0) + len(items)
+                stats["scanned"] = stats.get("scanned", 0) + response.get("ScannedCount", len(items))
+                stats["capacity_units"] = stats.get("capacity_units", 0.0) + units
+        yield items
+        if "LastEvaluatedKey" not in response:
+            return
+        kwargs["ExclusiveStartKey"] = response["LastEvaluatedKey"]
+
+
+def parallel_scan(table_name: str, projection: Optional[Sequence[str]] = None,
+                  total_segments: int = SCAN_SEGMENTS, page_size: Optional[int] = None,
+                  stats: Optional[dict] = None) -> Iterator[List[dict]]:
+    """
+    Scan a table with `total_segments` workers (DynamoDB parallel scan) and
+    yield pages as they arrive, in no particular order. Pages pass through a
+    small bounded queue, so the full item list is never held in memory.
+    Closing the generator early stops the workers after their current page.
+    """
+    if total_segments <= 1:
+        yield from iter_scan_pages(table_name, projection, page_size=page_size, stats=stats)
+        return
+
+    pages: queue.Queue = queue.Queue(maxsize=total_segments * 2)
+    stop = threading.Event()
+
+    def put(message) -> bool:
+        while not stop.is_set():
+            try:
+                pages.put(message, timeout=0.1)
+                return True
+            except queue.Full:
+                continue
+        return False
+
+    def worker(segment: int):
+        try:
+            for items in iter_scan_pages(table_name, projection, segment, total_segments, page_size, stats):
+                if not put(("page", items)):
+                    return
+            put(("done", None))
+        except Exception as e:
+            put(("error", e))
+
+    for segment in range(total_segments):
+        threading.Thread(target=worker, args=(segment,), name=f"ddb-scan-{table_name}-{segment}",
+                         daemon=True).start()
+    try:
+        remaining = total_segments
+        while remaining:
+            kind, payload = pages.get()
+            if kind == "page":
+                yield payload
+            elif kind == "done":
+                remaining -= 1
+            else:
+                raise payload
+    finally:
+        stop.set()
+
+
+def scan_table(table_name: str, projection: Optional[Sequence[str]] = None,
+               total_segments: int = SCAN_SEGMENTS):
     """
     Scan a DynamoDB table and return all items.
     """
     try:
-        table = dynamodb.Table(table_name)
         items = []
-        response = table.scan()
-        items.extend(response.get("Items", []))
-        while 'LastEvaluatedKey' in response:
-            response = table.scan(ExclusiveStartKey=response['LastEvaluatedKey'])
-            items.extend(response.get("Items", []))
+        for page in parallel_scan(table_name, projection, total_segments):
+            items.extend(page)
         return items
     except ClientError as e:
         print(f"❌ Failed to scan table {table_name}: {e}")
         return []
 
 
-def fetch_sensor_ids_from_table(table_name: str) -> set:
+def fetch_sensor_ids_from_table(table_name: str, stats: Optional[dict] = None) -> set:
+    """
+    Returns all sensor IDs from a given table, reading only the sensor_id attribute.
+    """
+    sensor_ids = set()
+    try:
+        for page in parallel_scan(table_name, projection=["sensor_id"], stats=stats):
+            sensor_ids.update(item["sensor_id"] for item in page if "sensor_id" in item)
+    except ClientError as e:
+        print(f"❌ Failed to scan table {table_name}: {e}")
+    return sensor_ids
+
+
+def delete_all_items(table_name: str, key_attributes: Sequence[str]) -> int:
     """
-    Returns all sensor IDs from a given table.
+    Delete every item in a table, reading only the key attributes page by page.
     """
-    items = scan_table(table_name)
-    return {item["sensor_id"] for item in items if "sensor_id" in item}
+    storage = get_storage()
+    deleted = 0
+    for page in iter_scan_pages(table_name, projection=key_attributes):
+        if page:
+            with dynamodb_call_duration.labels("delete_items", table_name).time():
+                deleted += storage.delete_items(table_name, page)
+    return deleted
 
 
 def log_access(sensor_type: str, endpoint: str, client_ip: str):
-    table = dynamodb.Table("lx-fta-access-logs")
     item = {
         "id": str(uuid.uuid4()),
         "sensor_type": sensor_type,
@@ -72,7 +224,8 @@ def log_access(sensor_type: str, endpoint: str, client_ip: str):
         "client_ip": client_ip,
         "timestamp": datetime.utcnow().isoformat()
     }
-    table.put_item(Item=item)
+    with dynamodb_call_duration.labels("put_item", "lx-fta-access-logs").time():
+        get_storage().put_item("lx-fta-access-logs", item)
 
 
 AUDIT_TABLE_NAME = "lx-fta-audit-logs"
@@ -80,8 +233,8 @@ AUDIT_TABLE_NAME = "lx-fta-audit-logs"
 
 def put_alert_to_audit_log(alert: dict) -> bool:
     try:
-        table = dynamodb.Table(AUDIT_TABLE_NAME)
-        table.put_item(Item=alert)
+        with dynamodb_call_duration.labels("put_item", AUDIT_TABLE_NAME).time():
+            get_storage().put_item(AUDIT_TABLE_NAME, alert)
         return True
     except ClientError as e:
         print(f"❌ Error saving alert to audit logs: {e}")
@@ -89,6 +242,6 @@ def put_alert_to_audit_log(alert: dict) -> bool:
 
 
 def get_recent_audit_logs(limit=10):
-    table = dynamodb.Table(AUDIT_TABLE_NAME)
-    response = table.scan(Limit=limit)
+    with dynamodb_call_duration.labels("scan", AUDIT_TABLE_NAME).time():
+        response = get_storage().scan(AUDIT_TABLE_NAME, Limit=limit)
     return response.get("Items", [])
@@ -0,0 +1,158 @@
+"""
+Local stand-in for a Redis server, speaking the part of RESP that
+SHARED_STATE_BACKEND=redis uses, so several API workers (or hosts) can share
+state without a real Redis install.
+
+    python -m app.utils.resp_server --port 6379
+    SHARED_STATE_BACKEND=redis SHARED_STATE_REDIS_URL=redis://127.0.0.1:6379/0 uvicorn app.main:app --workers 4
+
+Commands run on the same StateEngine the mmap backend uses. The server is a
+single asyncio loop, so every command, and every MULTI/EXEC block, is atomic.
+State lives in memory only.
+"""
+
+import argparse
+import asyncio
+import logging
+import threading
+import time
+from typing import List, Optional
+
+from app.utils.shared_state import OK, PONG, QUEUED, SimpleString, StateEngine, StateError
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_PORT = 6379
+
+
+def encode_reply(value) -> bytes:
+    if isinstance(value, StateError):
+        return f"-{value}\r\n".encode()
+    if isinstance(value, SimpleString):
+        return f"+{value}\r\n".encode()
+    if value is None:
+        return b"$-1\r\n"
+    if isinstance(value, bool):
+        return b":%d\r\n" % int(value)
+    if isinstance(value, int):
+        return b":%d\r\n" % value
+    if isinstance(value, list):
+        return b"*%d\r\n" % len(value) + b"".join(encode_reply(v) for v in value)
+    data = str(value).encode()
+    return b"$%d\r\n%s\r\n" % (len(data), data)
+
+
+async def read_command(reader: asyncio.StreamReader) -> Optional[List[str]]:
+    line = await reader.readline()
+    if not line:
+        return None
+    if not line.startswith(b"*"):
+        return line.decode().split()  # inline command, e.g. typed into telnet
+    args = []
+    for _ in range(int(line[1:-2])):
+        header = await reader.readline()
+        length = int(header[1:-2])
+        args.append((await reader.readexactly(length + 2))[:-2].decode())
+    return args
+
+
+class RespServer:
+    def __init__(self, host: str = "127.0.0.1", port: int = DEFAULT_PORT):
+        self.host = host
+        self.port = port
+        self.engine = StateEngine()
+        self.stats = {"connections": 0, "commands": 0, "transactions": 0}
+        self._server: Optional[asyncio.AbstractServer] = None
+
+    def _run(self, args: List[str]):
+        try:
+            return self.engine.execute(args[0], args[1:], time.time())
+        except StateError as e:
+            return e
+
+    async def _handle(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter):
+        self.stats["connections"] += 1
+        queued: Optional[List[List[str]]] = None  # set while inside MULTI
+        try:
+            while True:
+                args = await read_command(reader)
+                if args is None:
+                    break
+                if not args:
+                    continue
+                self.stats["commands"] += 1
+                name = args[0].upper()
+                if name == "QUIT":
+                    writer.write(encode_reply(OK))
+                    break
+                if name == "MULTI":
+                    queued = []
+                    reply = OK
+                elif name == "EXEC":
+                    if queued is None:
+                        reply = StateError("ERR EXEC without MULTI")
+                    else:
+                        # No await between commands, so the block runs without interleaving
+                        reply = [self._run(command) for command in queued]
+                        queued = None
+                        self.stats["transactions"] += 1
+                elif name == "DISCARD":
+                    queued = None
+                    reply = OK
+                elif queued is not None:
+                    queued.append(args)
+                    reply = QUEUED
+                elif name == "PING":
+                    reply = PONG
+                elif name in ("SELECT", "AUTH"):
+                    reply = OK  # a single keyspace with no auth
+                else:
+                    reply = self._run(args)
+                writer.write(encode_reply(reply))
+                await writer.drain()
+        except (ConnectionError, asyncio.IncompleteReadError):
+            pass
+        finally:
+            writer.close()
+
+    async def start(self):
+        self._server = await asyncio.start_server(self._handle, self.host, self.port)
+        self.port = self._server.sockets[0].getsockname()[1]  # resolves port 0 to the one bound
+        logger.info(f"RESP stand-in listening on {self.host}:{self.port}")
+
+    async def serve_forever(self):
+        await self.start()
+        async with self._server:
+            await self._server.serve_forever()
+
+    def start_in_thread(self) -> threading.Thread:
+        """Serve from a daemon thread with its own event loop; returns once the port is bound."""
+        ready = threading.Event()
+
+        def run():
+            loop = asyncio.new_event_loop()
+            loop.run_until_complete(self.start())
+            ready.set()
+            loop.run_forever()
+
+        thread = threading.Thread(target=run, name="resp-server", daemon=True)
+        thread.start()
+        ready.wait()
+        return thread
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Local RESP stand-in for the shared state backend")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=DEFAULT_PORT)
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO)
+    try:
+        asyncio.run(RespServer(args.host, args.port).serve_forever())
+    except KeyboardInterrupt:
+        pass
+
+
+if __name__ == "__main__":
+    main()
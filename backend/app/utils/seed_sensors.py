@@ -1,15 +1,22 @@
 import random
-from decimal import Decimal
-import boto3
 
 from app.model.basic_sensor_model import (
     SoilData, AtmosphericData, WaterData, ThreatData, PlantData
 )
-from app.utils.dynamodb_helper import put_item_db
+from app.utils.dynamodb_helper import put_item
 
-# Use credentials from ~/.aws/credentials under the default profile
-session = boto3.Session(profile_name="default", region_name="us-east-1")
-dynamodb = session.client("dynamodb")
+# Credentials come from the shared AWS layer (AWS_PROFILE / default chain)
+SEED_TABLES = {
+    "soil": "lx-fta-soil-data",
+    "atmospheric": "lx-fta-atmospheric-data",
+    "water": "lx-fta-water-data",
+    "threat": "lx-fta-threat-data",
+    "plant": "lx-fta-plant-data",
+}
+
+
+def put_item_db(data, sensor_type: str):
+    put_item(SEED_TABLES[sensor_type], data)
 
 
 def seed_soil_data():
@@ -23,7 +30,7 @@ def seed_soil_data():
             battery_level=round(random.uniform(10.0, 100.0), 2),
             status=random.choice(["active", "sleeping", "compromised"])
         )
-        put_item_db(data, "soil", dynamodb)
+        put_item_db(data, "soil")
 
 
 def seed_atmospheric_data():
@@ -38,7 +45,7 @@ def seed_atmospheric_data():
             battery_level=round(random.uniform(10.0, 100.0), 2),
             status=random.choice(["active", "sleeping", "compromised"])
         )
-        put_item_db(data, "atmospheric", dynamodb)
+        put_item_db(data, "atmospheric")
 
 
 def seed_water_data():
@@ -53,7 +60,7 @@ def seed_water_data():
             battery_level=round(random.uniform(10.0, 100.0), 2),
             status=random.choice(["active", "sleeping", "compromised"])
         )
-        put_item_db(data, "water", dynamodb)
+        put_item_db(data, "water")
 
 
 def seed_threat_data():
@@ -68,7 +75,7 @@ def seed_threat_data():
             battery_level=round(random.uniform(10.0, 100.0), 2),
             status=random.choice(["active", "compromised", "alerting"])
         )
-        put_item_db(data, "threat", dynamodb)
+        put_item_db(data, "threat")
 
 
 def seed_plant_data():
@@ -83,7 +90,7 @@ def seed_plant_data():
             battery_level=round(random.uniform(10.0, 100.0), 2),
             status=random.choice(["healthy", "wilting", "diseased"])
         )
-        put_item_db(data, "plant", dynamodb)
+        put_item_db(data, "plant")
 
 
 def seed_all():
@@ -95,9 +102,5 @@ def seed_all():
     print("✅ All sensor data seeded successfully.")
 
 
-def put_item(table_name: str, item: dict):
-    table = dynamodb.Table(table_name)
-    table.put_item_db(Item=item)
-
 if __name__ == "__main__":
     seed_all()
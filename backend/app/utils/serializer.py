@@ -0,0 +1,141 @@
+# serializer.py
+#
+# Schema-aware conversion of sensor readings and audit entries for DynamoDB.
+# A conversion plan (field name + converter) is built once per Pydantic model
+# class from its field annotations, so serializing a reading is one flat loop
+# with no recursion or per-value type checks. Plain dicts (audit entries) use
+# a flat per-value lookup keyed by exact type. A type missing from the table
+# (numpy.float64 is a float subclass) is resolved once by isinstance order and
+# cached under its exact type. Only nested containers fall back to a recursive
+# walk.
+
+from decimal import Decimal
+from typing import Any, Callable, Dict, List, Optional, Tuple, Union, get_args, get_origin
+
+from pydantic import BaseModel
+
+Converter = Optional[Callable[[Any], Any]]
+_UNRESOLVED = object()
+
+
+def _resolve(table: Dict[type, Any], bases: Tuple[type, ...], value_type: type):
+    """Converter of the first base `value_type` subclasses, or None; cached in `table` under the exact type."""
+    converter = next((table[base] for base in bases if issubclass(value_type, base)), None)
+    table[value_type] = converter
+    return converter
+
+
+def _to_decimal(value) -> Decimal:
+    return Decimal(str(value))  # convert to string first to avoid precision errors
+
+
+def _nested_to_decimal(value):
+    converter = _DECIMAL_BY_TYPE.get(type(value), _UNRESOLVED)
+    if converter is _UNRESOLVED:
+        converter = _resolve(_DECIMAL_BY_TYPE, _DECIMAL_BASES, type(value))
+    return converter(value) if converter else value
+
+
+_DECIMAL_BY_TYPE: Dict[type, Callable[[Any], Any]] = {
+    float: _to_decimal,
+    dict: lambda d: {k: _nested_to_decimal(v) for k, v in d.items()},
+    list: lambda items: [_nested_to_decimal(v) for v in items],
+}
+_DECIMAL_BASES = (list, dict, float)  # the isinstance order of the original convert_floats_to_decimal
+
+
+def _number(value) -> dict:
+    return {"N": str(value)}
+
+
+def _attribute_value(value) -> dict:
+    if value is None:
+        return {"NULL": True}
+    converter = _ATTRIBUTE_BY_TYPE.get(type(value), _UNRESOLVED)
+    if converter is _UNRESOLVED:
+        converter = _resolve(_ATTRIBUTE_BY_TYPE, _ATTRIBUTE_BASES, type(value))
+    if converter is None:
+        raise TypeError(f"Unsupported type for DynamoDB attribute: {type(value).__name__}")
+    return converter(value)
+
+
+_ATTRIBUTE_BY_TYPE: Dict[type, Callable[[Any], dict]] = {
+    str: lambda v: {"S": v},
+    bool: lambda v: {"BOOL": v},
+    int: _number,
+    float: _number,
+    Decimal: _number,
+    dict: lambda d: {"M": {k: _attribute_value(v) for k, v in d.items()}},
+    list: lambda items: {"L": [_attribute_value(v) for v in items]},
+}
+_ATTRIBUTE_BASES = (str, bool, int, float, Decimal, dict, list)  # bool before int, which it subclasses
+
+
+def _optional(converter: Callable, none_value) -> Callable:
+    return lambda v: none_value if v is None else converter(v)
+
+
+def _unwrap_optional(annotation) -> Tuple[Any, bool]:
+    if get_origin(annotation) is Union:
+        args = [a for a in get_args(annotation) if a is not type(None)]
+        if len(args) == 1:
+            return args[0], True
+    return annotation, False
+
+
+def _decimal_converter(annotation) -> Converter:
+    annotation, optional = _unwrap_optional(annotation)
+    if annotation in (str, int, bool):
+        return None  # stored as-is
+    converter = _to_decimal if annotation is float else _nested_to_decimal
+    return _optional(converter, None) if optional else converter
+
+
+def _attribute_converter(annotation) -> Callable:
+    annotation, optional = _unwrap_optional(annotation)
+    converter = {
+        str: _ATTRIBUTE_BY_TYPE[str],
+        bool: _ATTRIBUTE_BY_TYPE[bool],
+        int: _number,
+        float: _number,
+    }.get(annotation, _attribute_value)
+    return _optional(converter, {"NULL": True}) if optional and converter is not _attribute_value else converter
+
+
+class _ModelPlan:
+    __slots__ = ("decimal_fields", "attribute_fields")
+
+    def __init__(self, model_cls):
+        fields = model_cls.model_fields
+        self.decimal_fields: List[Tuple[str, Converter]] = [
+            (name, _decimal_converter(field.annotation)) for name, field in fields.items()]
+        self.attribute_fields: List[Tuple[str, Callable]] = [
+            (name, _attribute_converter(field.annotation)) for name, field in fields.items()]
+
+
+_plans: Dict[type, _ModelPlan] = {}
+
+
+def _plan_for(model_cls) -> _ModelPlan:
+    plan = _plans.get(model_cls)
+    if plan is None:
+        plan = _plans[model_cls] = _ModelPlan(model_cls)
+    return plan
+
+
+def to_item(obj) -> dict:
+    """Serialize a Pydantic model or flat dict for the boto3 resource API (floats become Decimal)."""
+    if isinstance(obj, BaseModel):
+        item = {}
+        for name, converter in _plan_for(type(obj)).decimal_fields:
+            value = getattr(obj, name)
+            item[name] = converter(value) if converter else value
+        return item
+    return {k: _nested_to_decimal(v) for k, v in obj.items()}
+
+
+def to_attribute_values(obj) -> dict:
+    """Serialize a Pydantic model or dict straight to low-level AttributeValue form for the client API."""
+    if isinstance(obj, BaseModel):
+        return {name: converter(getattr(obj, name)) for name, converter in _plan_for(type(obj)).attribute_fields}
+    return {k: _attribute_value(v) for k, v in obj.items()}
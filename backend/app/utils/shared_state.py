@@ -0,0 +1,768 @@
+# shared_state.py
+#
+# State that every API worker must agree on: DDoS windows and blocks, replay
+# nonces, the attack log, alerts, the latest sensor readings and firmware
+# versions. SHARED_STATE_BACKEND selects where it lives:
+#   local  plain per-process structures (default, fine for a single worker)
+#   mmap   an append-only command log in a memory-mapped file
+#          (SHARED_STATE_PATH) that each worker on one host replays into
+#          its own copy of the state; not shared memory in the data sense
+#   redis  a Redis server at SHARED_STATE_REDIS_URL, or the stand-in in
+#          app/utils/resp_server.py
+# Both shared stores run the same small subset of Redis commands, so the
+# structures built on top (SharedRateLimiter, SharedNonceStore, ...) work
+# unchanged on either one. Their calls block on socket or flock I/O, so async
+# code goes through call_state/submit_state rather than calling them directly.
+
+import asyncio
+import bisect
+import fcntl
+import json
+import logging
+import mmap
+import os
+import pickle
+import socket
+import struct
+import tempfile
+import threading
+import time
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Callable, Dict, Iterator, List, MutableMapping, Optional, Sequence, Tuple
+from urllib.parse import urlparse
+
+logger = logging.getLogger(__name__)
+
+SHARED_STATE_BACKEND = os.getenv("SHARED_STATE_BACKEND", "local")
+SHARED_STATE_PATH = os.getenv("SHARED_STATE_PATH", os.path.join(
+    "/dev/shm" if os.path.isdir("/dev/shm") else tempfile.gettempdir(), "lx-fta-shared-state"))
+# Docker gives /dev/shm 64 MiB by default, so stay well inside it
+SHARED_STATE_MMAP_BYTES = int(os.getenv("SHARED_STATE_MMAP_BYTES", str(16 * 1024 * 1024)))
+# The mmap log is folded into a snapshot once the commands after the last one outgrow it (and this floor)
+SHARED_STATE_COMPACT_BYTES = int(os.getenv("SHARED_STATE_COMPACT_BYTES", str(1024 * 1024)))
+SHARED_STATE_REDIS_URL = os.getenv("SHARED_STATE_REDIS_URL", "redis://127.0.0.1:6379/0")
+SHARED_STATE_TIMEOUT_SECONDS = float(os.getenv("SHARED_STATE_TIMEOUT_SECONDS", "2"))
+SHARED_STATE_THREADS = int(os.getenv("SHARED_STATE_THREADS", "8"))
+
+Command = Sequence[Any]
+
+
+class StateError(Exception):
+    pass
+
+
+class SimpleString(str):
+    """A status reply such as OK (RESP '+'), as opposed to a stored value."""
+
+
+OK = SimpleString("OK")
+QUEUED = SimpleString("QUEUED")
+PONG = SimpleString("PONG")
+
+WRITE_COMMANDS = frozenset({
+    "SET", "DEL", "INCR", "PEXPIRE", "HSET", "HDEL", "RPUSH", "LTRIM", "SADD", "SREM", "ZADD",
+    "ZREMRANGEBYSCORE", "FLUSHALL", "EVAL",
+})
+
+# Lua scripts sent with EVAL. Redis runs the Lua; StateEngine runs the Python
+# registered for the same source, so the stand-ins stay atomic as well.
+LEASE_RENEW_SCRIPT = (
+    "if redis.call('GET', KEYS[1]) == ARGV[1] then "
+    "return redis.call('PEXPIRE', KEYS[1], ARGV[2]) else return 0 end"
+)
+
+
+def _score_bound(value) -> Tuple[float, bool]:
+    """(bound, exclusive) from a ZRANGEBYSCORE-style bound like '-inf', '5' or '(5'."""
+    text = str(value)
+    exclusive = text.startswith("(")
+    text = text[1:] if exclusive else text
+    return float({"-inf": "-inf", "+inf": "inf", "inf": "inf"}.get(text, text)), exclusive
+
+
+def _index_range(length: int, start, stop) -> Tuple[int, int]:
+    start, stop = int(start), int(stop)
+    if start < 0:
+        start = max(length + start, 0)
+    if stop < 0:
+        stop = length + stop
+    return start, min(stop, length - 1)
+
+
+class StateEngine:
+    """
+    In-memory implementation of the command subset. Expiry times are absolute
+    wall-clock seconds computed from the `now` each command runs at. Replaying
+    the same commands with the same timestamps therefore always rebuilds the
+    same state.
+    """
+
+    def __init__(self):
+        self.data: Dict[str, Any] = {}
+        self.expires: Dict[str, float] = {}
+
+    def execute(self, command: str, args: Sequence[Any], now: float):
+        handler = getattr(self, f"_cmd_{command.lower()}", None)
+        if handler is None:
+            raise StateError(f"ERR unknown command '{command}'")
+        return handler(now, *[str(a) for a in args])
+
+    def snapshot(self, now: float) -> tuple:
+        for key in [k for k, expiry in self.expires.items() if expiry <= now]:
+            self._remove(key)
+        return self.data, self.expires
+
+    def restore(self, data: dict, expires: dict):
+        self.data, self.expires = data, expires
+
+    def _remove(self, key: str):
+        self.data.pop(key, None)
+        self.expires.pop(key, None)
+
+    def _get(self, key: str, now: float, kind: type = None):
+        expiry = self.expires.get(key)
+        if expiry is not None and expiry <= now:
+            self._remove(key)
+        value = self.data.get(key)
+        if value is not None and kind is not None and type(value) is not kind:
+            raise StateError("WRONGTYPE Operation against a key holding the wrong kind of value")
+        return value
+
+    def _container(self, key: str, now: float, kind: type):
+        value = self._get(key, now, kind)
+        if value is None:
+            value = self.data[key] = kind()
+        return value
+
+    def _drop_if_empty(self, key: str):
+        if not self.data.get(key):
+            self._remove(key)
+
+    # Strings and keys
+    def _cmd_get(self, now, key):
+        return self._get(key, now, str)
+
+    def _cmd_set(self, now, key, value, *options):
+        options = [o.upper() for o in options]
+        if "NX" in options and self._get(key, now) is not None:
+            return None
+        self.data[key] = value
+        self.expires.pop(key, None)
+        if "PX" in options:
+            self.expires[key] = now + int(options[options.index("PX") + 1]) / 1000
+        return OK
+
+    def _cmd_del(self, now, *keys):
+        removed = sum(1 for key in keys if self._get(key, now) is not None)
+        for key in keys:
+            self._remove(key)
+        return removed
+
+    def _cmd_exists(self, now, *keys):
+        return sum(1 for key in keys if self._get(key, now) is not None)
+
+    def _cmd_incr(self, now, key):
+        value = int(self._get(key, now, str) or 0) + 1
+        self.data[key] = str(value)
+        return value
+
+    def _cmd_pexpire(self, now, key, milliseconds):
+        if self._get(key, now) is None:
+            return 0
+        self.expires[key] = now + int(milliseconds) / 1000
+        return 1
+
+    def _cmd_flushall(self, now):
+        self.data.clear()
+        self.expires.clear()
+        return OK
+
+    # Scripts
+    def _script_renew_lease(self, now, keys, argv):
+        if self._get(keys[0], now) != argv[0]:
+            return 0
+        return self._cmd_pexpire(now, keys[0], argv[1])
+
+    _SCRIPTS = {LEASE_RENEW_SCRIPT: _script_renew_lease}
+
+    def _cmd_eval(self, now, script, numkeys, *rest):
+        handler = self._SCRIPTS.get(script)
+        if handler is None:
+            raise StateError("NOSCRIPT Only the scripts defined in shared_state are supported")
+        return handler(self, now, rest[:int(numkeys)], rest[int(numkeys):])
+
+    # Hashes
+    def _cmd_hset(self, now, key, *pairs):
+        hash_ = self._container(key, now, dict)
+        added = 0
+        for field, value in zip(pairs[::2], pairs[1::2]):
+            added += field not in hash_
+            hash_[field] = value
+        return added
+
+    def _cmd_hget(self, now, key, field):
+        return (self._get(key, now, dict) or {}).get(field)
+
+    def _cmd_hdel(self, now, key, *fields):
+        hash_ = self._get(key, now, dict) or {}
+        removed = sum(1 for field in fields if hash_.pop(field, None) is not None)
+        self._drop_if_empty(key)
+        return removed
+
+    def _cmd_hgetall(self, now, key):
+        return [item for pair in (self._get(key, now, dict) or {}).items() for item in pair]
+
+    def _cmd_hlen(self, now, key):
+        return len(self._get(key, now, dict) or {})
+
+    # Lists
+    def _cmd_rpush(self, now, key, *values):
+        items = self._container(key, now, list)
+        items.extend(values)
+        return len(items)
+
+    def _cmd_ltrim(self, now, key, start, stop):
+        items = self._get(key, now, list)
+        if items is not None:
+            start, stop = _index_range(len(items), start, stop)
+            items[:] = items[start:stop + 1] if start <= stop else []
+            self._drop_if_empty(key)
+        return OK
+
+    def _cmd_lrange(self, now, key, start, stop):
+        items = self._get(key, now, list) or []
+        start, stop = _index_range(len(items), start, stop)
+        return items[start:stop + 1] if start <= stop else []
+
+    def _cmd_llen(self, now, key):
+        return len(self._get(key, now, list) or [])
+
+    # Sets
+    def _cmd_sadd(self, now, key, *members):
+        members_ = self._container(key, now, set)
+        before = len(members_)
+        members_.update(members)
+        return len(members_) - before
+
+    def _cmd_srem(self, now, key, *members):
+        members_ = self._get(key, now, set) or set()
+        removed = sum(1 for member in members if member in members_)
+        members_.difference_update(members)
+        self._drop_if_empty(key)
+        return removed
+
+    def _cmd_smembers(self, now, key):
+        return sorted(self._get(key, now, set) or ())
+
+    # Sorted sets (only what the sliding windows need)
+    def _cmd_zadd(self, now, key, *pairs):
+        sorted_set = self._container(key, now, _SortedSet)
+        return sum(sorted_set.add(member, float(score)) for score, member in zip(pairs[::2], pairs[1::2]))
+
+    def _cmd_zremrangebyscore(self, now, key, low, high):
+        sorted_set = self._get(key, now, _SortedSet)
+        if not sorted_set:
+            return 0
+        removed = sorted_set.remove_range(*_score_bound(low), *_score_bound(high))
+        self._drop_if_empty(key)
+        return removed
+
+    def _cmd_zcard(self, now, key):
+        return len(self._get(key, now, _SortedSet) or ())
+
+
+def _entry_score(entry: Tuple[float, str]) -> float:
+    return entry[0]
+
+
+class _SortedSet:
+    """member -> score plus a (score, member) list kept in order, so range removal is a bisect and a slice."""
+
+    __slots__ = ("scores", "order")
+
+    def __init__(self):
+        self.scores: Dict[str, float] = {}
+        self.order: List[Tuple[float, str]] = []
+
+    def __len__(self) -> int:
+        return len(self.scores)
+
+    def add(self, member: str, score: float) -> int:
+        old = self.scores.get(member)
+        if old is not None:
+            del self.order[bisect.bisect_left(self.order, (old, member))]
+        self.scores[member] = score
+        bisect.insort(self.order, (score, member))
+        return old is None
+
+    def remove_range(self, low: float, low_open: bool, high: float, high_open: bool) -> int:
+        start = (bisect.bisect_right if low_open else bisect.bisect_left)(self.order, low, key=_entry_score)
+        stop = (bisect.bisect_left if high_open else bisect.bisect_right)(self.order, high, key=_entry_score)
+        if start >= stop:
+            return 0
+        for _, member in self.order[start:stop]:
+            del self.scores[member]
+        del self.order[start:stop]
+        return stop - start
+
+
+class SharedState:
+    """A shared store that runs Redis-style commands; `pipeline` runs a group atomically."""
+
+    name = ""
+
+    def pipeline(self, commands: List[Command]) -> list:
+        raise NotImplementedError
+
+    def execute(self, *command):
+        return self.pipeline([command])[0]
+
+    def get_stats(self) -> dict:
+        return {"backend": self.name}
+
+
+def _raise_errors(results: list) -> list:
+    for result in results:
+        if isinstance(result, StateError):
+            raise result
+    return results
+
+
+# ----------------------
+# mmap: shared command log
+# ----------------------
+HEADER = struct.Struct("<4sIQ")  # magic, generation, end offset of the log
+RECORD_LENGTH = struct.Struct("<I")
+MAGIC = b"LXS1"
+
+
+class MmapState(SharedState):
+    """
+    Workers on one host share a memory-mapped file holding an append-only log
+    of write commands. The state itself is not shared: each process keeps its
+    own materialized copy and, under an flock, replays whatever the others
+    appended since its last call, runs its commands and appends the writes.
+    Every process therefore pays for every write, and a new process replays
+    the log from its last snapshot. To keep that bounded, once the commands
+    after the snapshot outgrow it (or compact_bytes, whichever is larger),
+    the current state is written as a fresh snapshot record at the start of
+    the file and the generation is bumped, which tells the other processes to
+    rebuild from it. Replay is then at most about twice the live state, and
+    each compaction's cost is amortized over at least as many bytes of log.
+    Records are pickled; the file is only shared between this app's own
+    workers.
+    """
+
+    name = "mmap"
+
+    def __init__(self, path: str = SHARED_STATE_PATH, size: int = SHARED_STATE_MMAP_BYTES,
+                 compact_bytes: int = SHARED_STATE_COMPACT_BYTES):
+        self.path = path
+        self.size = size
+        self.compact_bytes = compact_bytes
+        self._lock = threading.Lock()
+        self._pid: Optional[int] = None
+        self._fd: Optional[int] = None
+        self._map: Optional[mmap.mmap] = None
+        self._engine = StateEngine()
+        self._generation: Optional[int] = None
+        self._offset = HEADER.size
+        self._snapshot_end = HEADER.size
+        self.stats = {"commands": 0, "records_replayed": 0, "compactions": 0}
+
+    def _ensure_open(self):
+        # A descriptor inherited across fork shares its flock with the parent, so each process opens its own
+        if self._pid == os.getpid():
+            return
+        if self._fd is not None:
+            self._map.close()
+            os.close(self._fd)
+        fd = os.open(self.path, os.O_RDWR | os.O_CREAT, 0o600)
+        fcntl.flock(fd, fcntl.LOCK_EX)
+        try:
+            if os.fstat(fd).st_size < self.size:
+                os.ftruncate(fd, self.size)
+            self._map = mmap.mmap(fd, os.fstat(fd).st_size)
+            magic, _, _ = HEADER.unpack_from(self._map, 0)
+            if magic != MAGIC:
+                HEADER.pack_into(self._map, 0, MAGIC, 0, HEADER.size)
+        finally:
+            fcntl.flock(fd, fcntl.LOCK_UN)
+        self._fd = fd
+        self._pid = os.getpid()
+        self._engine = StateEngine()
+        self._generation = None
+        self._offset = HEADER.size
+        self._snapshot_end = HEADER.size
+
+    def _sync(self):
+        _, generation, end = HEADER.unpack_from(self._map, 0)
+        if generation != self._generation:
+            self._engine = StateEngine()
+            self._generation = generation
+            self._offset = HEADER.size
+            self._snapshot_end = HEADER.size
+        while self._offset < end:
+            (length,) = RECORD_LENGTH.unpack_from(self._map, self._offset)
+            start = self._offset + RECORD_LENGTH.size
+            if self._apply(pickle.loads(self._map[start:start + length])):
+                self._snapshot_end = start + length
+            self._offset = start + length
+            self.stats["records_replayed"] += 1
+
+    def _apply(self, record: tuple) -> bool:
+        """Replay one record; True if it was a snapshot."""
+        if record[0] == "snapshot":
+            self._engine.restore(*record[1:])
+            return True
+        _, now, commands = record
+        for command in commands:
+            try:
+                self._engine.execute(command[0], command[1:], now)
+            except StateError:
+                pass  # failed identically when it first ran
+        return False
+
+    def _append(self, record: tuple, now: float):
+        payload = pickle.dumps(record, protocol=pickle.HIGHEST_PROTOCOL)
+        if self._offset + RECORD_LENGTH.size + len(payload) > len(self._map):
+            self._compact(now)  # the snapshot already includes this record's commands
+            return
+        self._write_record(self._offset, payload)
+        HEADER.pack_into(self._map, 0, MAGIC, self._generation, self._offset)
+        if self._offset - self._snapshot_end > max(self._snapshot_end - HEADER.size, self.compact_bytes):
+            self._compact(now)
+
+    def _write_record(self, offset: int, payload: bytes):
+        RECORD_LENGTH.pack_into(self._map, offset, len(payload))
+        start = offset + RECORD_LENGTH.size
+        self._map[start:start + len(payload)] = payload
+        self._offset = start + len(payload)
+
+    def _compact(self, now: float):
+        payload = pickle.dumps(("snapshot", *self._engine.snapshot(now)), protocol=pickle.HIGHEST_PROTOCOL)
+        if HEADER.size + RECORD_LENGTH.size + len(payload) > len(self._map):
+            raise StateError(f"Shared state no longer fits in {self.path}; raise SHARED_STATE_MMAP_BYTES")
+        self._generation = (self._generation + 1) % (1 << 32)
+        self._write_record(HEADER.size, payload)
+        self._snapshot_end = self._offset
+        HEADER.pack_into(self._map, 0, MAGIC, self._generation, self._offset)
+        self.stats["compactions"] += 1
+        logger.info(f"Compacted shared state log to {self._offset} bytes (generation {self._generation})")
+
+    def pipeline(self, commands: List[Command]) -> list:
+        now = time.time()
+        writes = [c for c in commands if str(c[0]).upper() in WRITE_COMMANDS]
+        with self._lock:
+            self._ensure_open()
+            fcntl.flock(self._fd, fcntl.LOCK_EX if writes else fcntl.LOCK_SH)
+            try:
+                self._sync()
+                results = []
+                for command in commands:
+                    try:
+                        results.append(self._engine.execute(command[0], command[1:], now))
+                    except StateError as e:
+                        results.append(e)
+                if writes:
+                    self._append(("commands", now, [tuple(str(a) for a in c) for c in writes]), now)
+            finally:
+                fcntl.flock(self._fd, fcntl.LOCK_UN)
+            self.stats["commands"] += len(commands)
+        return _raise_errors(results)
+
+    def get_stats(self) -> dict:
+        return {"backend": self.name, "path": self.path, "log_bytes": self._offset,
+                "snapshot_bytes": self._snapshot_end - HEADER.size,
+                "generation": self._generation, **self.stats}
+
+
+# ----------------------
+# Redis protocol client
+# ----------------------
+def encode_command(command: Command) -> bytes:
+    parts = [f"*{len(command)}\r\n".encode()]
+    for arg in command:
+        data = arg if isinstance(arg, bytes) else str(arg).encode()
+        parts.append(b"$%d\r\n%s\r\n" % (len(data), data))
+    return b"".join(parts)
+
+
+def read_reply(stream):
+    """One RESP reply from a binary file-like object; error replies come back as StateError instances."""
+    line = stream.readline()
+    if not line:
+        raise ConnectionError("Connection closed by shared state server")
+    kind, body = line[:1], line[1:-2]
+    if kind == b"+":
+        return SimpleString(body.decode())
+    if kind == b"-":
+        return StateError(body.decode())
+    if kind == b":":
+        return int(body)
+    if kind == b"$":
+        length = int(body)
+        if length < 0:
+            return None
+        return stream.read(length + 2)[:-2].decode()
+    if kind == b"*":
+        count = int(body)
+        return None if count < 0 else [read_reply(stream) for _ in range(count)]
+    raise StateError(f"Unexpected reply from shared state server: {line!r}")
+
+
+class RedisState(SharedState):
+    """
+    Minimal RESP client with one connection per thread. A group of commands
+    is sent as a single MULTI/EXEC write and answered in one round trip.
+    """
+
+    name = "redis"
+
+    def __init__(self, url: str = SHARED_STATE_REDIS_URL, timeout: float = SHARED_STATE_TIMEOUT_SECONDS):
+        parsed = urlparse(url)
+        self.host = parsed.hostname or "127.0.0.1"
+        self.port = parsed.port or 6379
+        self.db = int(parsed.path.lstrip("/") or 0)
+        self.password = parsed.password
+        self.timeout = timeout
+        self._local = threading.local()
+        self.stats = {"commands": 0, "round_trips": 0, "reconnects": 0}
+
+    def _connection(self):
+        conn = getattr(self._local, "conn", None)
+        if conn is not None and conn[0] == os.getpid():
+            return conn
+        sock = socket.create_connection((self.host, self.port), timeout=self.timeout)
+        sock.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+        # Kernel-side timeouts on a blocking socket: a Python-level timeout adds a poll() to every send and recv
+        sock.settimeout(None)
+        timeval = struct.pack("ll", int(self.timeout), int(self.timeout % 1 * 1_000_000))
+        sock.setsockopt(socket.SOL_SOCKET, socket.SO_RCVTIMEO, timeval)
+        sock.setsockopt(socket.SOL_SOCKET, socket.SO_SNDTIMEO, timeval)
+        conn = self._local.conn = (os.getpid(), sock, sock.makefile("rb"))
+        setup = ([("AUTH", self.password)] if self.password else []) + ([("SELECT", self.db)] if self.db else [])
+        if setup:
+            self._round_trip(conn, setup)
+        return conn
+
+    def _round_trip(self, conn, commands: List[Command]) -> list:
+        _, sock, stream = conn
+        sock.sendall(b"".join(encode_command(c) for c in commands))
+        self.stats["round_trips"] += 1
+        return _raise_errors([read_reply(stream) for _ in commands])
+
+    def _close(self):
+        conn = getattr(self._local, "conn", None)
+        self._local.conn = None
+        if conn is not None:
+            try:
+                conn[1].close()
+            except OSError:
+                pass
+
+    def pipeline(self, commands: List[Command]) -> list:
+        framed = commands if len(commands) == 1 else [("MULTI",), *commands, ("EXEC",)]
+        for attempt in range(2):
+            try:
+                replies = self._round_trip(self._connection(), framed)
+                break
+            except (ConnectionError, OSError):
+                # One reconnect for a connection the server dropped while idle
+                self._close()
+                if attempt:
+                    raise
+                self.stats["reconnects"] += 1
+        self.stats["commands"] += len(commands)
+        return replies if len(commands) == 1 else _raise_errors(replies[-1])
+
+    def get_stats(self) -> dict:
+        return {"backend": self.name, "host": self.host, "port": self.port, **self.stats}
+
+
+_STATES = {"mmap": MmapState, "redis": RedisState}
+_state: Optional[SharedState] = None
+_state_lock = threading.Lock()
+
+
+def get_shared_state() -> Optional[SharedState]:
+    """The configured shared store, or None when state is per-process (SHARED_STATE_BACKEND=local)."""
+    global _state
+    if SHARED_STATE_BACKEND == "local":
+        return None
+    if _state is None:
+        with _state_lock:
+            if _state is None:
+                state_cls = _STATES.get(SHARED_STATE_BACKEND)
+                if state_cls is None:
+                    raise ValueError(f"Unknown SHARED_STATE_BACKEND '{SHARED_STATE_BACKEND}', expected local or "
+                                     f"one of {sorted(_STATES)}")
+                _state = state_cls()
+                logger.info(f"Using {SHARED_STATE_BACKEND} shared state")
+    return _state
+
+
+def select_state(local_factory: Callable[[], Any], shared_factory: Callable[[SharedState], Any]):
+    """Build the per-process structure, or its shared counterpart when a shared backend is configured."""
+    state = get_shared_state()
+    return local_factory() if state is None else shared_factory(state)
+
+
+def get_shared_state_stats() -> dict:
+    state = get_shared_state()
+    return {"backend": "local"} if state is None else state.get_stats()
+
+
+# ----------------------
+# Calling from async code
+# ----------------------
+# Threads only start on first use, so forked workers each get their own
+_state_executor = ThreadPoolExecutor(max_workers=SHARED_STATE_THREADS, thread_name_prefix="shared-state")
+# A single thread, so fire-and-forget writes land in the order they were submitted
+_state_writer = ThreadPoolExecutor(max_workers=1, thread_name_prefix="shared-state-writer")
+
+
+async def call_state(fn: Callable[..., Any], *args):
+    """
+    Await `fn(*args)` without blocking the event loop on shared state: it runs
+    on the shared-state executor when a shared backend is configured. Local
+    state is plain in-process data owned by the loop, so it is called inline.
+    """
+    if get_shared_state() is None:
+        return fn(*args)
+    return await asyncio.get_running_loop().run_in_executor(_state_executor, fn, *args)
+
+
+def _log_write_failure(future):
+    error = future.exception()
+    if error is not None:
+        logger.error(f"Background shared state write failed: {error}")
+
+
+def submit_state(fn: Callable[..., Any], *args):
+    """Run a write nobody waits on, such as caching an alert, without blocking the caller."""
+    if get_shared_state() is None:
+        fn(*args)
+        return
+    _state_writer.submit(fn, *args).add_done_callback(_log_write_failure)
+
+
+# ----------------------
+# Generic shared structures
+# ----------------------
+class CappedList:
+    """Newest `capacity` items, in insertion order."""
+
+    def __init__(self, capacity: int):
+        self._items = deque(maxlen=capacity)
+
+    def append(self, item):
+        self._items.append(item)
+
+    def recent(self, count: int) -> list:
+        return list(self._items)[-count:] if count > 0 else []
+
+    def __len__(self) -> int:
+        return len(self._items)
+
+
+class SharedCappedList:
+    """CappedList over a SharedState: a JSON-encoded list trimmed on every append."""
+
+    def __init__(self, state: SharedState, key: str, capacity: int):
+        self.state = state
+        self.key = key
+        self.capacity = capacity
+
+    def append(self, item):
+        self.state.pipeline([("RPUSH", self.key, json.dumps(item)), ("LTRIM", self.key, -self.capacity, -1)])
+
+    def recent(self, count: int) -> list:
+        if count <= 0:
+            return []
+        return [json.loads(raw) for raw in self.state.execute("LRANGE", self.key, -count, -1)]
+
+    def __len__(self) -> int:
+        return self.state.execute("LLEN", self.key)
+
+
+def _json_decode(field: str, raw: str):
+    return json.loads(raw)
+
+
+class SharedMapping(MutableMapping):
+    """
+    A dict over one shared hash. Values are encoded on write and decoded on
+    every read, so mutate by assigning a new value, never in place.
+    """
+
+    def __init__(self, state: SharedState, key: str, encode: Callable[[Any], str] = json.dumps,
+                 decode: Callable[[str, str], Any] = _json_decode):
+        self.state = state
+        self.key = key
+        self._encode = encode
+        self._decode = decode
+
+    def __getitem__(self, field: str):
+        raw = self.state.execute("HGET", self.key, field)
+        if raw is None:
+            raise KeyError(field)
+        return self._decode(field, raw)
+
+    def __setitem__(self, field: str, value):
+        self.state.execute("HSET", self.key, field, self._encode(value))
+
+    def __delitem__(self, field: str):
+        if not self.state.execute("HDEL", self.key, field):
+            raise KeyError(field)
+
+    def __contains__(self, field) -> bool:
+        return self.state.execute("HGET", self.key, field) is not None
+
+    def _fields(self) -> Dict[str, str]:
+        flat = self.state.execute("HGETALL", self.key)
+        return dict(zip(flat[::2], flat[1::2]))
+
+    def __iter__(self) -> Iterator[str]:
+        return iter(list(self._fields()))
+
+    def __len__(self) -> int:
+        return self.state.execute("HLEN", self.key)
+
+    def update(self, other=(), **kwargs):
+        # One HSET for every field instead of a round trip each
+        pairs = dict(other, **kwargs)
+        if pairs:
+            self.state.execute("HSET", self.key, *[part for field, value in pairs.items()
+                                                   for part in (field, self._encode(value))])
+
+    def items(self):
+        # One round trip instead of HGET per field
+        return [(field, self._decode(field, raw)) for field, raw in self._fields().items()]
+
+    def values(self):
+        return [value for _, value in self.items()]
+
+
+class Lease:
+    """
+    Single-holder lease for work only one worker should do, such as generating
+    sensor readings. It always succeeds on local state.
+    """
+
+    def __init__(self, state: Optional[SharedState], key: str, ttl_seconds: float):
+        self.state = state
+        self.key = key
+        self.ttl_ms = int(ttl_seconds * 1000)
+        self.owner = None
+
+    def acquire(self) -> bool:
+        """Take or renew the lease; False while another worker holds it."""
+        if self.state is None:
+            return True
+        self.owner = f"{socket.gethostname()}:{os.getpid()}"  # forked workers must not share the parent's identity
+        if self.state.execute("SET", self.key, self.owner, "NX", "PX", self.ttl_ms) is not None:
+            return True
+        # Compare and extend in one step, so a lease that has changed hands is never renewed
+        return bool(self.state.execute("EVAL", LEASE_RENEW_SCRIPT, 1, self.key, self.owner, self.ttl_ms))
@@ -0,0 +1,417 @@
+# storage.py
+#
+# Storage backends behind dynamodb_helper. STORAGE_BACKEND selects one:
+#   dynamodb  real tables through the shared AWS layer (default)
+#   memory    per-process dicts, for benchmarks and tests
+#   sqlite    one local database file (STORAGE_SQLITE_PATH), survives restarts
+# The local backends accept the same item shapes and scan arguments and return
+# DynamoDB-shaped responses. They can inject per-call latency
+# (STORAGE_LATENCY_MS, STORAGE_LATENCY_JITTER_MS) and throttle against
+# provisioned capacity (STORAGE_RCU / STORAGE_WCU per table, 0 = unlimited) the
+# way DynamoDB does: throttled puts and scans raise
+# ProvisionedThroughputExceededException, and batch writes return the overflow
+# as unprocessed items.
+
+import bisect
+import json
+import logging
+import os
+import random
+import sqlite3
+import threading
+import time
+import uuid
+import zlib
+from decimal import Decimal
+from typing import Dict, List, Optional, Tuple
+
+from botocore.exceptions import ClientError
+
+from app.utils.serializer import to_attribute_values, to_item
+
+logger = logging.getLogger(__name__)
+
+STORAGE_BACKEND = os.getenv("STORAGE_BACKEND", "dynamodb")
+STORAGE_SQLITE_PATH = os.getenv("STORAGE_SQLITE_PATH", "local_storage.db")
+STORAGE_LATENCY_MS = float(os.getenv("STORAGE_LATENCY_MS", "0"))
+STORAGE_LATENCY_JITTER_MS = float(os.getenv("STORAGE_LATENCY_JITTER_MS", "0"))
+STORAGE_RCU = float(os.getenv("STORAGE_RCU", "0"))
+STORAGE_WCU = float(os.getenv("STORAGE_WCU", "0"))
+
+# Primary key attributes per table, as created by create_tables_and_seed.py and the audit tables
+TABLE_KEYS = {
+    "lx-fta-soil-data": ("sensor_id",),
+    "lx-fta-atmospheric-data": ("sensor_id",),
+    "lx-fta-water-data": ("sensor_id",),
+    "lx-fta-threat-data": ("sensor_id",),
+    "lx-fta-plant-data": ("sensor_id",),
+    "lx-fta-audit-logs": ("id", "timestamp"),
+}
+DEFAULT_TABLE_KEY = ("id",)
+DEFAULT_SCAN_PAGE_ITEMS = 1000  # local stand-in for DynamoDB's 1 MB page limit
+READ_UNIT_BYTES = 4096
+WRITE_UNIT_BYTES = 1024
+
+
+def _throttled(operation: str) -> ClientError:
+    return ClientError({"Error": {"Code": "ProvisionedThroughputExceededException",
+                                  "Message": "Injected throttle: provisioned throughput exceeded"}}, operation)
+
+
+class _TokenBucket:
+    """Capacity units per second, with up to one second of burst."""
+
+    def __init__(self, rate: float):
+        self.rate = rate
+        self.tokens = rate
+        self.updated = time.monotonic()
+        self._lock = threading.Lock()
+
+    def take(self, units: float, partial: bool = False) -> float:
+        """Consume up to `units`; returns what was granted (all or nothing unless `partial`)."""
+        with self._lock:
+            now = time.monotonic()
+            self.tokens = min(self.rate, self.tokens + (now - self.updated) * self.rate)
+            self.updated = now
+            granted = min(units, self.tokens) if partial else (units if units <= self.tokens else 0.0)
+            self.tokens -= granted
+            return granted
+
+    def refund(self, units: float):
+        with self._lock:
+            self.tokens = min(self.rate, self.tokens + units)
+
+
+class StorageBackend:
+    name = ""
+
+    def prepare_batch_item(self, item) -> object:
+        raise NotImplementedError
+
+    def put_item(self, table_name: str, item: dict):
+        raise NotImplementedError
+
+    def batch_write(self, table_name: str, items: List[object]) -> List[object]:
+        """Write up to 25 prepared items; return the ones left unprocessed."""
+        raise NotImplementedError
+
+    def scan(self, table_name: str, **kwargs) -> dict:
+        raise NotImplementedError
+
+    def delete_items(self, table_name: str, keys: List[dict]) -> int:
+        raise NotImplementedError
+
+    def get_stats(self) -> dict:
+        return {"backend": self.name}
+
+
+class DynamoDBBackend(StorageBackend):
+    name = "dynamodb"
+
+    def prepare_batch_item(self, item) -> dict:
+        # AttributeValues for the low-level client, skipping the resource layer's serializer
+        attributes = to_attribute_values(item)
+        if "id" not in attributes:
+            attributes["id"] = {"S": str(uuid.uuid4())}
+        return {"PutRequest": {"Item": attributes}}
+
+    def put_item(self, table_name: str, item: dict):
+        from app.utils.aws_services import get_table
+
+        get_table(table_name).put_item(Item=item)
+
+    def batch_write(self, table_name: str, items: List[dict]) -> List[dict]:
+        from app.utils.aws_services import get_dynamodb_client
+
+        response = get_dynamodb_client().batch_write_item(RequestItems={table_name: items})
+        return response.get("UnprocessedItems", {}).get(table_name, [])
+
+    def scan(self, table_name: str, **kwargs) -> dict:
+        from app.utils.aws_services import get_table
+
+        return get_table(table_name).scan(**kwargs)
+
+    def delete_items(self, table_name: str, keys: List[dict]) -> int:
+        from app.utils.aws_services import get_table
+
+        with get_table(table_name).batch_writer() as batch:
+            for key in keys:
+                batch.delete_item(Key=key)
+        return len(keys)
+
+
+class LocalBackend(StorageBackend):
+    """
+    Shared behaviour of the local stand-ins: key extraction, segment
+    assignment, projection, latency injection and capacity throttling.
+    Subclasses store (key, item) pairs per table in insertion order.
+    """
+
+    def __init__(self, latency_ms: float = STORAGE_LATENCY_MS, jitter_ms: float = STORAGE_LATENCY_JITTER_MS,
+                 read_capacity: float = STORAGE_RCU, write_capacity: float = STORAGE_WCU):
+        self.latency_ms = latency_ms
+        self.jitter_ms = jitter_ms
+        self.read_capacity = read_capacity
+        self.write_capacity = write_capacity
+        self._buckets: Dict[Tuple[str, str], _TokenBucket] = {}
+        self._buckets_lock = threading.Lock()
+        self.stats = {"reads": 0, "writes": 0, "deletes": 0, "throttled": 0}
+
+    # -- capacity and latency ------------------------------------------------
+
+    def _bucket(self, table_name: str, kind: str) -> Optional[_TokenBucket]:
+        rate = self.read_capacity if kind == "read" else self.write_capacity
+        if rate <= 0:
+            return None
+        key = (table_name, kind)
+        bucket = self._buckets.get(key)
+        if bucket is None:
+            with self._buckets_lock:
+                bucket = self._buckets.setdefault(key, _TokenBucket(rate))
+        return bucket
+
+    def _delay(self):
+        if self.latency_ms or self.jitter_ms:
+            time.sleep((self.latency_ms + random.uniform(0, self.jitter_ms)) / 1000)
+
+    @staticmethod
+    def _size(item: dict) -> int:
+        return len(json.dumps(item, default=str))
+
+    @staticmethod
+    def _write_units(item: dict) -> float:
+        return float(-(-LocalBackend._size(item) // WRITE_UNIT_BYTES))
+
+    # -- item helpers ---------------------------------------------------------
+
+    def prepare_batch_item(self, item) -> dict:
+        prepared = to_item(item)
+        if "id" not in prepared:
+            prepared["id"] = str(uuid.uuid4())
+        return prepared
+
+    @staticmethod
+    def _key(table_name: str, item: dict) -> str:
+        attributes = TABLE_KEYS.get(table_name, DEFAULT_TABLE_KEY)
+        return json.dumps([str(item.get(a)) for a in attributes])
+
+    @staticmethod
+    def _segment(key: str, total_segments: int) -> int:
+        return zlib.crc32(key.encode()) % total_segments
+
+    # -- storage primitives (subclasses) --------------------------------------
+
+    def _put(self, table_name: str, key: str, item: dict):
+        raise NotImplementedError
+
+    def _delete(self, table_name: str, key: str) -> bool:
+        raise NotImplementedError
+
+    def _rows(self, table_name: str, offset: int) -> List[Tuple[int, str, dict]]:
+        """(position, key, item) from `offset` on, in insertion order, at most one page worth."""
+        raise NotImplementedError
+
+    # -- StorageBackend -------------------------------------------------------
+
+    def put_item(self, table_name: str, item: dict):
+        self._delay()
+        bucket = self._bucket(table_name, "write")
+        if bucket is not None and not bucket.take(self._write_units(item)):
+            self.stats["throttled"] += 1
+            raise _throttled("PutItem")
+        self._put(table_name, self._key(table_name, item), item)
+        self.stats["writes"] += 1
+
+    def batch_write(self, table_name: str, items: List[dict]) -> List[dict]:
+        self._delay()
+        bucket = self._bucket(table_name, "write")
+        accepted = len(items)
+        if bucket is not None:
+            units = [self._write_units(item) for item in items]
+            granted = bucket.take(sum(units), partial=True)
+            accepted, used = 0, 0.0
+            for u in units:
+                if used + u > granted:
+                    break
+                used += u
+                accepted += 1
+            bucket.refund(granted - used)  # hand back what the accepted prefix didn't use
+            if accepted < len(items):
+                self.stats["throttled"] += len(items) - accepted
+        for item in items[:accepted]:
+            self._put(table_name, self._key(table_name, item), item)
+        self.stats["writes"] += accepted
+        return items[accepted:]
+
+    def scan(self, table_name: str, **kwargs) -> dict:
+        self._delay()
+        limit = kwargs.get("Limit") or DEFAULT_SCAN_PAGE_ITEMS
+        segment = kwargs.get("Segment")
+        total_segments = kwargs.get("TotalSegments")
+        offset = kwargs.get("ExclusiveStartKey", {}).get("__offset", 0)
+        projection = None
+        if kwargs.get("ProjectionExpression"):
+            names = kwargs.get("ExpressionAttributeNames", {})
+            projection = [names.get(p.strip(), p.strip()) for p in kwargs["ProjectionExpression"].split(",")]
+
+        items, scanned, size = [], 0, 0
+        while len(items) < limit:
+            rows = self._rows(table_name, offset)
+            if not rows:
+                break
+            for position, key, item in rows:
+                offset = position + 1
+                if total_segments and self._segment(key, total_segments) != segment:
+                    continue
+                scanned += 1
+                size += self._size(item)
+                items.append({a: item[a] for a in projection if a in item} if projection else item)
+                if len(items) >= limit:
+                    break
+
+        # Like DynamoDB, reads are charged on the bytes scanned, not returned
+        units = max(0.5, -(-size // READ_UNIT_BYTES) * 0.5)
+        bucket = self._bucket(table_name, "read")
+        if bucket is not None and not bucket.take(units):
+            self.stats["throttled"] += 1
+            raise _throttled("Scan")
+        self.stats["reads"] += 1
+
+        response = {"Items": items, "Count": len(items), "ScannedCount": scanned,
+                    "ConsumedCapacity": {"TableName": table_name, "CapacityUnits": units}}
+        if len(items) >= limit:
+            # As with DynamoDB, a full page always carries a key; the next page may come back empty
+            response["LastEvaluatedKey"] = {"__offset": offset}
+        return response
+
+    def delete_items(self, table_name: str, keys: List[dict]) -> int:
+        self._delay()
+        deleted = sum(1 for key in keys if self._delete(table_name, self._key(table_name, key)))
+        self.stats["deletes"] += deleted
+        return deleted
+
+    def get_stats(self) -> dict:
+        return {"backend": self.name, **self.stats}
+
+
+class _MemoryTable:
+    __slots__ = ("items", "order", "keys", "next_position")
+
+    def __init__(self):
+        self.items: Dict[str, Tuple[int, dict]] = {}  # key -> (position, item)
+        self.order: List[int] = []  # live positions, ascending
+        self.keys: Dict[int, str] = {}  # position -> key
+        self.next_position = 0
+
+
+class MemoryBackend(LocalBackend):
+    name = "memory"
+    ROWS_PER_FETCH = 500
+
+    def __init__(self, **kwargs):
+        super().__init__(**kwargs)
+        # Positions only grow, so scan pagination stays stable under concurrent writes
+        self._tables: Dict[str, _MemoryTable] = {}
+        self._lock = threading.Lock()
+
+    def _forget(self, table: _MemoryTable, key: str) -> bool:
+        entry = table.items.pop(key, None)
+        if entry is None:
+            return False
+        table.order.pop(bisect.bisect_left(table.order, entry[0]))
+        del table.keys[entry[0]]
+        return True
+
+    def _put(self, table_name: str, key: str, item: dict):
+        with self._lock:
+            table = self._tables.get(table_name)
+            if table is None:
+                table = self._tables[table_name] = _MemoryTable()
+            self._forget(table, key)  # a replaced item moves to the end, like a fresh write
+            position = table.next_position
+            table.next_position += 1
+            table.items[key] = (position, dict(item))
+            table.order.append(position)
+            table.keys[position] = key
+
+    def _delete(self, table_name: str, key: str) -> bool:
+        with self._lock:
+            table = self._tables.get(table_name)
+            return table is not None and self._forget(table, key)
+
+    def _rows(self, table_name: str, offset: int) -> List[Tuple[int, str, dict]]:
+        with self._lock:
+            table = self._tables.get(table_name)
+            if table is None:
+                return []
+            start = bisect.bisect_left(table.order, offset)
+            return [(position, table.keys[position], table.items[table.keys[position]][1])
+                    for position in table.order[start:start + self.ROWS_PER_FETCH]]
+
+
+class SQLiteBackend(LocalBackend):
+    name = "sqlite"
+    ROWS_PER_FETCH = 500
+
+    def __init__(self, path: str = STORAGE_SQLITE_PATH, **kwargs):
+        super().__init__(**kwargs)
+        self.path = path
+        self._local = threading.local()
+        self._known_tables = set()
+        self._schema_lock = threading.Lock()
+
+    def _conn(self) -> sqlite3.Connection:
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, timeout=30, isolation_level=None)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            self._local.conn = conn
+        return conn
+
+    def _table(self, table_name: str) -> str:
+        quoted = '"' + table_name.replace('"', '""') + '"'
+        if table_name not in self._known_tables:
+            with self._schema_lock:
+                self._conn().execute(f"CREATE TABLE IF NOT EXISTS {quoted} "
+                                     "(position INTEGER PRIMARY KEY AUTOINCREMENT, pk TEXT UNIQUE, body TEXT)")
+                self._known_tables.add(table_name)
+        return quoted
+
+    def _put(self, table_name: str, key: str, item: dict):
+        # REPLACE deletes the old row first, so an overwritten item moves to the end
+        self._conn().execute(f"INSERT OR REPLACE INTO {self._table(table_name)} (pk, body) VALUES (?, ?)",
+                             (key, json.dumps(item, default=float)))
+
+    def _delete(self, table_name: str, key: str) -> bool:
+        return self._conn().execute(f"DELETE FROM {self._table(table_name)} WHERE pk = ?", (key,)).rowcount > 0
+
+    def _rows(self, table_name: str, offset: int) -> List[Tuple[int, str, dict]]:
+        rows = self._conn().execute(
+            f"SELECT position, pk, body FROM {self._table(table_name)} WHERE position >= ? ORDER BY position LIMIT ?",
+            (offset, self.ROWS_PER_FETCH)).fetchall()
+        return [(position, key, json.loads(body, parse_float=Decimal)) for position, key, body in rows]
+
+
+_BACKENDS = {"dynamodb": DynamoDBBackend, "memory": MemoryBackend, "sqlite": SQLiteBackend}
+_storage: Optional[StorageBackend] = None
+_storage_lock = threading.Lock()
+
+
+def get_storage() -> StorageBackend:
+    global _storage
+    if _storage is None:
+        with _storage_lock:
+            if _storage is None:
+                backend_cls = _BACKENDS.get(STORAGE_BACKEND)
+                if backend_cls is None:
+                    raise ValueError(f"Unknown STORAGE_BACKEND '{STORAGE_BACKEND}' (use one of {', '.join(_BACKENDS)})")
+                _storage = backend_cls()
+                logger.info(f"Using {_storage.name} storage backend")
+    return _storage
+
+
+def set_storage(backend: StorageBackend):
+    """Swap the active backend (benchmarks and load tests)."""
+    global _storage
+    _storage = backend
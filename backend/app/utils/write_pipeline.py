@@ -0,0 +1,74 @@
+# write_pipeline.py
+
+import asyncio
+import logging
+import time
+from collections import defaultdict
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict
+
+from app.utils.dynamodb_helper import batch_write_items
+
+logger = logging.getLogger(__name__)
+
+
+class SensorWritePipeline:
+    """
+    Collects one refresh cycle of sensor readings and flushes them per table
+    with BatchWriteItem on a worker thread, so the event loop never waits on DynamoDB.
+    """
+
+    def __init__(self, max_workers: int = 5):
+        self._pending: Dict[str, list] = defaultdict(list)
+        self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="ddb-writer")
+        self.stats = {
+            "flush_count": 0,
+            "last_flush_ms": 0.0,
+            "max_flush_ms": 0.0,
+            "total_flush_ms": 0.0,
+            "items_written": 0,
+            "items_retried": 0,
+            "items_failed": 0,
+            "flush_errors": 0,
+        }
+
+    def add(self, table_name: str, item):
+        self._pending[table_name].append(item)
+
+    async def flush(self):
+        if not self._pending:
+            return
+        batches, self._pending = self._pending, defaultdict(list)
+
+        loop = asyncio.get_running_loop()
+        started = time.perf_counter()
+        results = await asyncio.gather(
+            *[loop.run_in_executor(self._executor, batch_write_items, table_name, items)
+              for table_name, items in batches.items()],
+            return_exceptions=True
+        )
+        elapsed_ms = (time.perf_counter() - started) * 1000
+
+        for table_name, result in zip(batches, results):
+            if isinstance(result, Exception):
+                logger.error(f"Batch flush to {table_name} failed: {result}")
+                self.stats["flush_errors"] += 1
+                self.stats["items_failed"] += len(batches[table_name])
+                continue
+            self.stats["items_written"] += result["written"]
+            self.stats["items_retried"] += result["retried"]
+            self.stats["items_failed"] += result["failed"]
+
+        self.stats["flush_count"] += 1
+        self.stats["last_flush_ms"] = round(elapsed_ms, 2)
+        self.stats["max_flush_ms"] = round(max(self.stats["max_flush_ms"], elapsed_ms), 2)
+        self.stats["total_flush_ms"] += elapsed_ms
+
+    def get_stats(self) -> dict:
+        count = self.stats["flush_count"]
+        return {
+            **self.stats,
+            "total_flush_ms": round(self.stats["total_flush_ms"], 2),
+            "avg_flush_ms": round(self.stats["total_flush_ms"] / count, 2) if count else 0.0,
+            "pending_items": sum(len(items) for items in self._pending.values()),
+        }
@@ -0,0 +1,405 @@
+"""
+Asyncio load generator for the /simulate/* attack endpoints.
+
+    # in-process: the app runs inside this process on the in-memory storage backend
+    PYTHONPATH=. python configurationscripts/load_test.py --target asgi --mode open --rate 300 --duration 30
+
+    # over HTTP against a running server, saturating it with 64 concurrent clients
+    python configurationscripts/load_test.py --target http://localhost:8000 --mode closed --concurrency 64
+
+Open-loop mode sends on a fixed schedule (`--rate` per second) whether or not
+earlier requests have completed, and measures each request from its intended
+send time. A stalled server therefore shows up in the percentiles instead of
+silently slowing the generator down (coordinated omission). Closed-loop mode
+runs `--concurrency` clients back to back and reports the saturation
+throughput. Its corrected percentiles backfill the requests a stalled client
+would have sent at `--expected-interval-ms`, in the manner of HdrHistogram's
+recordValueWithExpectedInterval.
+"""
+
+import argparse
+import asyncio
+import hashlib
+import json
+import os
+import random
+import sys
+import time
+import uuid
+from collections import Counter, defaultdict
+from datetime import datetime
+from typing import Dict, List, Optional
+
+import httpx
+
+ATTACK_TYPES = [
+    "ddos", "spoofing", "replay", "firmware", "ml_evasion",
+    "sensor_hijack", "api_abuse", "tamper_breach", "side_channel",
+]
+PERCENTILES = (50, 90, 95, 99, 99.9)
+ASGI_BASE_URL = "http://loadtest.local"
+SENSOR_WAIT_SECONDS = 30
+
+
+def parse_mix(spec: Optional[str]) -> Dict[str, float]:
+    """'spoofing=3,replay=1' -> weights; unlisted types are left out. Default: all nine, equal weight."""
+    if not spec:
+        return {attack: 1.0 for attack in ATTACK_TYPES}
+    mix = {}
+    for part in spec.split(","):
+        attack, _, weight = part.partition("=")
+        attack = attack.strip()
+        if attack not in ATTACK_TYPES:
+            raise SystemExit(f"Unknown attack type in --mix: {attack} (choose from {', '.join(ATTACK_TYPES)})")
+        mix[attack] = float(weight or 1)
+    return mix
+
+
+# ----------------------
+# Payloads
+# ----------------------
+def build_payload(attack: str, sensor_id: str, rng: random.Random, recent_nonces: List[str]) -> dict:
+    if attack == "ddos":
+        return {"sensor_id": sensor_id, "threshold": 10}
+    if attack == "spoofing":
+        payload = f"reading-{rng.randint(0, 10**6)}"
+        valid = hashlib.sha256((sensor_id + payload).encode()).hexdigest()
+        return {"sensor_id": sensor_id, "payload": payload,
+                "ecc_signature": valid if rng.random() < 0.5 else "invalid_hash"}
+    if attack == "replay":
+        # Roughly one in five replays an earlier nonce
+        if recent_nonces and rng.random() < 0.2:
+            nonce = rng.choice(recent_nonces)
+        else:
+            nonce = uuid.uuid4().hex
+            recent_nonces.append(nonce)
+            del recent_nonces[:-100]
+        return {"sensor_id": sensor_id, "payload": "abc123",
+                "timestamp": datetime.utcnow().isoformat(), "nonce": nonce}
+    if attack == "firmware":
+        return {"sensor_id": sensor_id, "firmware_content": "blob",
+                "firmware_signature": "valid_signature_123" if rng.random() < 0.5 else "invalid_signature"}
+    if attack == "ml_evasion":
+        drift = 5.0 if rng.random() < 0.1 else 0.0
+        return {"sensor_id": sensor_id, "values": [round(22.0 + drift + rng.gauss(0, 0.3), 2) for _ in range(5)]}
+    return {"sensor_id": sensor_id}
+
+
+# ----------------------
+# Results
+# ----------------------
+def percentile(sorted_values: List[float], pct: float) -> Optional[float]:
+    """Nearest-rank percentile of an already sorted list."""
+    if not sorted_values:
+        return None
+    rank = max(1, int(-(-pct * len(sorted_values) // 100)))
+    return sorted_values[min(rank, len(sorted_values)) - 1]
+
+
+def summarize(latencies_ms: List[float]) -> dict:
+    values = sorted(latencies_ms)
+    summary = {"count": len(values)}
+    if not values:
+        return summary
+    summary.update({f"p{p:g}": round(percentile(values, p), 3) for p in PERCENTILES})
+    summary["mean"] = round(sum(values) / len(values), 3)
+    summary["max"] = round(values[-1], 3)
+    return summary
+
+
+def backfill(latencies_ms: List[float], expected_interval_ms: float) -> List[float]:
+    """Add the samples a client stalled for `latency` would have recorded at the expected send interval."""
+    if expected_interval_ms <= 0:
+        return list(latencies_ms)
+    corrected = []
+    for latency in latencies_ms:
+        corrected.append(latency)
+        missed = latency - expected_interval_ms
+        while missed > 0:
+            corrected.append(missed)
+            missed -= expected_interval_ms
+    return corrected
+
+
+class Recorder:
+    def __init__(self, measure_from: float):
+        self.measure_from = measure_from  # samples intended before this (warmup) are dropped
+        self.latency_ms: Dict[str, List[float]] = defaultdict(list)  # from intended send time
+        self.service_ms: Dict[str, List[float]] = defaultdict(list)  # from actual send time
+        self.statuses: Dict[str, Counter] = defaultdict(Counter)
+        self.blocked: Counter = Counter()
+        self.errors: Counter = Counter()
+        self.dropped_warmup = 0
+
+    def record(self, attack: str, intended: float, sent: float, done: float, status, blocked: bool = False):
+        if intended < self.measure_from:
+            self.dropped_warmup += 1
+            return
+        self.latency_ms[attack].append((done - intended) * 1000)
+        self.service_ms[attack].append((done - sent) * 1000)
+        self.statuses[attack][str(status)] += 1
+        if blocked:
+            self.blocked[attack] += 1
+
+    def completed(self) -> int:
+        return sum(len(v) for v in self.latency_ms.values())
+
+
+# ----------------------
+# Client
+# ----------------------
+class Target:
+    """An httpx client for the app, in-process over ASGI or over the network."""
+
+    def __init__(self, target: str, max_connections: int):
+        self.target = target
+        self.app = None
+        self.client: Optional[httpx.AsyncClient] = None
+        self.max_connections = max_connections
+
+    async def __aenter__(self):
+        timeout = httpx.Timeout(30.0)
+        if self.target == "asgi":
+            from app.main import app
+
+            self.app = app
+            await app.router.startup()
+            transport = httpx.ASGITransport(app=app)
+            self.client = httpx.AsyncClient(transport=transport, base_url=ASGI_BASE_URL, timeout=timeout)
+        else:
+            limits = httpx.Limits(max_connections=self.max_connections, max_keepalive_connections=self.max_connections)
+            self.client = httpx.AsyncClient(base_url=self.target.rstrip("/"), limits=limits, timeout=timeout)
+        return self
+
+    async def __aexit__(self, *exc):
+        await self.client.aclose()
+        if self.app is not None:
+            await self.app.router.shutdown()
+
+    async def sensor_ids(self, wait_seconds: float = SENSOR_WAIT_SECONDS) -> List[str]:
+        """Known sensor IDs; the registry fills after the app's first refresh cycle, so poll briefly."""
+        deadline = time.monotonic() + wait_seconds
+        while True:
+            response = await self.client.get("/api/sensor-ids")
+            response.raise_for_status()
+            sensor_ids = response.json().get("sensor_ids", [])
+            if sensor_ids or time.monotonic() > deadline:
+                return sorted(sensor_ids)
+            await asyncio.sleep(0.5)
+
+    async def stats(self) -> dict:
+        """Server-side counters worth keeping alongside the client-side numbers."""
+        collected = {}
+        for name, path in (("audit_writer", "/simulate/audit/stats"), ("storage", "/api/storage/stats")):
+            try:
+                response = await self.client.get(path)
+                if response.status_code == 200:
+                    collected[name] = response.json()
+            except httpx.HTTPError:
+                pass
+        return collected
+
+
+class LoadTest:
+    def __init__(self, target: Target, sensor_ids: List[str], mix: Dict[str, float], seed: int):
+        self.target = target
+        self.sensor_ids = sensor_ids
+        self.attacks = list(mix)
+        self.weights = [mix[a] for a in self.attacks]
+        self.rng = random.Random(seed)
+        self.recent_nonces: List[str] = []
+        self.recorder: Optional[Recorder] = None
+
+    def next_request(self):
+        attack = self.rng.choices(self.attacks, self.weights)[0]
+        sensor_id = self.rng.choice(self.sensor_ids)
+        return attack, build_payload(attack, sensor_id, self.rng, self.recent_nonces)
+
+    async def send(self, attack: str, payload: dict, intended: float):
+        sent = time.perf_counter()
+        try:
+            response = await self.target.client.post(f"/simulate/{attack}", json=payload)
+        except httpx.HTTPError as e:
+            self.recorder.errors[type(e).__name__] += 1
+            self.recorder.record(attack, intended, sent, time.perf_counter(), "error")
+            return
+        done = time.perf_counter()
+        blocked = False
+        if response.status_code == 200:
+            blocked = bool(response.json().get("blocked"))
+        self.recorder.record(attack, intended, sent, done, response.status_code, blocked)
+
+    async def open_loop(self, rate: float, duration: float, warmup: float, max_in_flight: int) -> dict:
+        """Dispatch on a fixed schedule; a request's latency clock starts at its scheduled time."""
+        start = time.perf_counter()
+        self.recorder = Recorder(start + warmup)
+        interval = 1.0 / rate
+        total = int((warmup + duration) * rate)
+        in_flight = asyncio.Semaphore(max_in_flight)
+        tasks = set()
+        max_lag = 0.0
+
+        async def run(attack, payload, intended):
+            try:
+                await self.send(attack, payload, intended)
+            finally:
+                in_flight.release()
+
+        for i in range(total):
+            intended = start + i * interval
+            delay = intended - time.perf_counter()
+            if delay > 0:
+                await asyncio.sleep(delay)
+            # Waiting here when the cap is hit still counts against latency, measured from `intended`
+            await in_flight.acquire()
+            max_lag = max(max_lag, time.perf_counter() - intended)
+            attack, payload = self.next_request()
+            task = asyncio.create_task(run(attack, payload, intended))
+            tasks.add(task)
+            task.add_done_callback(tasks.discard)
+        if tasks:
+            await asyncio.gather(*tasks)
+        elapsed = time.perf_counter() - self.recorder.measure_from
+        return {"elapsed_seconds": elapsed, "max_dispatch_lag_ms": round(max_lag * 1000, 3)}
+
+    async def closed_loop(self, concurrency: int, duration: float, warmup: float, think_ms: float) -> dict:
+        """`concurrency` clients each send their next request as soon as the previous one returns."""
+        start = time.perf_counter()
+        self.recorder = Recorder(start + warmup)
+        stop_at = start + warmup + duration
+
+        async def client():
+            while time.perf_counter() < stop_at:
+                attack, payload = self.next_request()
+                now = time.perf_counter()
+                await self.send(attack, payload, now)
+                if think_ms:
+                    await asyncio.sleep(think_ms / 1000)
+
+        await asyncio.gather(*(client() for _ in range(concurrency)))
+        return {"elapsed_seconds": time.perf_counter() - self.recorder.measure_from}
+
+
+def build_report(args, test: LoadTest, run: dict, server_stats: dict) -> dict:
+    recorder = test.recorder
+    elapsed = run.pop("elapsed_seconds")
+    completed = recorder.completed()
+    all_latency = [v for values in recorder.latency_ms.values() for v in values]
+    all_service = [v for values in recorder.service_ms.values() for v in values]
+    rps = completed / elapsed if elapsed > 0 else 0.0
+
+    if args.mode == "closed":
+        # Without a schedule the natural expected interval is the mean service time
+        expected = args.expected_interval_ms or (sum(all_service) / len(all_service) if all_service else 0.0)
+        corrected = backfill(all_latency, expected)
+        run["expected_interval_ms"] = round(expected, 3)
+    else:
+        corrected = all_latency  # already measured from the intended send time
+
+    statuses = Counter()
+    for counts in recorder.statuses.values():
+        statuses.update(counts)
+    return {
+        "started_at": args.started_at,
+        "config": {
+            "target": args.target, "mode": args.mode, "rate": args.rate, "concurrency": args.concurrency,
+            "duration": args.duration, "warmup": args.warmup, "max_in_flight": args.max_in_flight,
+            "think_ms": args.think_ms, "mix": dict(zip(test.attacks, test.weights)), "seed": args.seed,
+            "sensor_count": len(test.sensor_ids), "server_workers": args.server_workers,
+            "storage_backend": os.environ.get("STORAGE_BACKEND") if args.target == "asgi" else None,
+        },
+        "summary": {
+            "completed": completed,
+            "elapsed_seconds": round(elapsed, 3),
+            "requests_per_second": round(rps, 2),
+            "requests_per_second_per_worker": round(rps / args.server_workers, 2),
+            "errors": dict(recorder.errors),
+            "status_codes": dict(statuses),
+            "dropped_warmup": recorder.dropped_warmup,
+            **run,
+        },
+        "latency_ms": summarize(corrected),
+        "service_time_ms": summarize(all_service),
+        "per_attack": {
+            attack: {
+                "latency_ms": summarize(recorder.latency_ms[attack]),
+                "service_time_ms": summarize(recorder.service_ms[attack]),
+                "status_codes": dict(recorder.statuses[attack]),
+                "blocked": recorder.blocked[attack],
+            }
+            for attack in test.attacks if recorder.latency_ms.get(attack)
+        },
+        "server": server_stats,
+    }
+
+
+def print_report(report: dict):
+    summary, latency = report["summary"], report["latency_ms"]
+    print(f"🚀 {report['config']['mode']}-loop against {report['config']['target']}: "
+          f"{summary['completed']} requests in {summary['elapsed_seconds']}s "
+          f"→ {summary['requests_per_second']} req/s ({summary['requests_per_second_per_worker']} per worker)")
+    if latency.get("count"):
+        print("   latency ms (CO-corrected): " + ", ".join(f"{p}={latency[p]}" for p in latency if p.startswith("p"))
+              + f", max={latency['max']}")
+    print(f"   status codes: {summary['status_codes']}  errors: {summary['errors'] or 'none'}")
+    for attack, stats in report["per_attack"].items():
+        lat = stats["latency_ms"]
+        print(f"   {attack:<14} n={lat['count']:<6} p50={lat['p50']:<9} p99={lat['p99']:<9} blocked={stats['blocked']}")
+
+
+async def run(args) -> dict:
+    mix = parse_mix(args.mix)
+    async with Target(args.target, max(args.max_in_flight, args.concurrency)) as target:
+        sensor_ids = args.sensor_ids.split(",") if args.sensor_ids else await target.sensor_ids()
+        if not sensor_ids:
+            raise SystemExit("No sensor IDs known to the target; pass --sensor-ids or wait for the first refresh")
+        test = LoadTest(target, sensor_ids, mix, args.seed)
+        if args.mode == "open":
+            result = await test.open_loop(args.rate, args.duration, args.warmup, args.max_in_flight)
+        else:
+            result = await test.closed_loop(args.concurrency, args.duration, args.warmup, args.think_ms)
+        server_stats = await target.stats()
+    return build_report(args, test, result, server_stats)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Load test the /simulate/* attack endpoints")
+    parser.add_argument("--target", default="asgi", help="'asgi' for in-process, or a base URL like http://localhost:8000")
+    parser.add_argument("--mode", choices=["open", "closed"], default="open")
+    parser.add_argument("--rate", type=float, default=100.0, help="open loop: requests per second")
+    parser.add_argument("--max-in-flight", type=int, default=1000, help="open loop: cap on outstanding requests")
+    parser.add_argument("--concurrency", type=int, default=32, help="closed loop: concurrent clients")
+    parser.add_argument("--think-ms", type=float, default=0.0, help="closed loop: pause between a client's requests")
+    parser.add_argument("--expected-interval-ms", type=float, default=0.0,
+                        help="closed loop: send interval for the coordinated-omission backfill (default: mean service time)")
+    parser.add_argument("--duration", type=float, default=30.0, help="measured seconds")
+    parser.add_argument("--warmup", type=float, default=5.0, help="seconds sent before measuring starts")
+    parser.add_argument("--mix", help="attack weights, e.g. 'ddos=1,replay=3' (default: all nine equally)")
+    parser.add_argument("--sensor-ids", help="comma-separated IDs (default: the target's /api/sensor-ids)")
+    parser.add_argument("--server-workers", type=int, default=1, help="server worker processes, for the per-worker rate")
+    parser.add_argument("--storage", default="memory", choices=["memory", "sqlite", "dynamodb"],
+                        help="asgi target: storage backend for the in-process app")
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--out", help="write the JSON report here (default: stdout only)")
+    args = parser.parse_args()
+    args.started_at = datetime.utcnow().isoformat()
+
+    if args.target == "asgi":
+        # Must be set before the app is imported; keep the app's own access log off the report's stdout
+        os.environ["STORAGE_BACKEND"] = args.storage
+        os.environ.setdefault("ACCESS_LOG_SAMPLE_RATE", "0")
+        args.server_workers = 1
+
+    report = asyncio.run(run(args))
+    print_report(report)
+    if args.out:
+        with open(args.out, "w") as f:
+            json.dump(report, f, indent=2)
+        print(f"✅ Report written to {args.out}")
+    else:
+        json.dump(report, sys.stdout, indent=2)
+        print()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,31 @@
+# conftest.py
+#
+# Run from backend/ with `python -m pytest -q`. The app reads its backends from
+# the environment at import time, so they are set here before anything imports
+# `app`: in-memory storage, per-process state and no sampled access logging.
+
+import os
+
+import pytest
+
+os.environ.setdefault("STORAGE_BACKEND", "memory")
+os.environ.setdefault("SHARED_STATE_BACKEND", "local")
+os.environ.setdefault("ACCESS_LOG_SAMPLE_RATE", "0")
+
+
+class FakeClock:
+    """A monotonic clock the test advances by hand."""
+
+    def __init__(self, now: float = 1000.0):
+        self.now = now
+
+    def __call__(self) -> float:
+        return self.now
+
+    def advance(self, seconds: float):
+        self.now += seconds
+
+
+@pytest.fixture
+def clock() -> FakeClock:
+    return FakeClock()
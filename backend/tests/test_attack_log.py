@@ -0,0 +1,39 @@
+from app.simulate_attacks.attack_log import AttackLogBuffer
+
+
+def fill(buffer: AttackLogBuffer, count: int):
+    for i in range(count):
+        buffer.append({"message": f"attack {i}"})
+
+
+def seqs(entries):
+    return [entry["seq"] for entry in entries]
+
+
+def test_read_without_cursor_returns_newest_first():
+    buffer = AttackLogBuffer()
+    fill(buffer, 5)
+    assert seqs(buffer.read()) == [5, 4, 3, 2, 1]
+    assert seqs(buffer.read(limit=2)) == [5, 4]
+    assert buffer.read(limit=0) == []
+
+
+def test_read_since_returns_only_newer_entries():
+    buffer = AttackLogBuffer()
+    fill(buffer, 5)
+    assert seqs(buffer.read(since=3)) == [5, 4]
+    assert seqs(buffer.read(since=1, limit=2)) == [5, 4]
+    assert buffer.read(since=5) == []
+
+
+def test_read_since_after_entries_were_dropped():
+    buffer = AttackLogBuffer(capacity=3)
+    fill(buffer, 10)
+    assert seqs(buffer.read(since=2)) == [10, 9, 8]
+    assert seqs(buffer.read(since=8)) == [10, 9]
+
+
+def test_cursor_from_before_a_restart_starts_over():
+    buffer = AttackLogBuffer()
+    fill(buffer, 3)
+    assert seqs(buffer.read(since=50, limit=2)) == [3, 2]
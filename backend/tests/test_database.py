@@ -0,0 +1,55 @@
+import json
+
+from app.model import database
+from app.model.database import JsonlLogWriter
+
+
+def read_lines(path):
+    with open(path, "rb") as f:
+        return f.read().splitlines()
+
+
+def test_append_and_iter_latest(tmp_path):
+    writer = JsonlLogWriter(str(tmp_path / "log.jsonl"), fsync_policy="never")
+    for i in range(5):
+        writer.append({"i": i})
+    assert [r["i"] for r in writer.iter_latest()] == [4, 3, 2, 1, 0]
+    assert [r["i"] for r in writer.iter_latest(limit=2)] == [4, 3]
+    writer.close()
+
+
+def test_rotation_keeps_backup_count_files(tmp_path):
+    path = tmp_path / "log.jsonl"
+    line_bytes = len(json.dumps({"i": 0}) + "\n")
+    writer = JsonlLogWriter(str(path), fsync_policy="never", max_bytes=2 * line_bytes, backup_count=2)
+    for i in range(7):
+        writer.append({"i": i})
+    writer.close()
+
+    assert [json.loads(line)["i"] for line in read_lines(path)] == [6]
+    assert [json.loads(line)["i"] for line in read_lines(f"{path}.1")] == [4, 5]
+    assert [json.loads(line)["i"] for line in read_lines(f"{path}.2")] == [2, 3]
+    assert not (tmp_path / "log.jsonl.3").exists()
+    # Newest first across the live file and its backups
+    assert [r["i"] for r in writer.iter_latest()] == [6, 5, 4, 3, 2]
+
+
+def test_torn_line_is_terminated_on_reopen_and_skipped(tmp_path):
+    path = tmp_path / "log.jsonl"
+    path.write_bytes(b'{"i": 0}\n{"i": 1, "trunc')
+    writer = JsonlLogWriter(str(path), fsync_policy="never")
+    writer.append({"i": 2})
+    writer.close()
+
+    assert read_lines(path) == [b'{"i": 0}', b'{"i": 1, "trunc', b'{"i": 2}']
+    assert [r["i"] for r in writer.iter_latest()] == [2, 0]
+
+
+def test_reverse_reads_lines_that_span_chunks(tmp_path, monkeypatch):
+    monkeypatch.setattr(database, "REVERSE_READ_CHUNK", 7)
+    writer = JsonlLogWriter(str(tmp_path / "log.jsonl"), fsync_policy="never")
+    records = [{"i": i, "pad": "x" * i} for i in range(12)]
+    for record in records:
+        writer.append(record)
+    assert list(writer.iter_latest()) == records[::-1]
+    writer.close()
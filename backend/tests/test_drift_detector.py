@@ -0,0 +1,51 @@
+import numpy as np
+
+from app.simulate_attacks.drift_detector import StreamingDriftDetector
+
+
+def test_sustained_shift_raises_drift_after_warmup():
+    detector = StreamingDriftDetector(["value"], warmup=30)
+    rng = np.random.default_rng(0)
+    for x in rng.normal(10.0, 1.0, 100):
+        assert detector.update("s1", [x]) == []
+    drifted = [detector.update("s1", [x]) for x in rng.normal(20.0, 1.0, 20)]
+    assert ["value"] in drifted
+    assert detector.state("s1")["alarms"] >= 1
+
+
+def test_slots_grow_up_to_max_sensors():
+    detector = StreamingDriftDetector(["a", "b"], initial_slots=2, max_sensors=5)
+    for i in range(5):
+        detector.update(f"s{i}", [1.0, 2.0])
+    stats = detector.get_stats()
+    assert stats["sensors"] == 5
+    assert stats["slots"] == 5
+    assert stats["evicted"] == 0
+
+
+def test_full_table_evicts_the_least_recently_updated_sensor():
+    detector = StreamingDriftDetector(["value"], initial_slots=2, max_sensors=3)
+    for sensor_id in ("s0", "s1", "s2"):
+        detector.update(sensor_id, [1.0])
+    detector.update("s0", [1.0])  # s1 is now the least recently updated
+    detector.update("s3", [5.0])
+
+    assert detector.state("s1") is None
+    assert detector.state("s0")["readings"] == 2
+    # The reused row starts from zero rather than inheriting s1's state
+    assert detector.state("s3")["readings"] == 1
+    assert detector.state("s3")["features"]["value"]["mean"] == 5.0
+    stats = detector.get_stats()
+    assert stats["sensors"] == 3
+    assert stats["slots"] == 3
+    assert stats["evicted"] == 1
+
+
+def test_evicted_sensor_starts_over_when_it_returns():
+    detector = StreamingDriftDetector(["value"], max_sensors=1)
+    for _ in range(3):
+        detector.update("s0", [1.0])
+    detector.update("s1", [1.0])
+    detector.update("s0", [1.0])
+    assert detector.state("s0")["readings"] == 1
+    assert detector.get_stats()["evicted"] == 2
@@ -0,0 +1,80 @@
+from datetime import datetime, timedelta, timezone
+
+from app.cache.nonce_store import NONCE_FRESHNESS_SECONDS, NonceStore, is_fresh
+
+BLOOM_BITS = 1 << 12
+
+
+def make_store(clock, **kwargs) -> NonceStore:
+    kwargs.setdefault("bloom_bits", BLOOM_BITS)
+    return NonceStore(ttl_seconds=10, bucket_seconds=5, clock=clock, **kwargs)
+
+
+def test_check_and_add_rejects_a_replay(clock):
+    store = make_store(clock)
+    assert store.check_and_add("n1") is True
+    assert store.check_and_add("n1") is False
+    assert store.check_and_add("n2") is True
+    assert store.get_stats()["replays"] == 1
+    assert len(store) == 2
+
+
+def test_nonces_are_kept_for_the_ttl_then_expire(clock):
+    store = make_store(clock)
+    store.add("n1")
+    clock.advance(10)
+    assert "n1" in store  # its bucket still overlaps the TTL
+    clock.advance(10)
+    assert "n1" not in store
+    stats = store.get_stats()
+    assert stats["expired"] == 1
+    assert stats["size"] == 0
+
+
+def test_over_capacity_demotes_the_oldest_bucket_to_its_bloom_filter(clock):
+    store = make_store(clock, capacity=3)
+    store.add("old-1")
+    store.add("old-2")
+    clock.advance(5)
+    store.add("new-1")
+    store.add("new-2")
+
+    stats = store.get_stats()
+    assert stats["demoted"] == 2
+    assert stats["demoted_buckets"] == 1
+    assert stats["size"] == 2
+    # Demoted nonces are still rejected, now through the filter
+    assert store.seen("old-1")
+    assert store.get_stats()["bloom_replays"] == 1
+    assert "new-1" in store
+
+
+def test_a_flood_in_one_bucket_demotes_the_current_bucket(clock):
+    store = make_store(clock, capacity=3)
+    for i in range(5):
+        store.add(f"n{i}")
+    assert len(store) == 0
+    assert store.get_stats()["demoted_buckets"] == 1
+    # The rest of the window is recorded in the filter alone
+    store.add("late")
+    assert all(f"n{i}" in store for i in range(5))
+    assert "late" in store
+
+
+def test_without_bloom_over_capacity_buckets_are_evicted(clock):
+    store = make_store(clock, capacity=2, use_bloom=False)
+    store.add("old")
+    clock.advance(5)
+    store.add("new-1")
+    store.add("new-2")
+    assert "old" not in store
+    assert "new-1" in store
+    assert store.get_stats()["evicted"] == 1
+
+
+def test_is_fresh_accepts_only_timestamps_near_now():
+    now = datetime(2024, 1, 1, 12, 0, 0)
+    assert is_fresh(now - timedelta(seconds=NONCE_FRESHNESS_SECONDS - 1), now)
+    assert is_fresh(now + timedelta(seconds=NONCE_FRESHNESS_SECONDS - 1), now)
+    assert not is_fresh(now - timedelta(seconds=NONCE_FRESHNESS_SECONDS), now)
+    assert is_fresh(datetime(2024, 1, 1, 13, 0, 0, tzinfo=timezone(timedelta(hours=1))), now)
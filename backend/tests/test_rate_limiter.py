@@ -0,0 +1,57 @@
+from app.simulate_attacks.rate_limiter import SlidingWindowRateLimiter
+
+
+def test_hit_counts_requests_inside_the_window(clock):
+    limiter = SlidingWindowRateLimiter(window_seconds=10, clock=clock)
+    assert [limiter.hit("s1") for _ in range(3)] == [1, 2, 3]
+    assert limiter.hit("s2") == 1
+    assert limiter.current_rate("s1") == 0.3
+
+
+def test_hits_older_than_the_window_expire(clock):
+    limiter = SlidingWindowRateLimiter(window_seconds=10, clock=clock)
+    limiter.hit("s1")
+    clock.advance(5)
+    limiter.hit("s1")
+    clock.advance(5)
+    assert limiter.hit("s1") == 3  # the first hit sits exactly on the cutoff and still counts
+    clock.advance(0.1)
+    assert limiter.hit("s1") == 3
+
+
+def test_block_expires_after_block_seconds(clock):
+    limiter = SlidingWindowRateLimiter(block_seconds=60, clock=clock)
+    assert limiter.block_remaining("s1") is None
+    assert limiter.block("s1") == 60
+    clock.advance(20)
+    assert limiter.block_remaining("s1") == 40
+    clock.advance(40)
+    assert limiter.block_remaining("s1") is None
+
+
+def test_reblock_outlives_the_earlier_expiry(clock):
+    limiter = SlidingWindowRateLimiter(block_seconds=60, clock=clock)
+    limiter.block("s1")
+    clock.advance(30)
+    limiter.block("s1")
+    clock.advance(30)  # the first block's heap entry comes due but must not unblock
+    assert limiter.block_remaining("s1") == 30
+
+
+def test_rates_reports_active_sensors_and_forgets_idle_ones(clock):
+    limiter = SlidingWindowRateLimiter(window_seconds=10, block_seconds=60, clock=clock)
+    limiter.hit("busy")
+    limiter.hit("busy")
+    limiter.hit("blocked")
+    limiter.block("blocked")
+    limiter.hit("idle")
+    clock.advance(5)
+    limiter.hit("busy")
+    clock.advance(6)
+
+    rates = limiter.rates()
+    assert rates["busy"] == {"requests_in_window": 1, "rate_per_second": 0.1, "blocked_for_seconds": 0}
+    assert rates["blocked"]["requests_in_window"] == 0
+    assert rates["blocked"]["blocked_for_seconds"] == 49
+    assert "idle" not in rates
+    assert limiter.current_rate("idle") == 0.0
@@ -0,0 +1,43 @@
+from decimal import Decimal
+from typing import List, Optional
+
+import numpy as np
+from pydantic import BaseModel
+
+from app.utils.serializer import to_attribute_values, to_item
+
+
+class Reading(BaseModel):
+    sensor_id: str
+    moisture: float
+    count: int
+    ok: bool
+    note: Optional[str] = None
+    tags: List[float] = []
+    extra: Optional[float] = None
+
+
+def test_model_floats_become_decimals():
+    item = to_item(Reading(sensor_id="s1", moisture=0.1, count=3, ok=True, tags=[1.5, 2.25]))
+    assert item == {"sensor_id": "s1", "moisture": Decimal("0.1"), "count": 3, "ok": True,
+                    "note": None, "tags": [Decimal("1.5"), Decimal("2.25")], "extra": None}
+    assert isinstance(item["moisture"], Decimal)
+
+
+def test_dict_values_convert_recursively():
+    item = to_item({"sensor_id": "s1", "score": 0.5, "nested": {"values": [0.25, "a", 3]}})
+    assert item == {"sensor_id": "s1", "score": Decimal("0.5"),
+                    "nested": {"values": [Decimal("0.25"), "a", 3]}}
+
+
+def test_float_subclasses_convert_like_floats():
+    item = to_item({"score": np.float64(0.75), "values": [np.float64(1.5)]})
+    assert item == {"score": Decimal("0.75"), "values": [Decimal("1.5")]}
+    assert type(item["score"]) is Decimal
+
+
+def test_attribute_values():
+    assert to_attribute_values(Reading(sensor_id="s1", moisture=0.5, count=2, ok=False)) == {
+        "sensor_id": {"S": "s1"}, "moisture": {"N": "0.5"}, "count": {"N": "2"}, "ok": {"BOOL": False},
+        "note": {"NULL": True}, "tags": {"L": []}, "extra": {"NULL": True}}
+    assert to_attribute_values({"flag": True, "n": np.float64(1.5)}) == {"flag": {"BOOL": True}, "n": {"N": "1.5"}}
@@ -0,0 +1,95 @@
+import json
+import time
+
+import pytest
+from fastapi.testclient import TestClient
+
+from app.main import app
+from app.simulate_attacks import sensor_simulation_attack
+
+
+@pytest.fixture(scope="module")
+def client():
+    with TestClient(app) as client:
+        yield client
+
+
+@pytest.fixture(scope="module")
+def sensor_ids(client):
+    # The registry fills after the app's first sensor refresh cycle
+    deadline = time.monotonic() + 10
+    while True:
+        ids = client.get("/api/sensor-ids").json()["sensor_ids"]
+        if ids or time.monotonic() > deadline:
+            break
+        time.sleep(0.1)
+    assert ids, "no sensors registered after startup"
+    return sorted(ids)
+
+
+def test_batch_evaluates_each_attack(client, sensor_ids):
+    sensor_id = sensor_ids[0]
+    response = client.post("/simulate/batch", json=[
+        {"attack_type": "ddos", "sensor_id": sensor_id},
+        {"attack_type": "spoofing", "sensor_id": sensor_id, "payload": "42", "ecc_signature": "sig"},
+        {"attack_type": "side_channel", "sensor_id": sensor_id},
+    ])
+    assert response.status_code == 200
+    body = response.json()
+    assert body["count"] == 3
+    assert body["errors"] == 0
+    assert [r["index"] for r in body["results"]] == [0, 1, 2]
+    assert [r["attack_type"] for r in body["results"]] == ["ddos", "spoofing", "side_channel"]
+
+
+def test_invalid_items_get_per_item_errors(client, sensor_ids):
+    response = client.post("/simulate/batch", json={"attacks": [
+        {"attack_type": "side_channel", "sensor_id": sensor_ids[0]},
+        {"attack_type": "teleport", "sensor_id": sensor_ids[0]},
+        {"attack_type": "side_channel", "sensor_id": "no-such-sensor"},
+        {"attack_type": "replay", "sensor_id": sensor_ids[0]},
+        {"attack_type": "ml_evasion", "sensor_id": sensor_ids[0], "values": []},
+        "not an object",
+    ]})
+    assert response.status_code == 200
+    body = response.json()
+    assert body["count"] == 6
+    assert body["errors"] == 5
+    results = body["results"]
+    assert "error" not in results[0]
+    assert [(r["index"], r["status_code"]) for r in results[1:]] == [(1, 422), (2, 400), (3, 422), (4, 422), (5, 422)]
+    assert results[2]["error"] == "Invalid sensor ID"
+
+
+def test_an_unexpected_failure_only_fails_its_item(client, sensor_ids, monkeypatch):
+    def broken(data, now):
+        raise RuntimeError("boom")
+
+    monkeypatch.setattr(sensor_simulation_attack, "evaluate_spoofing", broken)
+    response = client.post("/simulate/batch", json=[
+        {"attack_type": "spoofing", "sensor_id": sensor_ids[0], "payload": "42", "ecc_signature": "sig"},
+        {"attack_type": "side_channel", "sensor_id": sensor_ids[0]},
+    ])
+    assert response.status_code == 200
+    results = response.json()["results"]
+    assert results[0]["status_code"] == 500
+    assert "boom" in results[0]["error"]
+    assert "error" not in results[1]
+
+
+def test_streamed_batch_ends_with_a_summary(client, sensor_ids):
+    attacks = [{"attack_type": "side_channel", "sensor_id": sensor_ids[0]},
+               {"attack_type": "teleport", "sensor_id": sensor_ids[0]}]
+    response = client.post("/simulate/batch?stream=true", json=attacks)
+    assert response.status_code == 200
+    assert response.headers["content-type"].startswith("application/x-ndjson")
+    lines = [json.loads(line) for line in response.text.splitlines()]
+    assert [line["index"] for line in lines[:-1]] == [0, 1]
+    assert lines[-1] == {"summary": {"count": 2, "blocked": 1, "errors": 1}}
+
+
+def test_whole_batch_errors(client, sensor_ids):
+    assert client.post("/simulate/batch", json=[]).status_code == 400
+    assert client.post("/simulate/batch", json={"attacks": "nope"}).status_code == 400
+    assert client.post("/simulate/batch", content=b"{not json",
+                       headers={"content-type": "application/json"}).status_code == 400
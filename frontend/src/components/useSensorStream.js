@@ -0,0 +1,82 @@
+import { useEffect, useRef, useState } from "react";
+
+const STREAM_URL = "wss://api.lx-gateway.tech/ws/stream";
+const RECONNECT_DELAY_MS = 5000;
+
+/**
+ * Subscribe to the backend sensor stream (snapshot, then refresh-cycle deltas,
+ * new attack logs and alerts). `connected` is false until the snapshot arrives,
+ * so callers can keep polling as a fallback until then.
+ * @returns {{connected: boolean, sensors: Object, averages: Object, alerts: Array, logs: Array}}
+ */
+const useSensorStream = () => {
+    const [state, setState] = useState({ connected: false, sensors: {}, averages: {}, alerts: [], logs: [] });
+    const socketRef = useRef(null);
+
+    useEffect(() => {
+        const token = localStorage.getItem("token");
+        if (!token) return undefined;
+
+        let closed = false;
+        let retryTimer = null;
+
+        const applyDelta = (sensors, changed) => {
+            const next = { ...sensors };
+            Object.entries(changed).forEach(([type, readings]) => {
+                const byId = new Map((next[type] || []).map(s => [s.sensor_id, s]));
+                readings.forEach(r => byId.set(r.sensor_id, r));
+                next[type] = Array.from(byId.values());
+            });
+            return next;
+        };
+
+        const connect = () => {
+            const socket = new WebSocket(`${STREAM_URL}?token=${encodeURIComponent(token)}`);
+            socketRef.current = socket;
+
+            socket.onmessage = (event) => {
+                const message = JSON.parse(event.data);
+                setState(prev => {
+                    switch (message.type) {
+                        case "snapshot":
+                            return {
+                                ...prev,
+                                connected: true,
+                                sensors: message.data.sensors || {},
+                                averages: message.data.averages || {},
+                                alerts: message.data.alerts || []
+                            };
+                        case "sensors":
+                            return {
+                                ...prev,
+                                sensors: applyDelta(prev.sensors, message.data.changed || {}),
+                                averages: message.data.averages || prev.averages
+                            };
+                        case "alert":
+                            return { ...prev, alerts: [...prev.alerts, message.data].slice(-10) };
+                        case "log":
+                            return { ...prev, logs: [message.data, ...prev.logs].slice(0, 1500) };
+                        default:
+                            return prev;
+                    }
+                });
+            };
+
+            socket.onclose = () => {
+                setState(prev => ({ ...prev, connected: false }));
+                if (!closed) retryTimer = setTimeout(connect, RECONNECT_DELAY_MS);
+            };
+        };
+
+        connect();
+        return () => {
+            closed = true;
+            clearTimeout(retryTimer);
+            if (socketRef.current) socketRef.current.close();
+        };
+    }, []);
+
+    return state;
+};
+
+export default useSensorStream;
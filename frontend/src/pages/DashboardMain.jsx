@@ -1,4 +1,5 @@
 import React, { useEffect, useState } from "react";
+import useSensorStream from "../components/useSensorStream";
 
 const attackSamples = {
     spoofing: { sensor_id: "sensor-x", payload: "abc123", ecc_signature: "invalid_hash" },
@@ -58,7 +59,15 @@ const DashboardMain = () => {
             });
     }, []);
 
+    const stream = useSensorStream();
+
+    useEffect(() => {
+        if (stream.connected) setLiveLogs(stream.alerts);
+    }, [stream.connected, stream.alerts]);
+
     useEffect(() => {
+        if (stream.connected) return undefined;
+
         const fetchAlerts = async () => {
             try {
                 const res = await fetch("https://api.lx-gateway.tech/api/alerts");
@@ -71,7 +80,7 @@ const DashboardMain = () => {
         fetchAlerts();
         const interval = setInterval(fetchAlerts, 5000);
         return () => clearInterval(interval);
-    }, []);
+    }, [stream.connected]);
 
     const handleAttack = () => {
         if (!selectedID || !selectedAttack) {
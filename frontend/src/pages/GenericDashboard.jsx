@@ -19,6 +19,7 @@ import {
     Filler
 } from "chart.js";
 import Layout from "../components/Layout";
+import useSensorStream from "../components/useSensorStream";
 
 ChartJS.register(LineElement, CategoryScale, LinearScale, PointElement, Tooltip, Legend, Filler);
 
@@ -31,6 +32,7 @@ const SENSOR_CONFIG = {
     },
     atmosphere: {
         fetch: fetchAllAtmosphericSensors,
+        streamType: "atmospheric",
         label: "Atmospheric Readings",
         fields: ["air_temperature", "humidity", "co2", "wind_speed", "rainfall"],
         labels: ["Air Temp", "Humidity", "CO₂", "Wind Speed", "Rainfall"],
@@ -62,8 +64,22 @@ const GenericDashboard = () => {
     const [sensorData, setSensorData] = useState(null);
     const [averages, setAverages] = useState({});
     const [loading, setLoading] = useState(false);
+    const stream = useSensorStream();
 
+    // While the stream is connected, readings and averages are pushed instead of polled
     useEffect(() => {
+        if (!stream.connected) return;
+        const config = SENSOR_CONFIG[sensorType];
+        if (!config) return;
+        const sensorResults = stream.sensors[config.streamType || sensorType] || [];
+        setAllSensors(sensorResults);
+        setAverages(stream.averages || {});
+        setSensorData(sensorResults[sensorIndex] || null);
+    }, [stream, sensorType, sensorIndex]);
+
+    useEffect(() => {
+        if (stream.connected) return undefined;
+
         const fetchData = async () => {
             const config = SENSOR_CONFIG[sensorType];
             if (!config) return;
@@ -93,7 +109,7 @@ const GenericDashboard = () => {
         fetchData();
         const interval = setInterval(fetchData, 5000);
         return () => clearInterval(interval);
-    }, [sensorType, sensorIndex]);
+    }, [sensorType, sensorIndex, stream.connected]);
 
     const config = SENSOR_CONFIG[sensorType];
     const avgData = averages?.[sensorType];
@@ -1,4 +1,4 @@
-import React, { useEffect, useState } from "react";
+import React, { useEffect, useRef, useState } from "react";
 import { saveAs } from "file-saver";
 
 const isLogBlocked = (log) => {
@@ -18,13 +18,22 @@ const Logs = () => {
     const [loading, setLoading] = useState(false);
     const [currentPage, setCurrentPage] = useState(1);
     const logsPerPage = 10;
+    const lastSeqRef = useRef(null);
 
-    const fetchLogs = async () => {
+    const fetchLogs = async ({ reset = false } = {}) => {
         try {
             setLoading(true);
-            const res = await fetch("https://api.lx-gateway.tech/api/logs");
+            const since = reset ? null : lastSeqRef.current;
+            const url = since === null
+                ? "https://api.lx-gateway.tech/api/logs"
+                : `https://api.lx-gateway.tech/api/logs?since=${since}`;
+            const res = await fetch(url);
             const data = await res.json();
-            setLogs(data.logs || []);
+            const incoming = data.logs || [];
+            // A cursor newer than the server's means the backend restarted: replace instead of merging
+            const restarted = since !== null && data.last_seq < since;
+            setLogs(prev => (since === null || restarted ? incoming : [...incoming, ...prev].slice(0, 1500)));
+            lastSeqRef.current = data.last_seq ?? null;
         } catch (error) {
             console.error("Failed to fetch logs", error);
         } finally {
@@ -53,7 +62,7 @@ const Logs = () => {
 
             if (res.ok) {
                 alert("✅ All logs have been deleted.");
-                await fetchLogs();
+                await fetchLogs({ reset: true });
             } else {
                 alert("❌ Failed to delete logs.");
             }